@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Browser Pool Benchmark
+
+Per-URL latency of crawling with a fresh browser per URL (the old
+ProductExtractionPipeline behaviour) versus a long-lived BrowserPool.
+Pages come from a local stand-in server serving a product page, so the
+numbers measure browser overhead rather than the network.
+
+Usage:
+    python benchmarks/bench_browser_pool.py --urls 30 --max-uses 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from aiohttp import web
+from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from browser_pool import BrowserPool, browser_memory_mb
+
+PRODUCT_PAGE = """<html><head><title>Leite Integral 1L</title></head><body>
+<h1 class="product-name">Leite Integral Piracanjuba 1L</h1>
+<span class="price">R$ 5,49</span>
+<div class="description">{filler}</div>
+</body></html>"""
+
+
+async def start_server(port: int) -> web.AppRunner:
+    page = PRODUCT_PAGE.format(filler="Leite UHT integral. " * 200)
+
+    async def handler(request):
+        return web.Response(text=page, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "localhost", port).start()
+    return runner
+
+
+async def run_cold(urls: List[str], browser_config: BrowserConfig, config: CrawlerRunConfig) -> List[float]:
+    latencies = []
+    for url in urls:
+        start = time.perf_counter()
+        async with AsyncWebCrawler(config=browser_config) as crawler:
+            await crawler.arun(url=url, config=config)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run_pooled(urls: List[str], pool: BrowserPool, config: CrawlerRunConfig) -> List[float]:
+    latencies = []
+    for url in urls:
+        start = time.perf_counter()
+        await pool.arun(url, config=config)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name: str, latencies: List[float]):
+    ordered = sorted(latencies)
+    p95 = ordered[max(int(len(ordered) * 0.95) - 1, 0)]
+    print(f"  {name:<7} mean={statistics.mean(latencies) * 1000:7.1f}ms "
+          f"median={statistics.median(latencies) * 1000:7.1f}ms p95={p95 * 1000:7.1f}ms "
+          f"total={sum(latencies):.1f}s")
+
+
+async def main(args):
+    runner = await start_server(args.port)
+    urls = [f"http://localhost:{args.port}/produto-{i}/p" for i in range(args.urls)]
+    browser_config = BrowserConfig(headless=True, java_script_enabled=True, verbose=False)
+    config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS, verbose=False)
+
+    try:
+        print(f"📋 {args.urls} URLs per mode")
+        cold = await run_cold(urls, browser_config, config)
+        report("cold", cold)
+
+        async with BrowserPool(browser_config, max_uses=args.max_uses) as pool:
+            pooled = await run_pooled(urls, pool, config)
+            memory = browser_memory_mb()
+            stats = pool.stats()
+        report("pooled", pooled)
+        print(f"  speedup: {statistics.mean(cold) / statistics.mean(pooled):.1f}x "
+              f"(pool restarts={stats['restarts']}, browser memory {memory:.0f} MB)")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cold vs pooled browsers")
+    parser.add_argument("--urls", type=int, default=30)
+    parser.add_argument("--max-uses", type=int, default=50, help="Pages per pooled browser before recycling")
+    parser.add_argument("--port", type=int, default=8766)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+DOM Similarity Benchmark
+
+1. Cost of fingerprinting a page (exact fingerprint and SimHash) and of
+   searching the SimHash index
+2. LLM schema generations avoided when merchants share a platform: product
+   pages of synthetic merchants on three platform skeletons (VTEX-, Magento-
+   and Salesforce-Commerce-like, each merchant with its own theme blocks,
+   navigation and products) plus merchants with one-off custom markup.
+   Merchants are processed in random order; each either reuses a similar
+   cached schema that passes the validation extraction, or pays one LLM call.
+
+Usage:
+    python benchmarks/bench_dom_similarity.py --merchants 60 --custom 15
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from dom_similarity import (
+    DEFAULT_CANDIDATES, DEFAULT_MAX_DISTANCE, SimHashIndex, dom_fingerprint, dom_simhash, hamming, schema_fits_page,
+)
+from http_extraction import CompiledCssSchema, required_fields
+
+# Platform skeleton: (product block template, schema)
+PLATFORMS: Dict[str, Tuple[str, dict]] = {
+    "vtex": (
+        '<div class="vtex-flex-layout-0-x-flexRow vtex-flex-layout-0-x-flexRow--{theme}-main">'
+        '<div class="vtex-breadcrumb-1-x-container"><a class="vtex-breadcrumb-1-x-link">{category}</a></div>'
+        '<div class="vtex-store-components-3-x-productNameContainer"><h1>'
+        '<span class="vtex-store-components-3-x-productBrand">{name}</span></h1></div>'
+        '<span class="vtex-product-identifier-0-x-product-identifier__value">{sku}</span>'
+        '<span class="vtex-store-components-3-x-productBrandName">{brand}</span>'
+        '<div class="vtex-product-price-1-x-sellingPrice"><span class="vtex-product-price-1-x-sellingPriceValue">'
+        'R$ {price}</span></div></div>',
+        {"name": "vtex", "baseSelector": ".vtex-flex-layout-0-x-flexRow", "fields": [
+            {"name": "product_name", "selector": ".vtex-store-components-3-x-productBrand", "type": "text"},
+            {"name": "current_price", "selector": ".vtex-product-price-1-x-sellingPriceValue", "type": "text"},
+            {"name": "sku", "selector": ".vtex-product-identifier-0-x-product-identifier__value", "type": "text"},
+        ]},
+    ),
+    "magento": (
+        '<main class="page-main"><div class="breadcrumbs"><ul class="items"><li class="item">{category}</li></ul></div>'
+        '<div class="product-info-main"><div class="page-title-wrapper product"><h1 class="page-title">'
+        '<span class="base">{name}</span></h1></div>'
+        '<div class="product attribute sku"><div class="value">{sku}</div></div>'
+        '<div class="price-box price-final_price"><span class="price-wrapper"><span class="price">R$ {price}</span>'
+        '</span></div><div class="product attribute brand"><div class="value">{brand}</div></div></div></main>',
+        {"name": "magento", "baseSelector": ".product-info-main", "fields": [
+            {"name": "product_name", "selector": ".page-title .base", "type": "text"},
+            {"name": "current_price", "selector": ".price-box .price", "type": "text"},
+            {"name": "sku", "selector": ".sku .value", "type": "text"},
+        ]},
+    ),
+    "sfcc": (
+        '<div class="container product-detail product-wrapper" data-pid="{sku}">'
+        '<ol class="breadcrumb"><li class="breadcrumb-item">{category}</li></ol>'
+        '<div class="row"><div class="col-12"><h1 class="product-name">{name}</h1>'
+        '<div class="product-number">Item No. <span class="product-id">{sku}</span></div>'
+        '<div class="brand-name">{brand}</div></div></div>'
+        '<div class="prices"><div class="price"><span class="sales"><span class="value">R$ {price}</span>'
+        '</span></div></div></div>',
+        {"name": "sfcc", "baseSelector": ".product-detail", "fields": [
+            {"name": "product_name", "selector": ".product-name", "type": "text"},
+            {"name": "current_price", "selector": ".prices .sales .value", "type": "text"},
+            {"name": "sku", "selector": ".product-id", "type": "text"},
+        ]},
+    ),
+}
+
+WORDS = ["leite", "arroz", "feijao", "cafe", "oleo", "acucar", "sabao", "queijo", "suco", "biscoito"]
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9)))
+
+
+def theme_chrome(rng: random.Random, theme: str) -> Tuple[str, str]:
+    """Merchant-specific header/footer and extra blocks"""
+    nav = "".join(
+        f'<li class="{theme}-nav-item"><a class="{theme}-nav-link" href="/{_word(rng)}">{_word(rng)}</a></li>'
+        for _ in range(rng.randint(5, 15))
+    )
+    header = (
+        f'<header class="{theme}-header"><div class="{theme}-logo"><img class="{theme}-logo-img"></div>'
+        f'<ul class="{theme}-nav">{nav}</ul><form class="{theme}-search"><input class="{theme}-search-input">'
+        f'</form></header>'
+    )
+    blocks = "".join(
+        f'<section class="{theme}-{_word(rng)}"><div class="{theme}-{_word(rng)}"><p>{_word(rng)}</p></div></section>'
+        for _ in range(rng.randint(0, 6))
+    )
+    footer = f'<footer class="{theme}-footer"><p class="{theme}-copy">{theme}</p></footer>'
+    return header + blocks, footer
+
+
+def product_page(rng: random.Random, platform: str, theme: str) -> str:
+    block, _ = PLATFORMS[platform]
+    header, footer = theme_chrome(rng, theme)
+    product = block.format(
+        theme=theme, category=rng.choice(WORDS).title(), name=f"{rng.choice(WORDS).title()} {rng.randint(1, 5)}kg",
+        sku=str(rng.randint(10000, 999999)), brand=_word(rng).title(), price=f"{rng.randint(2, 90)},{rng.randint(0, 99):02d}",
+    )
+    return f"<html><head><title>{theme}</title></head><body>{header}{product}{footer}</body></html>"
+
+
+def custom_page(rng: random.Random, theme: str) -> Tuple[str, dict]:
+    """A one-off storefront with its own markup and schema"""
+    c = {k: f"{theme}-{_word(rng)}" for k in ("box", "name", "price", "sku")}
+    header, footer = theme_chrome(rng, theme)
+    product = (
+        f'<div class="{c["box"]}"><h1 class="{c["name"]}">{rng.choice(WORDS).title()}</h1>'
+        f'<span class="{c["sku"]}">{rng.randint(10000, 99999)}</span><b class="{c["price"]}">R$ 9,99</b></div>'
+    )
+    schema = {"name": theme, "baseSelector": f'.{c["box"]}', "fields": [
+        {"name": "product_name", "selector": f'.{c["name"]}', "type": "text"},
+        {"name": "current_price", "selector": f'.{c["price"]}', "type": "text"},
+        {"name": "sku", "selector": f'.{c["sku"]}', "type": "text"},
+    ]}
+    return f"<html><body>{header}{product}{footer}</body></html>", schema
+
+
+def build_merchants(rng: random.Random, count: int, custom: int) -> List[Tuple[str, str, str, dict]]:
+    """(merchant, platform, page html, true schema)"""
+    merchants = []
+    for i in range(count):
+        platform = list(PLATFORMS)[i % len(PLATFORMS)]
+        theme = f"m{i}{_word(rng)}"
+        merchants.append((theme, platform, product_page(rng, platform, theme), PLATFORMS[platform][1]))
+    for i in range(custom):
+        theme = f"c{i}{_word(rng)}"
+        html, schema = custom_page(rng, theme)
+        merchants.append((theme, "custom", html, schema))
+    rng.shuffle(merchants)
+    return merchants
+
+
+def bench_cost(pages: List[str], index_size: int):
+    real = [p.read_text(encoding="utf-8") for p in sorted((ROOT / "schema_cache").glob("debug_html_*.html"))]
+    for label, samples in (("saved pages", real), ("synthetic pages", pages[:20])):
+        if not samples:
+            continue
+        size = statistics.mean(len(h) for h in samples) / 1024
+        for name, fn in (("exact fingerprint", dom_fingerprint), ("simhash", dom_simhash)):
+            start = time.perf_counter()
+            for _ in range(10):
+                for html in samples:
+                    fn(html)
+            per_page = (time.perf_counter() - start) / (10 * len(samples))
+            print(f"  {label:<16} {name:<18} {per_page * 1000:6.2f} ms/page (avg {size:.1f} KB)")
+
+    rng = random.Random(1)
+    index = SimHashIndex()
+    for i in range(index_size):
+        index.add(f"k{i}", rng.getrandbits(64), "product")
+    probe = rng.getrandbits(64)
+    start = time.perf_counter()
+    for _ in range(200):
+        index.nearest(probe)
+    print(f"  index search over {index_size} schemas: {(time.perf_counter() - start) / 200 * 1e6:.1f} us")
+
+
+def bench_reuse(merchants, max_distance: int, candidates: int):
+    index = SimHashIndex()
+    schemas: Dict[str, Tuple[CompiledCssSchema, List[str], str]] = {}
+    llm_calls = reused = rejected = wrong_platform = 0
+    same, cross = [], []
+
+    hashes = {m: dom_simhash(html) for m, _, html, _ in merchants}
+    for i, (m1, p1, _, _) in enumerate(merchants):
+        for m2, p2, _, _ in merchants[i + 1:]:
+            (same if p1 == p2 and p1 != "custom" else cross).append(hamming(hashes[m1], hashes[m2]))
+
+    for merchant, platform, html, true_schema in merchants:
+        match = None
+        for key, _ in index.nearest(hashes[merchant], "product", max_distance, candidates):
+            compiled, required, source_platform = schemas[key]
+            if schema_fits_page(compiled, required, html):
+                match = source_platform
+                break
+            rejected += 1
+        if match is not None:
+            reused += 1
+            wrong_platform += match != platform
+            continue
+        llm_calls += 1
+        schemas[merchant] = (CompiledCssSchema(true_schema), required_fields(true_schema), platform)
+        index.add(merchant, hashes[merchant], "product")
+
+    print(f"  distance same platform: median {statistics.median(same):.0f} bits (max {max(same)}), "
+          f"other: median {statistics.median(cross):.0f} (min {min(cross)})")
+    print(f"  LLM calls: {llm_calls} of {len(merchants)} merchants "
+          f"({reused} avoided, {reused / len(merchants):.0%}); "
+          f"candidates rejected by validation: {rejected}; reused from another platform: {wrong_platform}")
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    merchants = build_merchants(rng, args.merchants, args.custom)
+    print("📋 Fingerprinting cost")
+    bench_cost([html for _, _, html, _ in merchants], args.index_size)
+    print(f"\n📋 Schema reuse, {args.merchants} platform merchants + {args.custom} custom, "
+          f"max distance {args.max_distance}")
+    bench_reuse(merchants, args.max_distance, args.candidates)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark DOM fingerprinting and cross-merchant schema reuse")
+    parser.add_argument("--merchants", type=int, default=60)
+    parser.add_argument("--custom", type=int, default=15)
+    parser.add_argument("--max-distance", type=int, default=DEFAULT_MAX_DISTANCE)
+    parser.add_argument("--candidates", type=int, default=DEFAULT_CANDIDATES, help="Schemas validated per page")
+    parser.add_argument("--index-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+HTML Pruning Benchmark
+
+On the saved debug pages (crawl4ai fit_html of real product pages):
+1. Input tokens sent for schema generation, before and after pruning, at
+   several token budgets, and the time pruning takes
+2. Whether the page's cached schema still finds the same values in the
+   pruned HTML (the product regions survived)
+3. With --llm-provider: schema generation latency on the full vs pruned
+   HTML, and whether each generated schema extracts name and price from
+   the full page
+
+Usage:
+    python benchmarks/bench_html_pruning.py --budgets 6000 3000 1500
+    python benchmarks/bench_html_pruning.py --llm-provider openai/gpt-4o-mini --api-token env:OPENAI_API_KEY
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from html_pruning import DEFAULT_TOKEN_BUDGET, estimate_tokens, prune_html
+from http_extraction import CompiledCssSchema, required_fields, required_fields_filled
+
+# Saved debug page -> its cached schema
+PAGES = {
+    "www_tendaatacado_com_br": "pattern_e356c73c623f2222d9ea0db203222829.json",
+    "mercado_carrefour_com_br": "pattern_fbe5bb7e032292c349bd6d0f01381576.json",
+}
+
+QUERY = "Create CSS selectors for the MAIN product's SKU, name, description, brand, package size, category and current price."
+
+
+def load_pages() -> Dict[str, Tuple[str, dict]]:
+    cache = ROOT / "schema_cache"
+    return {
+        name: (
+            (cache / f"debug_html_{name}.html").read_text(encoding="utf-8"),
+            json.loads((cache / pattern).read_text(encoding="utf-8")),
+        )
+        for name, pattern in PAGES.items()
+    }
+
+
+def _normalized(value: str) -> str:
+    # Pruning shortens long text; compare the start of each value
+    return " ".join(value.split())[:40]
+
+
+def same_values(schema: dict, html: str, pruned: str) -> bool:
+    compiled = CompiledCssSchema(schema)
+    before = [{k: _normalized(v) for k, v in item.items()} for item in compiled.extract(html)]
+    after = [{k: _normalized(v) for k, v in item.items()} for item in compiled.extract(pruned)]
+    return all(item in after for item in before if any(k.endswith("name") for k in item))
+
+
+def bench_pruning(pages: Dict[str, Tuple[str, dict]], budgets: List, repeat: int):
+    print("📋 Tokens sent for schema generation (estimated)")
+    for name, (html, schema) in pages.items():
+        print(f"  {name} ({len(html) / 1024:.1f} KB, ~{estimate_tokens(html)} tokens)")
+        for budget in budgets:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                result = prune_html(html, budget)
+            per_page = (time.perf_counter() - start) / repeat
+            label = "no budget" if budget is None else f"budget {budget}"
+            kept = "same values" if same_values(schema, html, result.html) else "VALUES LOST"
+            print(f"    {label:<12} ~{result.tokens_after:>6} tokens  -{result.reduction:4.0%}  "
+                  f"{len(result.html) / 1024:5.1f} KB  {per_page * 1000:5.1f}ms  cached schema: {kept}")
+
+
+def bench_generation(pages: Dict[str, Tuple[str, dict]], provider: str, api_token: str, budget: int):
+    from crawl4ai import JsonCssExtractionStrategy, LLMConfig
+
+    llm_config = LLMConfig(provider=provider, api_token=api_token)
+    print(f"\n📋 Schema generation with {provider}")
+    for name, (html, _) in pages.items():
+        for label, text in (("full", html), ("pruned", prune_html(html, budget).html)):
+            start = time.perf_counter()
+            try:
+                schema = JsonCssExtractionStrategy.generate_schema(html=text, query=QUERY, llm_config=llm_config)
+                error = None
+            except Exception as e:
+                schema, error = None, f"{type(e).__name__}: {e}"
+            elapsed = time.perf_counter() - start
+            if schema:
+                products = CompiledCssSchema(schema).extract(html)
+                outcome = "name+price found" if required_fields_filled(products, required_fields(schema)) else "fields missing"
+            else:
+                outcome = error or "no schema"
+            print(f"  {name:<26} {label:<7} ~{estimate_tokens(text):>6} tokens  {elapsed:6.1f}s  {outcome}")
+
+
+def main(args):
+    pages = load_pages()
+    budgets = [None] + [b for b in args.budgets]
+    bench_pruning(pages, budgets, args.repeat)
+    if args.llm_provider:
+        bench_generation(pages, args.llm_provider, args.api_token, args.budgets[0])
+    else:
+        print("\nSchema generation latency not measured (pass --llm-provider)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark HTML pruning before LLM schema generation")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[DEFAULT_TOKEN_BUDGET, 3000, 1500])
+    parser.add_argument("--repeat", type=int, default=10, help="Pruning runs per page and budget")
+    parser.add_argument("--llm-provider", help="e.g. openai/gpt-4o-mini; measures generation latency")
+    parser.add_argument("--api-token", default="env:OPENAI_API_KEY")
+    main(parser.parse_args())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+HTTP Extraction Benchmark
+
+Throughput of applying the cached schemas without a browser:
+1. Parse + extract only: compiled lxml schema vs BeautifulSoup select_one
+   per field (what JsonCssExtractionStrategy does on the browser's HTML)
+2. End to end: pages/s fetched over HTTP and extracted, against a local
+   stand-in server serving the saved debug pages, optionally compared with
+   the pooled browser path (--browser)
+
+Usage:
+    python benchmarks/bench_http_extraction.py --pages 500 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import warnings
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from aiohttp import web
+from bs4 import BeautifulSoup
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from http_extraction import CompiledCssSchema, HttpSchemaExtractor, required_fields, required_fields_filled
+
+# Saved debug page -> its cached schema
+PAGES = {
+    "www_tendaatacado_com_br": "pattern_e356c73c623f2222d9ea0db203222829.json",
+    "mercado_carrefour_com_br": "pattern_fbe5bb7e032292c349bd6d0f01381576.json",
+}
+
+
+def load_pages() -> Dict[str, Tuple[str, dict]]:
+    cache = ROOT / "schema_cache"
+    pages = {}
+    for name, pattern in PAGES.items():
+        html = (cache / f"debug_html_{name}.html").read_text(encoding="utf-8")
+        schema = json.loads((cache / pattern).read_text(encoding="utf-8"))
+        pages[name] = (html, schema)
+    return pages
+
+
+def extract_bs4(html: str, schema: dict) -> List[dict]:
+    soup = BeautifulSoup(html, "html.parser")
+    items = []
+    for element in soup.select(schema["baseSelector"]):
+        item = {}
+        for field in schema["fields"]:
+            try:
+                match = element.select_one(field["selector"])
+            except Exception:
+                match = None
+            text = match.get_text(strip=True) if match is not None else ""
+            if text:
+                item[field["name"]] = text
+        if item:
+            items.append(item)
+    return items
+
+
+def bench_parse(pages: Dict[str, Tuple[str, dict]], repeat: int):
+    print(f"📋 Parse + extract, {repeat} runs per page")
+    for name, (html, schema) in pages.items():
+        compiled = CompiledCssSchema(schema)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            lxml_items = compiled.extract(html)
+        lxml_s = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            bs4_items = extract_bs4(html, schema)
+        bs4_s = (time.perf_counter() - start) / repeat
+
+        same = "same output" if lxml_items == bs4_items else "OUTPUT DIFFERS"
+        print(f"  {name:<26} {len(html) / 1024:6.1f} KB  lxml {lxml_s * 1000:6.2f}ms  "
+              f"bs4 {bs4_s * 1000:6.2f}ms  ({bs4_s / lxml_s:.1f}x, {same})")
+
+
+async def start_server(pages: Dict[str, Tuple[str, dict]], port: int) -> web.AppRunner:
+    async def handler(request):
+        html, _ = pages[request.match_info["name"]]
+        return web.Response(text=html, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{name}/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "localhost", port).start()
+    return runner
+
+
+async def bench_http(pages, urls: List[Tuple[str, str]], concurrency: int) -> Tuple[float, int]:
+    semaphore = asyncio.Semaphore(concurrency)
+    filled = 0
+
+    async with HttpSchemaExtractor() as extractor:
+        async def run(name: str, url: str):
+            nonlocal filled
+            schema = pages[name][1]
+            async with semaphore:
+                products = await extractor.extract(url, schema)
+            filled += required_fields_filled(products, required_fields(schema))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(run(name, url) for name, url in urls))
+        return time.perf_counter() - start, filled
+
+
+async def bench_browser(pages, urls: List[Tuple[str, str]], concurrency: int) -> float:
+    from crawl4ai import BrowserConfig, CacheMode, CrawlerRunConfig, JsonCssExtractionStrategy
+    from browser_pool import BrowserPool
+
+    browser_config = BrowserConfig(headless=True, java_script_enabled=True, verbose=False)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with BrowserPool(browser_config, max_tabs=concurrency) as pool:
+        async def run(name: str, url: str):
+            config = CrawlerRunConfig(
+                cache_mode=CacheMode.BYPASS,
+                extraction_strategy=JsonCssExtractionStrategy(pages[name][1]),
+                verbose=False,
+            )
+            async with semaphore:
+                await pool.arun(url, config=config)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(run(name, url) for name, url in urls))
+        return time.perf_counter() - start
+
+
+async def main(args):
+    pages = load_pages()
+    bench_parse(pages, args.repeat)
+
+    runner = await start_server(pages, args.port)
+    names = list(pages)
+    urls = [(names[i % len(names)], f"http://localhost:{args.port}/{names[i % len(names)]}/produto-{i}")
+            for i in range(args.pages)]
+    try:
+        print(f"\n📋 End to end, {args.pages} pages, concurrency {args.concurrency}")
+        elapsed, filled = await bench_http(pages, urls, args.concurrency)
+        print(f"  http     {args.pages / elapsed:8.1f} pages/s  ({filled}/{args.pages} with name and price)")
+        if args.browser:
+            browser_pages = urls[:args.browser_pages]
+            elapsed_browser = await bench_browser(pages, browser_pages, args.concurrency)
+            rate = len(browser_pages) / elapsed_browser
+            print(f"  browser  {rate:8.1f} pages/s  (http is {args.pages / elapsed / rate:.0f}x faster)")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    warnings.filterwarnings("ignore", category=FutureWarning)  # soupsieve's :contains() notice
+    parser = argparse.ArgumentParser(description="Benchmark browser-free schema extraction")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=50, help="Parse runs per page")
+    parser.add_argument("--browser", action="store_true", help="Also measure the pooled browser path")
+    parser.add_argument("--browser-pages", type=int, default=40)
+    parser.add_argument("--port", type=int, default=8767)
+    asyncio.run(main(parser.parse_args()))
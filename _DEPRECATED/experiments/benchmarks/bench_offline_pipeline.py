@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Offline Pipeline Benchmark
+
+End-to-end ProductExtractionPipeline runs with no network and no API key:
+- Recorded pages (the saved debug pages, plus synthetic VTEX/Magento/SFCC-like
+  and custom merchants) are served by a local page server; every merchant
+  gets its own host name, all resolved to localhost
+- Schema generation goes to the local LLM stand-in (llm_standin.py), which
+  answers with canned schemas after a configurable latency and fails a
+  configurable share of requests
+- The "browser" renders recorded pages too: fetched from the page server
+  after --browser-latency seconds, extracted with the compiled schema
+
+Two passes over different URLs of the same merchants: a cold one (empty
+schema cache, every template needs a schema) and a warm one (new pipeline
+instance on the same cache directories). Each reports throughput, LLM
+calls and failures, schema cache hit rate and extraction modes.
+
+Usage:
+    python benchmarks/bench_offline_pipeline.py --merchants 30 --pages-per-merchant 20 --failure-rate 0.1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Tuple
+
+import aiohttp
+from aiohttp import web
+from aiohttp.abc import AbstractResolver
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from bench_dom_similarity import PLATFORMS, custom_page, product_page
+from http_extraction import DEFAULT_HEADERS, CompiledCssSchema, required_fields_filled
+from llm_standin import StandInLLM, load_canned_schemas, start_standin
+from product_extraction_pipeline import ProductExtractionPipeline
+
+RECORDED = {
+    "tenda.test": "debug_html_www_tendaatacado_com_br.html",
+    "carrefour.test": "debug_html_mercado_carrefour_com_br.html",
+}
+
+
+class LocalResolver(AbstractResolver):
+    """Resolves every host name to localhost"""
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        return [{"hostname": host, "host": "127.0.0.1", "port": port,
+                 "family": socket.AF_INET, "proto": 0, "flags": socket.AI_NUMERICHOST}]
+
+    async def close(self):
+        pass
+
+
+class RecordedPages:
+    """Page HTML per merchant host; synthetic platform pages vary per path"""
+
+    def __init__(self, merchants: int, custom: int, seed: int):
+        rng = random.Random(seed)
+        self.static: Dict[str, str] = {
+            host: (ROOT / "schema_cache" / name).read_text(encoding="utf-8") for host, name in RECORDED.items()
+        }
+        self.platform: Dict[str, Tuple[str, str]] = {}
+        self.schemas: Dict[str, dict] = {}
+        for i in range(merchants):
+            platform = list(PLATFORMS)[i % len(PLATFORMS)]
+            self.platform[f"shop{i}.test"] = (platform, f"m{i}")
+            self.schemas[platform] = PLATFORMS[platform][1]
+        for i in range(custom):
+            html, schema = custom_page(rng, f"c{i}")
+            self.static[f"custom{i}.test"] = html
+            self.schemas[f"custom{i}"] = schema
+
+    @property
+    def hosts(self) -> List[str]:
+        return list(self.static) + list(self.platform)
+
+    def html(self, host: str, path: str) -> str:
+        if host in self.static:
+            return self.static[host]
+        platform, theme = self.platform[host]
+        return product_page(random.Random(f"{host}{path}"), platform, theme)
+
+
+async def start_page_server(pages: RecordedPages, port: int) -> web.AppRunner:
+    async def handler(request):
+        return web.Response(text=pages.html(request.host.split(":")[0], request.path), content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "localhost", port).start()
+    return runner
+
+
+class OfflinePipeline(ProductExtractionPipeline):
+    """Pipeline whose browser renders recorded pages"""
+
+    browser_latency = 0.5
+
+    async def _crawl(self, url: str, config):
+        await asyncio.sleep(self.browser_latency)
+        html = await self.http_extractor.fetch(url)
+        strategy = getattr(config, "extraction_strategy", None)
+        products = CompiledCssSchema(strategy.schema).extract(html) if html and strategy else []
+        return SimpleNamespace(
+            success=html is not None, fit_html=html, html=html,
+            extracted_content=json.dumps(products), error_message=None if html else "fetch failed",
+        )
+
+
+async def run_pass(label: str, urls: List[str], workdir: Path, llm: StandInLLM, args) -> None:
+    pipeline = OfflinePipeline(
+        cache_dir=str(workdir / "schema_cache"),
+        association_file=str(workdir / "url_patterns.json"),
+        template_cache_dir=str(workdir / "template_cache"),
+        llm_provider="local/standin",
+        llm_base_url=f"http://localhost:{args.llm_port}/v1",
+        concurrency=args.concurrency,
+        per_domain_concurrency=args.per_domain_concurrency,
+    )
+    pipeline.browser_latency = args.browser_latency
+    pipeline.http_extractor.session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(resolver=LocalResolver(), limit=0),
+        headers=DEFAULT_HEADERS, timeout=pipeline.http_extractor.timeout,
+    )
+    requests_before, failures_before = llm.stats["requests"], llm.stats["failures"]
+
+    complete = errors = 0
+    log = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else log):
+        async for outcome in pipeline.iter_process_urls(urls):
+            errors += not outcome.ok
+            complete += required_fields_filled(outcome.products, ["name", "price"]) or required_fields_filled(
+                outcome.products, ["product_name", "current_price"])
+    elapsed = time.perf_counter() - start
+    await pipeline.schema_provider.close()
+    await pipeline.http_extractor.__aexit__(None, None, None)
+
+    cache = pipeline.schema_cache.stats
+    lookups = sum(cache.values())
+    print(f"\n📋 {label}: {len(urls)} pages in {elapsed:.1f}s ({len(urls) / elapsed:.1f} pages/s)")
+    print(f"  complete (name + price): {complete}/{len(urls)}, errors: {errors}")
+    print(f"  LLM calls: {llm.stats['requests'] - requests_before} "
+          f"({llm.stats['failures'] - failures_before} failed), "
+          f"~{pipeline.llm_stats['input_tokens']} prompt tokens, {pipeline.llm_stats['seconds']:.1f}s waiting")
+    print(f"  schema cache: {cache}, hit rate {(cache['hits'] + cache['joined']) / lookups:.0%}" if lookups
+          else "  schema cache: not used")
+    stats = pipeline.schema_stats
+    print(f"  schemas generated/reused: {stats['generated']}/{stats['reused']}, degraded: {stats['degraded']} "
+          f"(regenerated {stats['regenerated']}, kept {stats['regeneration_failed']})")
+    print(f"  extraction modes: {pipeline.mode_stats}")
+
+
+async def main(args):
+    pages = RecordedPages(args.merchants, args.custom, args.seed)
+    schemas = {**load_canned_schemas(ROOT / "schema_cache"), **pages.schemas}
+    llm = StandInLLM(schemas, args.latency, args.per_1k_tokens, args.failure_rate, args.seed)
+
+    def urls(offset: int) -> List[str]:
+        return [f"http://{host}:{args.page_port}/produto/item-{offset + i}"
+                for i in range(args.pages_per_merchant) for host in pages.hosts]
+
+    page_server = await start_page_server(pages, args.page_port)
+    llm_server = await start_standin(llm, port=args.llm_port)
+    print(f"🤖 {len(pages.hosts)} merchants, stand-in LLM: {args.latency}s + {args.per_1k_tokens}s/1k tokens, "
+          f"failure rate {args.failure_rate:.0%}; browser {args.browser_latency}s/page")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            await run_pass("Cold cache", urls(1000), Path(tmp), llm, args)
+            await run_pass("Warm cache", urls(5000), Path(tmp), llm, args)
+    finally:
+        await llm_server.cleanup()
+        await page_server.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark against a local LLM stand-in")
+    parser.add_argument("--merchants", type=int, default=30, help="Synthetic platform merchants")
+    parser.add_argument("--custom", type=int, default=6, help="Synthetic custom-markup merchants")
+    parser.add_argument("--pages-per-merchant", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--per-domain-concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=1.0, help="Stand-in LLM seconds per reply")
+    parser.add_argument("--per-1k-tokens", type=float, default=0.1)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--browser-latency", type=float, default=0.5)
+    parser.add_argument("--page-port", type=int, default=8798)
+    parser.add_argument("--llm-port", type=int, default=8799)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+    asyncio.run(main(parser.parse_args()))
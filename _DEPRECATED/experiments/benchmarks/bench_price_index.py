@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Price Index Benchmark
+
+Synthetic daily observations (products x days, each product seen on most
+days, some twice, a few off by 100x (extraction errors)) in the shape of a
+PriceStore scan, with synthetic category weights:
+1. Full build: PriceIndex.compute() over the whole history, observations/s
+2. Incremental update: the last --incremental-days days added one at a
+   time with add_day() onto an index built from the days before, and the
+   largest difference from the full build's levels
+3. A pandas groupby/merge implementation of the same index over the first
+   --reference-days days, as reference for speed and agreement
+
+Usage:
+    python benchmarks/bench_price_index.py --products 75000 --days 365 --incremental-days 30
+"""
+
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from price_index import EPOCH, MAX_ABS_LOG_CHANGE, PriceIndex
+
+START = date(2025, 1, 1)
+
+
+class Observations:
+    """Daily prices of a fixed catalog: random walk per product with occasional sales"""
+
+    def __init__(self, merchants: int, products: int, categories: int, seed: int):
+        self.rng = np.random.default_rng(seed)
+        self.merchants = pa.array([f"merchant{m:02d}.com.br" for m in range(merchants)])
+        self.product_ids = pa.array([f"sku-{p:07d}" for p in range(products)])
+        self.category_names = pa.array([f"category-{c:03d}" for c in range(categories)])
+        self.merchant_index = self.rng.integers(0, merchants, products).astype(np.int32)
+        self.category_index = self.rng.integers(0, categories, products).astype(np.int32)
+        self.log_price = np.log(self.rng.uniform(2, 80, products))
+        self.weights = dict(zip(self.category_names.to_pylist(), self.rng.dirichlet(np.ones(categories)) * 100))
+
+    def day(self, day: date, coverage: float, duplicates: float, errors: float) -> pa.Table:
+        n = len(self.log_price)
+        self.log_price += self.rng.normal(0.0002, 0.004, n)
+        on_sale = self.rng.random(n) < 0.03
+        seen = np.flatnonzero(self.rng.random(n) < coverage).astype(np.int32)
+        seen = np.concatenate([seen, seen[self.rng.random(len(seen)) < duplicates]])
+        log_price = self.log_price[seen] - np.where(on_sale[seen], 0.15, 0.0)
+        log_price += np.where(self.rng.random(len(seen)) < errors, np.log(100.0), 0.0)
+        return pa.table({
+            "observed_date": pa.array(np.full(len(seen), (day - EPOCH).days, dtype=np.int32)).cast(pa.date32()),
+            "merchant": pa.DictionaryArray.from_arrays(self.merchant_index[seen], self.merchants),
+            "product_id": pa.DictionaryArray.from_arrays(seen, self.product_ids),
+            "category": pa.DictionaryArray.from_arrays(self.category_index[seen], self.category_names),
+            "price": np.round(np.exp(log_price), 2),
+        })
+
+
+def pandas_reference(table: pa.Table, weights) -> pd.DataFrame:
+    """Same index with pandas groupby and merge on the previous day"""
+    frame = table.to_pandas()
+    frame["log_price"] = np.log(frame["price"])
+    daily = frame.groupby(["merchant", "product_id", "observed_date"], observed=True, as_index=False).agg(
+        category=("category", "first"), log_price=("log_price", "mean"))
+    previous = daily[["merchant", "product_id", "observed_date", "log_price"]].copy()
+    previous["observed_date"] = previous["observed_date"] + timedelta(days=1)
+    pairs = daily.merge(previous, on=["merchant", "product_id", "observed_date"], suffixes=("", "_previous"))
+    pairs["change"] = pairs["log_price"] - pairs["log_price_previous"]
+    pairs = pairs[pairs["change"].abs() <= MAX_ABS_LOG_CHANGE]
+    log_relative = pairs.groupby(["observed_date", "category"], observed=True)["change"].mean().unstack()
+    days = sorted(daily["observed_date"].unique())
+    log_relative = log_relative.reindex(days)
+    levels = 100.0 * np.exp(log_relative.fillna(0.0).cumsum())
+    # All items: weighted mean log relative over the categories matched each day
+    w = log_relative.notna() * pd.Series(weights)[log_relative.columns]
+    levels["all_items"] = 100.0 * np.exp(((log_relative.fillna(0.0) * w).sum(axis=1) / w.sum(axis=1)).fillna(0.0).cumsum())
+    return levels
+
+
+def main(args):
+    observations = Observations(args.merchants, args.products, args.categories, args.seed)
+    days = [START + timedelta(days=i) for i in range(args.days)]
+    start = time.perf_counter()
+    tables = [observations.day(day, args.coverage, args.duplicates, args.errors) for day in days]
+    history = pa.concat_tables(tables)
+    print(f"📋 {history.num_rows:,} observations: {args.products:,} products x {args.days} days, "
+          f"{args.categories} categories (generated in {time.perf_counter() - start:.1f}s)")
+
+    start = time.perf_counter()
+    full = PriceIndex(observations.weights)
+    full.compute(history)
+    elapsed = time.perf_counter() - start
+    print(f"  full build:   {elapsed:6.2f}s  {history.num_rows / elapsed:>12,.0f} observations/s")
+    levels = full.levels()
+    print(f"  all-items index on {days[-1]}: {levels['all_items'].iloc[-1]:.2f}")
+
+    k = min(args.incremental_days, args.days - 1)
+    index = PriceIndex(observations.weights)
+    index.compute(pa.concat_tables(tables[:-k]))
+    timings = []
+    for day, table in zip(days[-k:], tables[-k:]):
+        start = time.perf_counter()
+        index.add_day(table, day)
+        timings.append(time.perf_counter() - start)
+    diff = np.abs(index.levels().to_numpy() - levels.to_numpy()).max()
+    print(f"  incremental:  {np.mean(timings):6.3f}s per day (max {max(timings):.3f}s), "
+          f"~{np.mean([len(t) for t in tables[-k:]]):,.0f} observations/day, "
+          f"{index.last_seen.num_rows:,} last prices in state")
+    print(f"  incremental == full build: max level difference {diff:.2e}")
+
+    n = min(args.reference_days, args.days)
+    subset = pa.concat_tables(tables[:n])
+    start = time.perf_counter()
+    reference = pandas_reference(subset, observations.weights)
+    reference_time = time.perf_counter() - start
+    start = time.perf_counter()
+    vectorized = PriceIndex(observations.weights)
+    vectorized.compute(subset)
+    vectorized_time = time.perf_counter() - start
+    mine = vectorized.levels()[reference.columns]
+    print(f"  pandas groupby/merge reference, {n} days ({subset.num_rows:,} observations): {reference_time:.2f}s "
+          f"vs {vectorized_time:.2f}s; max level difference {np.abs(mine.to_numpy() - reference.to_numpy()).max():.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the chained Jevons price index")
+    parser.add_argument("--merchants", type=int, default=10)
+    parser.add_argument("--products", type=int, default=75_000)
+    parser.add_argument("--categories", type=int, default=120)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--coverage", type=float, default=0.9, help="Share of products observed each day")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="Share of observations seen twice a day")
+    parser.add_argument("--errors", type=float, default=0.0001, help="Share of observations off by 100x")
+    parser.add_argument("--incremental-days", type=int, default=30)
+    parser.add_argument("--reference-days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
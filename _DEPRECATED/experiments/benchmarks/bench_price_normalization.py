@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Price Normalization Benchmark
+
+Synthetic pt-BR price and package-size strings in the shapes extracted from
+merchant pages ("R$ 4,65 un", "de R$ 10,99 por R$ 8,99", "R$ 29,90/kg",
+"6x330ml", "Arroz Tipo 1 5kg" as a product name with no size field):
+1. Hand-written pt-BR edge cases (installments, fractions, thousands
+   separators) checked against their expected values
+2. Records/s of the batched parser (price_normalization.normalize) at
+   several batch sizes
+3. Records/s of a per-record parser with precompiled regexes, as reference
+4. Agreement of the two on every record of the reference run
+
+Usage:
+    python benchmarks/bench_price_normalization.py --records 1000000 --batch-sizes 1000 100000 1000000
+"""
+
+import argparse
+import math
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from price_normalization import (
+    UNITS, DIM_COUNT, DIM_MASS, DIM_MULTIPLIER, DIM_VOLUME, INSTALLMENT_WORDS, MAX_INSTALLMENT_GAP, normalize
+)
+
+PRICES = [
+    "R$ {a},{c:02d}",
+    "R$ {a},{c:02d} un",
+    "de R$ {b},{c:02d} por R$ {a},{c:02d}",
+    "R$ {k}.{a:03d},{c:02d}",
+    "R$ {a},{c:02d}/kg",
+    "R$\xa0{a},{c:02d}",
+    "Por: R$ {a},{c:02d} cada",
+    "R$ {b},{c:02d} à vista ou {p}x de R$ {a},{c:02d}",
+    "{p}x de R$ {a},{c:02d} sem juros",
+    "R$ {a},{c:02d} (R$ {b},{c:02d}/kg)",
+    "",
+]
+SIZES = ["{n}L", "{p}x{m}ml", "{m} g", "{p} unidades", "{n},5 kg", "{p} latas {m} ml", "{m}ml", "1/{n} kg", "", ""]
+
+# (price text, size text, regular, sale, was, pack count, grams / millilitres / items, unit price)
+EDGE_CASES = [
+    ("R$ 8,99 à vista ou 2x de R$ 4,50", "500 g", 8.99, None, None, 1, 500, 17.98),
+    ("de R$ 10,99 por R$ 8,99 ou 3x de R$ 3,00 sem juros", "6x330ml", None, 8.99, 10.99, 6, 1980, 8.99 / 1.98),
+    ("R$ 1.299,00 em até 12 parcelas de R$ 108,25", "12 unidades", 1299.0, None, None, 1, 12, 108.25),
+    ("10x de R$ 12,90 sem juros", "", None, None, None, None, None, None),
+    ("R$\xa04,65 un", "1/2 kg", 4.65, None, None, 1, 500, 9.30),
+    ("Por: R$ 2,49 cada", "2x 1/4 kg", 2.49, None, None, 2, 500, 4.98),
+    ("R$ 29,90/kg", "1,5 kg", 29.9, None, None, 1, 1500, 29.9),
+    ("R$ 3.999", "1.000 ml", 3999.0, None, None, 1, 1000, 3999.0),
+    ("R$ 3,49 (R$ 6,98/kg)", "1.5L", 3.49, None, None, 1, 1500, 3.49 / 1.5),
+]
+NAMES = ["Arroz Tipo 1 Camil {n}kg", "Leite Integral Piracanjuba {n}L", "Biscoito Recheado {m}g", "Detergente Ypê"]
+
+
+def records(count: int, seed: int) -> Tuple[List[str], List[str], List[str]]:
+    rng = random.Random(seed)
+    prices, sizes, names = [], [], []
+    for _ in range(count):
+        a, k = rng.randint(1, 99), rng.randint(1, 9)
+        values = dict(a=a, b=a + rng.randint(1, 20), c=rng.randint(0, 99), k=k,
+                      n=rng.randint(1, 5), m=rng.choice([90, 200, 330, 350, 500, 900]), p=rng.choice([2, 6, 12]))
+        prices.append(rng.choice(PRICES).format(**values))
+        sizes.append(rng.choice(SIZES).format(**values))
+        names.append(rng.choice(NAMES).format(**values))
+    return prices, sizes, names
+
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+_PRICE = re.compile(r"(R\$\s?)?(\d+(?:[.,]\d+)*)")
+_PER_UNIT = re.compile(r"\s?/(\d+(?:[.,]\d+)*)?([a-zA-Z]+)")
+_QUANTITY = re.compile(r"(?:(\d+(?:[.,]\d+)*)/)?(\d+(?:[.,]\d+)*)[\s\xa0]?([a-zA-Z]{1,8})(?![a-zA-Z])")
+_INSTALLMENT = re.compile(r"\d[\s\xa0]?(?i:%s)(?![a-zA-Z])\D*$" % "|".join(INSTALLMENT_WORDS))
+
+
+def _number(text: str) -> Tuple[float, int]:
+    last = max(text.rfind(","), text.rfind("."))
+    decimals = len(text) - last - 1 if last >= 0 and len(text) - last - 1 <= 2 else 0
+    digits = re.sub(r"[.,]", "", text)
+    return int(digits) / 10 ** decimals, decimals
+
+
+def reference_price(text: str) -> Tuple[Optional[float], Optional[float], Optional[float], Optional[float]]:
+    """(regular, sale, was, quoted unit price) of one price string"""
+    found, per_unit, quoted = [], [], None
+    for match in _PRICE.finditer(text):
+        value, decimals = _number(match.group(2))
+        installment = _INSTALLMENT.search(text, 0, match.start(2))
+        if installment and match.start(2) - installment.start() <= MAX_INSTALLMENT_GAP:
+            continue
+        if decimals or match.group(1):
+            per = _PER_UNIT.match(text, match.end())
+            if per and per.group(2).lower() in UNITS:
+                dim, factor = UNITS[per.group(2).lower()]
+                quantity = (_number(per.group(1))[0] if per.group(1) else 1.0) * factor
+                quoted = value / quantity * (1.0 if dim == DIM_COUNT else 1000.0)
+                per_unit.append(value)
+            else:
+                found.append(value)
+    # A unit price is the price only if there's no other
+    found = found or per_unit
+    if not found:
+        return None, None, None, quoted
+    if max(found) > min(found):
+        return None, min(found), max(found), quoted
+    return found[0], None, None, quoted
+
+
+def reference_size(text: str) -> Optional[Tuple[float, float]]:
+    """(pack count, grams / millilitres / items) of one size string"""
+    quantities = []
+    for match in _QUANTITY.finditer(text):
+        unit = UNITS.get(match.group(3).lower())
+        if unit:
+            value = _number(match.group(2))[0]
+            if match.group(1) and value:
+                value = _number(match.group(1))[0] / value
+            quantities.append((match, value, unit))
+    for i, (match, value, (dim, factor)) in enumerate(quantities):
+        if dim in (DIM_MASS, DIM_VOLUME):
+            pack = 1.0
+            if i and quantities[i - 1][2][0] in (DIM_MULTIPLIER, DIM_COUNT) and not _NUMBER.search(
+                    text, quantities[i - 1][0].end(), match.start()):
+                pack = quantities[i - 1][1]
+            return pack, value * factor
+    for match, value, (dim, factor) in quantities:
+        if dim == DIM_COUNT:
+            return 1.0, value
+    return None
+
+
+def reference_normalize(prices: List[str], sizes: List[str], names: List[str]):
+    out = []
+    for price, size, name in zip(prices, sizes, names):
+        regular, sale, was, quoted = reference_price(price)
+        out.append((regular, sale, was, quoted, reference_size(size) or reference_size(name)))
+    return out
+
+
+def _same(a: Optional[float], b: float) -> bool:
+    return (a is None and math.isnan(b)) or (a is not None and abs(a - b) < 1e-6 * max(1.0, abs(a)))
+
+
+def agreement(reference, batch) -> int:
+    prices, sizes = batch.prices, batch.sizes
+    quantity = sizes.base_quantity
+    agree = 0
+    for i, (regular, sale, was, quoted, size) in enumerate(reference):
+        same = (_same(regular, prices.regular_price[i]) and _same(sale, prices.sale_price[i])
+                and _same(was, prices.was_price[i]) and _same(quoted, prices.quoted_unit_price[i]))
+        if size is None:
+            same &= math.isnan(sizes.size_value[i])
+        else:
+            same &= _same(size[0], sizes.pack_count[i]) and _same(size[0] * size[1], quantity[i])
+        agree += same
+    return agree
+
+
+def check_edge_cases() -> int:
+    """Print the edge cases the batched parser gets wrong; returns how many it gets right"""
+    batch = normalize([c[0] for c in EDGE_CASES], [c[1] for c in EDGE_CASES])
+    prices, sizes = batch.prices, batch.sizes
+    quantity = sizes.base_quantity
+    right = 0
+    for i, (price, size, regular, sale, was, pack, total, unit_price) in enumerate(EDGE_CASES):
+        got = tuple(float(c[i]) for c in (prices.regular_price, prices.sale_price, prices.was_price,
+                                           sizes.pack_count, quantity, batch.unit_price))
+        if pack is None:
+            ok = math.isnan(sizes.size_value[i])
+        else:
+            ok = _same(pack, got[3]) and _same(total, got[4])
+        ok &= _same(regular, got[0]) and _same(sale, got[1]) and _same(was, got[2]) and _same(unit_price, got[5])
+        right += ok
+        if not ok:
+            print(f"  ❌ {price!r} / {size!r}: expected {(regular, sale, was, pack, total, unit_price)}, got {got}")
+    return right
+
+
+def main(args):
+    right = check_edge_cases()
+    print(f"{'✅' if right == len(EDGE_CASES) else '❌'} edge cases: {right}/{len(EDGE_CASES)} as expected")
+
+    prices, sizes, names = records(args.records, args.seed)
+    print(f"📋 {args.records:,} records")
+
+    for batch_size in args.batch_sizes:
+        best = math.inf
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for i in range(0, len(prices), batch_size):
+                normalize(prices[i:i + batch_size], sizes[i:i + batch_size], names[i:i + batch_size])
+            best = min(best, time.perf_counter() - start)
+        print(f"  batched, {batch_size:>9,} per batch: {best:6.2f}s  {len(prices) / best:>12,.0f} records/s")
+
+    count = min(args.reference_records, len(prices))
+    start = time.perf_counter()
+    reference = reference_normalize(prices[:count], sizes[:count], names[:count])
+    elapsed = time.perf_counter() - start
+    print(f"  per-record regex reference:       {elapsed:6.2f}s  {count / elapsed:>12,.0f} records/s "
+          f"({count:,} records)")
+
+    agree = agreement(reference, normalize(prices[:count], sizes[:count], names[:count]))
+    print(f"  batched == reference: {agree:,}/{count:,} records")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batched price and package-size normalization")
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1000, 100_000, 1_000_000])
+    parser.add_argument("--reference-records", type=int, default=200_000, help="Records parsed by the regex reference")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per batch size (best is reported)")
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
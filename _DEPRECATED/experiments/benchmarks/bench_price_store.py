@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Price Store Benchmark
+
+A year of synthetic daily price observations (merchants x products x days,
+several extraction runs per day) written to a PriceStore, then:
+1. Write throughput and the small files left by per-run writes
+2. Query times before and after compaction:
+   - one category across all merchants for the whole year (row groups
+     skipped by their category statistics)
+   - two merchants over one month (partitions pruned by directory)
+   - daily mean price of a category over the year
+3. The same one-category query over row-per-JSON files (JSONL, one object
+   per observation) for --jsonl-days days, extrapolated to the year
+
+Usage:
+    python benchmarks/bench_price_store.py --merchants 10 --products 2000 --days 365 --runs-per-day 2
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from price_store import PriceStore
+
+START = date(2025, 1, 1)
+
+
+class Observations:
+    """Daily prices of a fixed product catalog per merchant (random walk per product)"""
+
+    def __init__(self, merchants: int, products: int, categories: int, seed: int):
+        self.rng = np.random.default_rng(seed)
+        self.merchants = [f"merchant{m:02d}.com.br" for m in range(merchants)]
+        self.categories = [f"category-{c:02d}" for c in range(categories)]
+        n = merchants * products
+        self.merchant_index = np.repeat(np.arange(merchants, dtype=np.int32), products)
+        self.product_ids = pa.array([f"{m}-{p:06d}" for m in range(merchants) for p in range(products)])
+        self.category_index = self.rng.integers(0, categories, n).astype(np.int32)
+        self.log_price = np.log(self.rng.uniform(2, 80, n))
+
+    def day(self, day: date, runs: int):
+        """One table per extraction run of the day, each with part of the catalog"""
+        self.log_price += self.rng.normal(0.0002, 0.01, len(self.log_price))
+        run_of_row = self.rng.integers(0, runs, len(self.log_price))
+        midnight = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+        for run in range(runs):
+            rows = np.flatnonzero(run_of_row == run).astype(np.int32)
+            observed = midnight + timedelta(hours=6 + run * 12 // max(runs, 1))
+            price = np.round(np.exp(self.log_price[rows]), 2)
+            yield pa.table({
+                "observed_at": pa.array(np.full(len(rows), np.datetime64(observed.replace(tzinfo=None), "us"))),
+                "merchant": pa.DictionaryArray.from_arrays(self.merchant_index[rows], self.merchants),
+                "product_id": pa.DictionaryArray.from_arrays(rows, self.product_ids),
+                "category": pa.DictionaryArray.from_arrays(self.category_index[rows], self.categories),
+                "price": price,
+                "regular_price": price,
+                "currency": pa.array(["BRL"] * len(rows)),
+            })
+
+
+def timed(label: str, query, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = query()
+        best = min(best, time.perf_counter() - start)
+    print(f"    {label:<46} {best:7.2f}s  {result.num_rows:>11,} rows")
+    return result
+
+
+def run_queries(store: PriceStore, observations: Observations, days: int):
+    category = observations.categories[0]
+    end = START + timedelta(days=days - 1)
+    timed(f"{category}, all merchants, {days} days",
+          lambda: store.scan(categories=[category], columns=["observed_date", "merchant", "product_id", "price"]))
+    month_end = min(START + timedelta(days=30), end)
+    timed("2 merchants, 1 month, all categories",
+          lambda: store.scan(start=START, end=month_end, merchants=observations.merchants[:2]))
+
+    def daily_mean():
+        table = store.scan(categories=[category], columns=["observed_date", "price"])
+        table = table.set_column(1, "price", table.column("price").cast(pa.float64()))
+        return table.group_by("observed_date").aggregate([("price", "mean")])
+
+    timed(f"daily mean price of {category}", daily_mean)
+
+
+def bench_jsonl(observations: Observations, directory: Path, days: int, total_days: int):
+    """Same category query over row-per-JSON files"""
+    path = directory / "observations.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(days):
+            for table in observations.day(START + timedelta(days=i), 1):
+                for row in table.to_pylist():
+                    row["observed_at"] = row["observed_at"].isoformat()
+                    f.write(json.dumps(row) + "\n")
+    category = observations.categories[0]
+    start = time.perf_counter()
+    rows = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if json.loads(line)["category"] == category:
+                rows += 1
+    elapsed = time.perf_counter() - start
+    print(f"    row-per-JSON, {category}, {days} days: {elapsed:.2f}s ({rows:,} rows) "
+          f"-> ~{elapsed * total_days / days:.0f}s for {total_days} days")
+
+
+def main(args):
+    observations = Observations(args.merchants, args.products, args.categories, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PriceStore(Path(tmp) / "store", row_group_size=args.row_group_size)
+        print(f"📋 {args.merchants} merchants x {args.products} products x {args.days} days, "
+              f"{args.runs_per_day} runs/day")
+
+        start = time.perf_counter()
+        rows = files = 0
+        for i in range(args.days):
+            for table in observations.day(START + timedelta(days=i), args.runs_per_day):
+                files += store.write(table)
+                rows += len(table)
+        elapsed = time.perf_counter() - start
+        size = sum(f.stat().st_size for f in store.files())
+        print(f"  write: {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s), "
+              f"{files:,} files, {size / 1024 ** 2:.0f} MB ({size / rows:.1f} bytes/row)")
+
+        print("  queries before compaction:")
+        run_queries(store, observations, args.days)
+
+        stats = store.compact()
+        print(f"  compaction: {stats['files_before']:,} -> {stats['files_after']:,} files in "
+              f"{stats['partitions']:,} partitions, {stats['bytes_before'] / 1024 ** 2:.0f} -> "
+              f"{stats['bytes_after'] / 1024 ** 2:.0f} MB, {stats['seconds']:.1f}s")
+        print("  queries after compaction:")
+        run_queries(store, observations, args.days)
+
+        if args.jsonl_days:
+            print("  baseline:")
+            bench_jsonl(Observations(args.merchants, args.products, args.categories, args.seed),
+                        Path(tmp), args.jsonl_days, args.days)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the partitioned Parquet price-observation store")
+    parser.add_argument("--merchants", type=int, default=10)
+    parser.add_argument("--products", type=int, default=2000, help="Products per merchant")
+    parser.add_argument("--categories", type=int, default=40)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--runs-per-day", type=int, default=2, help="Writes per day (each leaves small files)")
+    parser.add_argument("--row-group-size", type=int, default=8192)
+    parser.add_argument("--jsonl-days", type=int, default=7, help="Days written as JSONL for the baseline (0: skip)")
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+URL Batch Benchmark
+
+Compares per-URL Python processing (urlsplit canonicalization, dict dedup,
+ProductUrlClassifier.filter, TemplateMatcher.filter) with the columnar
+UrlBatch kernels on synthetic URL sets built from the Carrefour discovery
+cache. Synthetic URLs are assembled directly as Arrow arrays, with trailing
+slashes, fragments, mixed-case hosts and query variants so dedup has work to do.
+
+Usage:
+    python benchmarks/bench_url_batch.py --sizes 1000000 10000000 --python-max 1000000
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List
+from urllib.parse import urlsplit, urlunsplit
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from url_batch import UrlBatch
+from url_classifier import ProductUrlClassifier
+from url_templates import TemplateMatcher, UrlTemplate
+
+DEFAULT_CACHE = ROOT / "discovery_cache" / "discovery_mercado_carrefour_com_br.json"
+
+SUFFIXES = ["", "/", "#reviews", "?cor=azul", "?utm_source=newsletter"]
+HOST_SPELLINGS = [
+    ("https://mercado.carrefour.com.br", "https://mercado.carrefour.com.br"),
+    ("https://mercado.carrefour.com.br", "https://Mercado.Carrefour.com.br:443"),
+    ("https://mercado.carrefour.com.br", "https://mercado.carrefour.com.br/categoria"),
+]
+
+
+def synthetic_urls(seed_urls: List[str], size: int, seed: int = 0) -> pa.Array:
+    """Build `size` URLs from the seed set without materializing Python strings"""
+    rng = np.random.default_rng(seed)
+    base = pa.array(seed_urls, type=pa.string())
+
+    # Extra digits on the product id keep most URLs distinct ("/slug-123/p" ->
+    # "/slug-12345/p", same template); suffixes below make duplicates
+    shards = rng.integers(0, max(size // len(seed_urls), 1), size=size)
+    urls = base.take(pa.array(rng.integers(0, len(seed_urls), size=size)))
+    stems = pc.replace_substring_regex(urls, r"/p$", "")
+    urls = pc.binary_join_element_wise(
+        stems, pc.cast(pa.array(shards), pa.string()), pa.scalar("/p"), ""
+    )
+
+    for original, spelling in HOST_SPELLINGS[1:]:
+        pick = pa.array(rng.random(size) < 0.1)
+        urls = pc.if_else(pick, pc.replace_substring(urls, original, spelling, max_replacements=1), urls)
+
+    suffixes = pa.array(SUFFIXES, type=pa.string()).take(pa.array(rng.integers(0, len(SUFFIXES), size=size)))
+    return pc.binary_join_element_wise(urls, suffixes, "")
+
+
+def python_canonicalize(url: str) -> str:
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if host.endswith(":443") or host.endswith(":80"):
+        host = host.rsplit(":", 1)[0]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), host, path, parts.query, ""))
+
+
+def run_python(urls: List[str], classifier: ProductUrlClassifier, matcher: TemplateMatcher):
+    timings = {}
+    start = time.perf_counter()
+    unique = list(dict.fromkeys(python_canonicalize(u) for u in urls))
+    timings["dedup"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    products = classifier.filter(unique)
+    timings["classify"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    templated = matcher.filter(unique)
+    timings["templates"] = time.perf_counter() - start
+    return timings, len(unique), len(products), len(templated)
+
+
+def run_batch(urls: pa.Array, classifier: ProductUrlClassifier, matcher: TemplateMatcher):
+    timings = {}
+    start = time.perf_counter()
+    unique = UrlBatch(urls).dedup()
+    timings["dedup"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    products = unique.filter(unique.classify(classifier))
+    timings["classify"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    templated = unique.filter(unique.match_templates(matcher))
+    timings["templates"] = time.perf_counter() - start
+    return timings, len(unique), len(products), len(templated)
+
+
+def report(name: str, size: int, timings: dict, counts: tuple):
+    total = sum(timings.values())
+    steps = "  ".join(f"{k}={v:.2f}s" for k, v in timings.items())
+    print(f"  {name:<7} {steps}  total={total:.2f}s  ({size / total:,.0f} URLs/sec)")
+    print(f"          unique={counts[0]:,} product={counts[1]:,} templated={counts[2]:,}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark columnar URL batches")
+    parser.add_argument("--cache", default=str(DEFAULT_CACHE), help="Discovery cache JSON")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--python-max", type=int, default=1_000_000,
+                        help="Skip the per-URL Python baseline above this size")
+    args = parser.parse_args()
+
+    with open(args.cache, 'r', encoding='utf-8') as f:
+        seed_urls = json.load(f)["product_urls"]
+
+    classifier = ProductUrlClassifier()
+    matcher = TemplateMatcher([UrlTemplate(pattern="/{slug}-{id:int}/p", count=len(seed_urls))])
+
+    for size in args.sizes:
+        urls = synthetic_urls(seed_urls, size)
+        print(f"\n📋 {size:,} URLs ({urls.nbytes / 1e6:,.0f} MB as Arrow)")
+
+        timings, *counts = run_batch(urls, classifier, matcher)
+        batch_total = report("arrow", size, timings, counts)
+
+        if size <= args.python_max:
+            py_urls = urls.to_pylist()
+            timings, *py_counts = run_python(py_urls, classifier, matcher)
+            python_total = report("python", size, timings, py_counts)
+            print(f"  speedup: {python_total / batch_total:.1f}x  counts identical: {py_counts == counts}")
+            del py_urls
+
+
+if __name__ == "__main__":
+    main()
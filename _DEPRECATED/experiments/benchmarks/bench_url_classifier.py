@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+URL Classifier Benchmark
+
+Compares the original per-URL heuristics of ProductLinkDiscovery (regexes
+rebuilt from glob strings on every call) with the precompiled
+ProductUrlClassifier over the Carrefour discovery cache.
+
+Usage:
+    python benchmarks/bench_url_classifier.py --repeat 5
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List
+from urllib.parse import urlparse
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from url_classifier import (
+    ProductUrlClassifier,
+    COMMON_PRODUCT_PATTERNS,
+    EXCLUDE_PATTERNS,
+    PRODUCT_KEYWORDS,
+)
+
+DEFAULT_CACHE = ROOT / "discovery_cache" / "discovery_mercado_carrefour_com_br.json"
+
+
+def legacy_is_likely_product_url(url: str) -> bool:
+    """The original ProductLinkDiscovery._is_likely_product_url"""
+    parsed = urlparse(url)
+    path = parsed.path.lower()
+
+    for exclude_pattern in EXCLUDE_PATTERNS:
+        exclude_regex = exclude_pattern.replace("*", ".*").replace("/", "\\/")
+        if re.search(exclude_regex, path):
+            return False
+
+    product_indicators = [
+        re.search(r'/p(?:roduct)?(?:o)?s?/[\w-]+', path),
+        re.search(r'/item/[\w-]+', path),
+        re.search(r'/dp/[\w-]+', path),
+        re.search(r'-p-\d+', path),
+        re.search(r'/\d{4,}', path),
+        re.search(r'[\w]+-\d+', path),
+    ]
+
+    query = parsed.query.lower()
+    query_indicators = [
+        'productid' in query,
+        'product_id' in query,
+        'pid=' in query,
+        'sku=' in query,
+    ]
+
+    return any(product_indicators) or any(query_indicators)
+
+
+def legacy_detect_product_patterns(urls: List[str]) -> List[str]:
+    """The original ProductLinkDiscovery._detect_product_patterns"""
+    detected_patterns = set()
+    for url in urls[:100]:
+        path = urlparse(url).path
+        for pattern in COMMON_PRODUCT_PATTERNS:
+            pattern_regex = pattern.replace("*", ".*").replace("/", "\\/")
+            if re.search(pattern_regex, path):
+                detected_patterns.add(pattern)
+        segments = [s for s in path.split('/') if s]
+        if len(segments) >= 2:
+            for segment in segments:
+                if any(keyword in segment.lower() for keyword in PRODUCT_KEYWORDS):
+                    detected_patterns.add(f"*/{segment}/*")
+    return list(detected_patterns) if detected_patterns else COMMON_PRODUCT_PATTERNS
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark product URL classification")
+    parser.add_argument("--cache", default=str(DEFAULT_CACHE), help="Discovery cache JSON")
+    parser.add_argument("--repeat", type=int, default=5, help="Best-of-N timing runs")
+    args = parser.parse_args()
+
+    with open(args.cache, 'r', encoding='utf-8') as f:
+        urls = json.load(f)["product_urls"]
+
+    print(f"📋 {len(urls)} URLs from {Path(args.cache).name}")
+
+    before, legacy_flags = timed(lambda: [legacy_is_likely_product_url(u) for u in urls], args.repeat)
+    print(f"  before: {before:.3f}s  ({len(urls) / before:,.0f} URLs/sec)")
+
+    construct_start = time.perf_counter()
+    classifier = ProductUrlClassifier()
+    construct = time.perf_counter() - construct_start
+
+    after, flags = timed(lambda: classifier.classify(urls), args.repeat)
+    print(f"  after:  {after:.3f}s  ({len(urls) / after:,.0f} URLs/sec, compile {construct * 1000:.2f}ms)")
+    print(f"  speedup: {before / after:.1f}x")
+
+    mismatches = sum(1 for a, b in zip(legacy_flags, flags) if a != b)
+    print(f"  classification mismatches: {mismatches}")
+
+    legacy_patterns = set(legacy_detect_product_patterns(urls))
+    patterns = set(classifier.detect_patterns(urls))
+    print(f"  detected patterns identical: {legacy_patterns == patterns}")
+
+
+if __name__ == "__main__":
+    main()
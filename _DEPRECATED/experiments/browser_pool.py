@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Browser Pool
+
+Keeps a few long-lived crawl4ai browsers open and shares them across URLs,
+instead of launching and tearing down a Chromium per product page:
+- Each browser serves up to `max_tabs` pages at once
+- A browser is recycled (closed and relaunched) after `max_uses` pages, or
+  when the browsers' total memory passes `max_memory_mb`; memory is checked
+  at most once per `memory_cooldown` seconds and one browser is recycled at
+  a time, so a ceiling the relaunched browsers still exceed doesn't thrash
+- A crawl that fails because the browser died relaunches it and retries once
+
+Usage:
+    async with BrowserPool(BrowserConfig(headless=True)) as pool:
+        result = await pool.arun(url, config=CrawlerRunConfig(...))
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Union
+
+import psutil
+from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig
+
+
+# Error fragments Playwright/crawl4ai raise when the browser process is gone
+BROWSER_CRASH_MARKERS = (
+    "target closed",
+    "target page, context or browser has been closed",
+    "browser has been closed",
+    "browser has disconnected",
+    "connection closed",
+    "crashed",
+)
+
+
+# Retire reason of a browser recycled by the memory ceiling
+MEMORY_CEILING = "memory ceiling"
+
+
+def is_browser_crash(error: Union[BaseException, str, None]) -> bool:
+    """True if an exception or a CrawlResult.error_message says the browser died"""
+    message = str(error or "").lower()
+    return any(marker in message for marker in BROWSER_CRASH_MARKERS)
+
+
+def browser_memory_mb() -> float:
+    """Resident memory of all child processes (the browsers and their drivers)"""
+    total = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return total / (1024 * 1024)
+
+
+class _BrowserSlot:
+    """One browser and its usage counters"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.crawler: Optional[AsyncWebCrawler] = None
+        self.uses = 0
+        self.served = 0
+        self.active = 0
+        self.retiring = False
+        self.retire_reason = ""
+        self.restarting = False
+        self.restarts = 0
+
+    def retire(self, reason: str):
+        if not self.retiring:
+            self.retiring = True
+            self.retire_reason = reason
+
+
+class BrowserPool:
+    """Pool of long-lived browsers shared by extraction calls"""
+
+    def __init__(
+        self,
+        browser_config: Optional[BrowserConfig] = None,
+        size: int = 1,
+        max_tabs: int = 1,
+        max_uses: int = 100,
+        max_memory_mb: Optional[float] = 4096,
+        memory_cooldown: float = 60.0,
+    ):
+        """
+        Args:
+            browser_config: Config used to launch every browser
+            size: Number of browsers
+            max_tabs: Pages a single browser serves concurrently
+            max_uses: Pages served before a browser is recycled
+            max_memory_mb: Recycle the busiest-used browser when all browsers
+                together exceed this resident memory (None disables the check)
+            memory_cooldown: Seconds between memory checks, counted again from
+                the relaunch of a browser recycled for memory
+        """
+        self.browser_config = browser_config or BrowserConfig(headless=True)
+        self.max_tabs = max_tabs
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.memory_cooldown = memory_cooldown
+        self._next_memory_check = 0.0
+        self.slots: List[_BrowserSlot] = [_BrowserSlot(i) for i in range(size)]
+        self._available = asyncio.Condition()
+        self._background = set()
+        self._started = False
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def start(self):
+        await asyncio.gather(*(self._launch(slot) for slot in self.slots))
+        self._started = True
+
+    async def close(self):
+        await asyncio.gather(*(self._shutdown(slot) for slot in self.slots), return_exceptions=True)
+        self._started = False
+
+    async def _launch(self, slot: _BrowserSlot):
+        crawler = AsyncWebCrawler(config=self.browser_config)
+        await crawler.start()
+        slot.crawler = crawler
+        slot.uses = 0
+        slot.retiring = False
+
+    async def _shutdown(self, slot: _BrowserSlot):
+        crawler, slot.crawler = slot.crawler, None
+        if crawler is None:
+            return
+        try:
+            await crawler.close()
+        except Exception as e:
+            print(f"⚠️ Error closing browser {slot.index}: {e}")
+
+    async def _restart(self, slot: _BrowserSlot, reason: str):
+        print(f"♻️ Restarting browser {slot.index} ({reason})")
+        await self._shutdown(slot)
+        await self._launch(slot)
+        slot.restarts += 1
+
+    def _pick_slot(self) -> Optional[_BrowserSlot]:
+        candidates = [s for s in self.slots if not s.retiring and s.active < self.max_tabs]
+        return min(candidates, key=lambda s: s.active) if candidates else None
+
+    def _over_memory(self) -> bool:
+        """Memory ceiling check, skipped during the cooldown and while a memory recycle is pending"""
+        if self.max_memory_mb is None or time.monotonic() < self._next_memory_check:
+            return False
+        if any(s.retiring and s.retire_reason == MEMORY_CEILING for s in self.slots):
+            return False
+        self._next_memory_check = time.monotonic() + self.memory_cooldown
+        return browser_memory_mb() > self.max_memory_mb
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[AsyncWebCrawler]:
+        """Borrow a browser for one page; it is recycled on return if due"""
+        if not self._started:
+            await self.start()
+
+        async with self._available:
+            slot = self._pick_slot()
+            while slot is None:
+                if all(s.crawler is None and not s.restarting for s in self.slots):
+                    raise RuntimeError("No browser available: every relaunch failed")
+                await self._available.wait()
+                slot = self._pick_slot()
+            slot.active += 1
+            slot.uses += 1
+            slot.served += 1
+            if slot.uses >= self.max_uses:
+                slot.retire(f"{slot.uses} pages served")
+
+        try:
+            yield slot.crawler
+        finally:
+            await self._release(slot)
+
+    async def _release(self, slot: _BrowserSlot, returning: bool = True):
+        """Return a page slot; relaunch the browser once it is retired and idle"""
+        async with self._available:
+            if returning:
+                slot.active -= 1
+            if not slot.retiring and self._over_memory():
+                # Recycling the most used browser frees the most leaked memory
+                heaviest = max((s for s in self.slots if not s.retiring), key=lambda s: s.uses)
+                heaviest.retire(MEMORY_CEILING)
+                if heaviest is not slot and heaviest.active == 0:
+                    # Idle, so nobody else would return it and trigger the restart
+                    task = asyncio.create_task(self._release(heaviest, returning=False))
+                    self._background.add(task)
+                    task.add_done_callback(self._background.discard)
+            restart = slot.retiring and slot.active == 0 and not slot.restarting
+            if restart:
+                slot.restarting = True
+            self._available.notify_all()
+
+        if not restart:
+            return
+        # Relaunch outside the lock so the other browsers keep serving meanwhile
+        try:
+            await self._restart(slot, slot.retire_reason)
+        except Exception as e:
+            print(f"❌ Failed to relaunch browser {slot.index}: {e}")
+        async with self._available:
+            slot.restarting = False
+            if slot.retire_reason == MEMORY_CEILING:
+                # Give the relaunched browser a full cooldown before measuring again
+                self._next_memory_check = time.monotonic() + self.memory_cooldown
+            self._available.notify_all()
+
+    async def _recover(self, crawler: AsyncWebCrawler):
+        """Relaunch the browser behind `crawler` after a crash"""
+        for slot in self.slots:
+            if slot.crawler is crawler:
+                slot.retire("browser crashed")
+                await self._release(slot, returning=False)
+                return
+
+    async def arun(self, url: str, config: Optional[CrawlerRunConfig] = None, retries: int = 1):
+        """
+        crawler.arun on a pooled browser, relaunching and retrying if the browser crashed.
+
+        crawl4ai mostly reports a dead browser as a failed CrawlResult rather
+        than an exception, so both count as a crash.
+        """
+        attempt = 0
+        while True:
+            crawler = None
+            try:
+                async with self.acquire() as crawler:
+                    result = await crawler.arun(url=url, config=config)
+            except Exception as e:
+                if attempt >= retries or not is_browser_crash(e):
+                    raise
+                error = e
+            else:
+                if getattr(result, "success", True) or not is_browser_crash(getattr(result, "error_message", None)):
+                    return result
+                if attempt >= retries:
+                    await self._recover(crawler)
+                    return result
+                error = result.error_message
+            attempt += 1
+            print(f"⚠️ Browser crashed on {url}, retrying ({error})")
+            if crawler is not None:
+                await self._recover(crawler)
+
+    def stats(self) -> dict:
+        return {
+            "browsers": len(self.slots),
+            "pages_served": sum(s.served for s in self.slots),
+            "restarts": sum(s.restarts for s in self.slots),
+        }
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Compact Discovery Store
+
+Keeps each merchant's discovered product URLs between runs so re-discovery
+only has to look at what changed:
+- URLs are stored sorted and gzip-compressed (shared prefixes compress well)
+- A 64-bit fingerprint per URL forms the index used for membership and deltas
+- URLs are grouped by the sitemap part they came from, together with the
+  part's ETag/Last-Modified/lastmod, so unchanged parts are never re-fetched
+
+Files per merchant (next to the JSON written by ProductLinkDiscovery.save_results):
+    discovery_<domain>.urls.gz        sorted product URLs, one per line
+    discovery_<domain>.index.npz      fingerprints aligned with the URL list, per part
+    discovery_<domain>.manifest.json  sitemap parts and their validators
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from dataclasses import dataclass, asdict, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+# Part key for URLs that did not come from a sitemap (Common Crawl, deep crawl).
+# They cannot be revalidated cheaply, so incremental runs carry them over as-is.
+OTHER_PART = ""
+
+
+def fingerprint(url: str) -> int:
+    """Stable 64-bit fingerprint of a URL"""
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def fingerprints(urls: Iterable[str]) -> np.ndarray:
+    return np.fromiter((fingerprint(u) for u in urls), dtype=np.uint64)
+
+
+@dataclass
+class SitemapPart:
+    """One fetched sitemap file and the validators needed to revalidate it"""
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None  # HTTP Last-Modified header
+    lastmod: Optional[str] = None        # <lastmod> from the parent sitemap index
+    children: List[str] = field(default_factory=list)  # set for sitemap indexes
+
+
+@dataclass
+class DiscoveryDelta:
+    """Product URLs added and removed since the stored result"""
+    added: List[str]
+    removed: List[str]
+
+    def summary(self) -> Dict[str, int]:
+        return {"added": len(self.added), "removed": len(self.removed)}
+
+
+class StoredDiscovery:
+    """A merchant's stored product URLs, grouped by sitemap part"""
+
+    def __init__(
+        self,
+        merchant_url: str,
+        urls: List[str],
+        part_fingerprints: Dict[str, np.ndarray],
+        parts: Dict[str, SitemapPart],
+        patterns: Optional[List[str]] = None,
+        updated_at: Optional[str] = None,
+    ):
+        self.merchant_url = merchant_url
+        self.urls = urls  # sorted
+        self.fingerprints = fingerprints(urls) if urls else np.empty(0, dtype=np.uint64)
+        self.part_fingerprints = part_fingerprints
+        self.parts = parts
+        self.patterns = patterns or []
+        self.updated_at = updated_at
+        self._order = np.argsort(self.fingerprints)
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def urls_for(self, fps: np.ndarray) -> List[str]:
+        """Stored URLs with the given fingerprints (unknown fingerprints are skipped)"""
+        if not len(fps) or not len(self.urls):
+            return []
+        sorted_fps = self.fingerprints[self._order]
+        pos = np.searchsorted(sorted_fps, fps)
+        pos = np.clip(pos, 0, len(sorted_fps) - 1)
+        hits = self._order[pos[sorted_fps[pos] == fps]]
+        return [self.urls[i] for i in hits]
+
+    def part_urls(self, part_url: str) -> List[str]:
+        return self.urls_for(self.part_fingerprints.get(part_url, np.empty(0, dtype=np.uint64)))
+
+    def delta(self, new_urls: List[str]) -> DiscoveryDelta:
+        """Added/removed product URLs of `new_urls` relative to this result"""
+        new_fps = fingerprints(new_urls)
+        added = ~np.isin(new_fps, self.fingerprints)
+        removed = ~np.isin(self.fingerprints, new_fps)
+        return DiscoveryDelta(
+            added=[u for u, flag in zip(new_urls, added) if flag],
+            removed=[u for u, flag in zip(self.urls, removed) if flag],
+        )
+
+
+class DiscoveryStore:
+    """Reads and writes compact per-merchant discovery results"""
+
+    def __init__(self, cache_dir: str = "./discovery_cache"):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(exist_ok=True)
+
+    def _stem(self, domain: str) -> Path:
+        return self.cache_dir / f"discovery_{domain.replace('.', '_')}"
+
+    def exists(self, domain: str) -> bool:
+        return Path(f"{self._stem(domain)}.manifest.json").exists()
+
+    def load(self, domain: str) -> Optional[StoredDiscovery]:
+        stem = self._stem(domain)
+        manifest_path = Path(f"{stem}.manifest.json")
+        if not manifest_path.exists():
+            return None
+
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        with gzip.open(f"{stem}.urls.gz", 'rt', encoding='utf-8') as f:
+            urls = f.read().split("\n") if manifest["count"] else []
+        with np.load(f"{stem}.index.npz") as index:
+            part_fingerprints = {
+                part_url: index[f"part_{i}"] for i, part_url in enumerate(manifest["part_order"])
+            }
+
+        return StoredDiscovery(
+            merchant_url=manifest["merchant_url"],
+            urls=urls,
+            part_fingerprints=part_fingerprints,
+            parts={p["url"]: SitemapPart(**p) for p in manifest["parts"]},
+            patterns=manifest.get("patterns"),
+            updated_at=manifest.get("updated_at"),
+        )
+
+    def save(
+        self,
+        domain: str,
+        merchant_url: str,
+        part_urls: Dict[str, List[str]],
+        parts: Optional[Dict[str, SitemapPart]] = None,
+        patterns: Optional[List[str]] = None,
+    ) -> StoredDiscovery:
+        """
+        Store product URLs grouped by part (OTHER_PART for non-sitemap sources).
+
+        Files are written to temporaries and renamed, so a crash mid-save
+        leaves the previous result intact.
+        """
+        stem = self._stem(domain)
+        urls = sorted({u for group in part_urls.values() for u in group})
+        part_order = list(part_urls)
+        part_fingerprints = {p: np.unique(fingerprints(part_urls[p])) for p in part_order}
+        updated_at = datetime.now(timezone.utc).isoformat()
+
+        manifest = {
+            "merchant_url": merchant_url,
+            "updated_at": updated_at,
+            "count": len(urls),
+            "patterns": patterns or [],
+            "part_order": part_order,
+            "parts": [asdict(p) for p in (parts or {}).values()],
+        }
+
+        def replace(suffix, write):
+            tmp = Path(f"{stem}{suffix}.tmp")
+            write(tmp)
+            os.replace(tmp, f"{stem}{suffix}")
+
+        def write_urls(path):
+            with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as f:
+                f.write("\n".join(urls))
+
+        def write_index(path):
+            with open(path, 'wb') as f:
+                np.savez_compressed(f, **{f"part_{i}": part_fingerprints[p] for i, p in enumerate(part_order)})
+
+        def write_manifest(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+        replace(".urls.gz", write_urls)
+        replace(".index.npz", write_index)
+        # The manifest goes last: it is what marks a stored result as present
+        replace(".manifest.json", write_manifest)
+
+        return StoredDiscovery(
+            merchant_url=merchant_url,
+            urls=urls,
+            part_fingerprints=part_fingerprints,
+            parts=dict(parts or {}),
+            patterns=patterns,
+            updated_at=updated_at,
+        )
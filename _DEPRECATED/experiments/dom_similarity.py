@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+DOM Structural Fingerprints
+
+Fingerprints a page from its tag/class skeleton, without building a DOM:
+- dom_fingerprint: exact hash of the element vocabulary, for O(1) lookups
+  between templates of one merchant
+- dom_simhash: 64-bit SimHash of the skeleton (tags, class names and tag
+  sequence), so pages built by the same e-commerce platform (VTEX, Magento,
+  Salesforce Commerce) land closer together than pages of other platforms,
+  even across merchants
+- SimHashIndex: nearest cached schemas by Hamming distance
+
+A schema found through similarity is only reused after a validation
+extraction on the new page (see `schema_fits_page`).
+"""
+
+import hashlib
+import math
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from http_extraction import CompiledCssSchema
+from schema_health import page_problems, top_level_fields
+
+
+_OPEN_TAG = re.compile(r"<([a-zA-Z][a-zA-Z0-9-]*)\b([^>]*)>")
+_CLASS_ATTR = re.compile(r"\bclass=[\"']([^\"']*)[\"']")
+_BODY = re.compile(r"<body\b", re.IGNORECASE)
+
+# Cached schemas this many bits apart (of 64) or closer are worth a validation
+# extraction. Merchant chrome (navigation, banners) moves even same-platform
+# pages 10-20 bits apart, so the bound is loose and validation decides.
+DEFAULT_MAX_DISTANCE = 20
+# Closest cached schemas tried by validation extraction before calling the LLM
+DEFAULT_CANDIDATES = 8
+
+_BIT_SHIFTS = np.arange(64, dtype=np.uint64)
+
+
+def _open_tags(html: str):
+    body = _BODY.search(html)
+    for match in _OPEN_TAG.finditer(html, body.start() if body else 0):
+        classes = _CLASS_ATTR.search(match.group(2))
+        yield match.group(1).lower(), classes.group(1).split() if classes else []
+
+
+def dom_fingerprint(html: str) -> str:
+    """
+    Hash of the page's element vocabulary (tag + class combinations).
+
+    Text, attribute values and element counts are ignored, so two product
+    pages of one template (or a listing with 20 vs 24 cards) fingerprint alike.
+    """
+    tokens = {f"{tag}.{'.'.join(sorted(classes))}" if classes else tag for tag, classes in _open_tags(html)}
+    return hashlib.blake2b("\n".join(sorted(tokens)).encode(), digest_size=8).hexdigest()
+
+
+def skeleton_features(html: str) -> Counter:
+    """Tag names, individual class names and consecutive-tag pairs, with counts"""
+    features = Counter()
+    previous = ""
+    for tag, classes in _open_tags(html):
+        features[f"t:{tag}"] += 1
+        features[f"s:{previous}>{tag}"] += 1
+        for name in classes:
+            features[f"c:{name}"] += 1
+        previous = tag
+    return features
+
+
+def dom_simhash(html: str) -> int:
+    """64-bit SimHash of the page skeleton (log-weighted feature counts)"""
+    features = skeleton_features(html)
+    if not features:
+        return 0
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(f.encode(), digest_size=8).digest(), "little") for f in features),
+        dtype=np.uint64, count=len(features),
+    )
+    weights = np.fromiter((1.0 + math.log(c) for c in features.values()), dtype=np.float64, count=len(features))
+    bits = ((hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)).astype(np.int8)
+    votes = weights @ (2 * bits - 1)
+    return int(np.sum(np.uint64(1) << _BIT_SHIFTS[votes > 0], dtype=np.uint64))
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class SimHashIndex:
+    """Cached schema keys by SimHash, searched by Hamming distance"""
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.page_types: List[str] = []
+        self._hashes = np.empty(0, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: str, simhash: int, page_type: str):
+        if key in self.keys:
+            i = self.keys.index(key)
+            self._hashes[i] = np.uint64(simhash)
+            self.page_types[i] = page_type
+            return
+        self.keys.append(key)
+        self.page_types.append(page_type)
+        self._hashes = np.append(self._hashes, np.uint64(simhash))
+
+    def nearest(
+        self,
+        simhash: int,
+        page_type: Optional[str] = None,
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+        limit: int = DEFAULT_CANDIDATES,
+    ) -> List[Tuple[str, int]]:
+        """Up to `limit` (key, distance) pairs within `max_distance`, closest first"""
+        if not self.keys:
+            return []
+        distances = np.bitwise_count(self._hashes ^ np.uint64(simhash))
+        order = np.argsort(distances, kind="stable")
+        found = []
+        for i in order:
+            if distances[i] > max_distance or len(found) >= limit:
+                break
+            if page_type is None or self.page_types[i] == page_type:
+                found.append((self.keys[i], int(distances[i])))
+        return found
+
+
+def schema_fits_page(compiled: CompiledCssSchema, required: List[str], html: str, min_items: int = 1) -> bool:
+    """
+    Validation extraction: at least `min_items` items with every required
+    field filled, and those items pass schema_health.page_problems (price,
+    size and identifier formats; no field holding the price's value). A
+    generic h1/price schema of another platform fills the fields but
+    usually fails the format checks.
+    """
+    items = compiled.extract(html)
+    complete = [
+        item for item in items
+        if all(str(item.get(name) or "").strip() for name in required)
+    ]
+    if len(complete) < min_items:
+        return False
+    return not page_problems(complete, top_level_fields(compiled.schema), required)
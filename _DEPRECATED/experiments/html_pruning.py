@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+HTML Pruning for Schema Generation
+
+LLM schema generation only needs the page's structure around the product:
+latency and cost scale with the markup sent, and most of it is navigation,
+menus and repeated cards. Before the HTML goes to the LLM:
+1. Scripts, styles, SVGs, iframes, media, metadata and comments are dropped
+2. Attributes are reduced to the ones selectors use (class, id, data-*,
+   itemprop, ...); utility classes with characters a simple CSS selector
+   can't use (`hover:text-primary`, `max-w-[120px]`) are dropped, since
+   generated schemas may not reference them anyway
+3. Runs of structurally identical sibling subtrees (menu entries, product
+   cards) keep one exemplar and a comment with the number removed
+4. Long text is shortened and whitespace collapsed
+5. If the page is still over the token budget, whole subtrees are removed,
+   chrome (header, footer, nav, modals, ...) first and then the largest
+   ones, but never the regions carrying the title, price or product
+   identifiers outside that chrome
+"""
+
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from lxml import etree, html as lxml_html
+
+
+DEFAULT_TOKEN_BUDGET = 6000
+
+DROP_TAGS = {
+    "script", "style", "noscript", "svg", "iframe", "link", "meta", "template", "canvas",
+    "video", "audio", "source", "picture", "object", "embed",
+}
+KEEP_ATTRIBUTES = {
+    "id", "class", "itemprop", "itemtype", "itemscope", "content", "name", "type", "value",
+    "alt", "title", "href", "for", "role",
+}
+MAX_DATA_ATTRIBUTE = 40
+MAX_HREF = 80
+MAX_TEXT = 200
+# Sibling subtrees need this many descendants to be collapsed, so spec rows
+# like <p><b>Marca:</b> X</p> stay while menu entries and cards collapse
+MIN_REPEAT_DESCENDANTS = 2
+MIN_REPEATS = 3
+
+_SELECTOR_SAFE_CLASS = re.compile(r"^-?[A-Za-z_][\w-]*$")
+_PRICE_TEXT = re.compile(r"R\$\s*\d|\d+,\d{2}\b")
+_PRIORITY_HINTS = re.compile(r"price|preco|preço|sku|title|name|nome|brand|marca|descri", re.IGNORECASE)
+_CHROME_TAGS = {"header", "footer", "nav", "aside", "form"}
+_CHROME_HINTS = re.compile(r"header|footer|menu|nav|banner|newsletter|cookie|modal|drawer|cart", re.IGNORECASE)
+_WORD_PIECES = re.compile(r"\w+|[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate LLM token count.
+
+    Mirrors BPE pre-tokenization: every punctuation character is a token,
+    words are one token per ~6 characters. Within about 15% of GPT-style
+    tokenizers on markup, which is enough for budgeting.
+    """
+    return sum(len(piece) // 6 + 1 for piece in _WORD_PIECES.findall(text))
+
+
+@dataclass
+class PrunedHtml:
+    """Pruned markup and what pruning did"""
+    html: str
+    tokens_before: int
+    tokens_after: int
+    seconds: float
+    removed: Counter = field(default_factory=Counter)
+    over_budget: bool = False
+
+    @property
+    def reduction(self) -> float:
+        return 1 - self.tokens_after / self.tokens_before if self.tokens_before else 0.0
+
+
+def _attributes(element, removed: Counter):
+    for name in list(element.attrib):
+        value = element.attrib[name]
+        if name == "class":
+            classes = [c for c in value.split() if _SELECTOR_SAFE_CLASS.match(c)]
+            removed["classes"] += len(value.split()) - len(classes)
+            if classes:
+                element.attrib["class"] = " ".join(classes)
+            else:
+                del element.attrib["class"]
+        elif name == "href":
+            element.attrib["href"] = value[:MAX_HREF]
+        elif name not in KEEP_ATTRIBUTES and not (name.startswith("data-") and len(value) <= MAX_DATA_ATTRIBUTE):
+            del element.attrib[name]
+            removed["attributes"] += 1
+
+
+def _shorten(text: Optional[str]) -> Optional[str]:
+    if not text:
+        return text
+    text = _SPACES.sub(" ", text)
+    return text if len(text) <= MAX_TEXT else text[:MAX_TEXT] + "…"
+
+
+def _skeletons(root) -> Dict[etree._Element, str]:
+    """Tag/class skeleton of every subtree (text ignored), children before parents"""
+    skeletons = {}
+    for element in reversed(list(root.iter(etree.Element))):
+        children = "".join(skeletons[child] for child in element if child in skeletons)
+        skeletons[element] = f"<{element.tag}.{element.get('class', '')}>{children}</>"
+    return skeletons
+
+
+def _collapse_repeats(root, removed: Counter):
+    skeletons = _skeletons(root)
+    for parent in list(root.iter(etree.Element)):
+        groups: Dict[str, List] = {}
+        for child in parent:
+            if child in skeletons:
+                groups.setdefault(skeletons[child], []).append(child)
+        for group in groups.values():
+            if len(group) < MIN_REPEATS or sum(1 for _ in group[0].iterdescendants()) < MIN_REPEAT_DESCENDANTS:
+                continue
+            marker = etree.Comment(f" {len(group) - 1} more like the previous <{group[0].tag}> ")
+            group[0].addnext(marker)
+            for element in group[1:]:
+                element.drop_tree()
+            removed["repeated subtrees"] += len(group) - 1
+
+
+def _is_chrome(element) -> bool:
+    hints = f"{element.get('class', '')} {element.get('id', '')}"
+    return element.tag in _CHROME_TAGS or bool(_CHROME_HINTS.search(hints))
+
+
+def _is_priority(element) -> bool:
+    if element.tag == "h1":
+        return True
+    if any(_is_chrome(e) for e in element.iterancestors()) or _is_chrome(element):
+        return False
+    hints = " ".join(element.get(a, "") for a in ("class", "id", "itemprop", "data-testid", "data-cy"))
+    if hints and _PRIORITY_HINTS.search(hints):
+        return True
+    return bool(element.text and _PRICE_TEXT.search(element.text))
+
+
+def _enforce_budget(root, budget: int, removed: Counter) -> bool:
+    """Remove unprotected subtrees until the page fits; False if it still doesn't"""
+    protected: Set = set()
+    for element in root.iter(etree.Element):
+        if _is_priority(element):
+            protected.add(element)
+            protected.update(element.iterancestors())
+            protected.update(element.iter(etree.Element))
+
+    candidates = []
+    for element in root.iter(etree.Element):
+        parent = element.getparent()
+        if element not in protected and (parent is None or parent in protected):
+            candidates.append((not _is_chrome(element), -estimate_tokens(etree.tostring(element, encoding="unicode")), element))
+    candidates.sort(key=lambda c: c[:2])
+
+    tokens = estimate_tokens(lxml_html.tostring(root, encoding="unicode"))
+    for _, negative_size, element in candidates:
+        if tokens <= budget:
+            break
+        element.drop_tree()
+        tokens += negative_size
+        removed["subtrees over budget"] += 1
+    return tokens <= budget
+
+
+def prune_html(html: str, token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET) -> PrunedHtml:
+    """
+    Prune page markup for LLM schema generation.
+
+    Args:
+        html: Page HTML (raw or crawl4ai's fit_html)
+        token_budget: Approximate token limit (None: no limit)
+    """
+    start = time.perf_counter()
+    tokens_before = estimate_tokens(html)
+    removed = Counter()
+    root = lxml_html.document_fromstring(html)
+
+    for element in list(root.iter(etree.Comment, etree.ProcessingInstruction)):
+        if element.getparent() is not None:
+            element.drop_tree()
+    for element in list(root.iter(*DROP_TAGS)):
+        removed[element.tag] += 1
+        element.drop_tree()
+    head = root.find("head")
+    if head is not None:
+        for element in list(head):
+            if element.tag != "title":
+                element.drop_tree()
+
+    for element in root.iter(etree.Element):
+        _attributes(element, removed)
+        element.text = _shorten(element.text)
+        element.tail = _shorten(element.tail)
+
+    _collapse_repeats(root, removed)
+
+    fits = True
+    if token_budget is not None:
+        fits = _enforce_budget(root, token_budget, removed)
+
+    pruned = lxml_html.tostring(root, encoding="unicode")
+    return PrunedHtml(
+        html=pruned,
+        tokens_before=tokens_before,
+        tokens_after=estimate_tokens(pruned),
+        seconds=time.perf_counter() - start,
+        removed=removed,
+        over_budget=not fits,
+    )
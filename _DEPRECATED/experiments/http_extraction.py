@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Browser-free Schema Extraction
+
+Applies cached JsonCssExtractionStrategy schemas to raw HTML fetched over
+plain HTTP, for server-rendered pages that don't need a browser:
+- Every CSS selector in a schema is compiled once into an lxml XPath
+- Pages are parsed with lxml and fields read with the compiled expressions
+- Results follow JsonCssExtractionStrategy's output (one dict per base
+  element, fields that found nothing are left out)
+
+ProductExtractionPipeline decides per domain/URL template whether this mode
+works or the browser is needed (see `required_fields_filled`).
+"""
+
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from cssselect import HTMLTranslator, SelectorError
+from lxml import etree, html as lxml_html
+
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.8",
+}
+
+# Fields that must come back non-empty for a page to count as extracted: the
+# product name and its current price. Matched on whole words of the field name
+# (product_name, title, current_price, preco), so brand_name, category_name,
+# old_price or unit_price are not required
+REQUIRED_FIELD_WORDS = (("name", "title", "nome", "titulo"), ("price", "preco", "valor"))
+REQUIRED_FIELD_QUALIFIERS = ("product", "produto", "item", "current", "sale", "final", "atual")
+
+_translator = HTMLTranslator()
+
+
+def schema_hash(schema: Dict[str, Any]) -> str:
+    return hashlib.md5(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+
+
+def _compile(selector: Optional[str]) -> Optional[etree.XPath]:
+    """CSS selector -> XPath searching below the context element; None if invalid"""
+    if not selector:
+        return None
+    try:
+        return etree.XPath(_translator.css_to_xpath(selector, prefix="descendant::"))
+    except (SelectorError, etree.XPathError) as e:
+        print(f"⚠️ Unsupported selector {selector!r}: {e}")
+        return None
+
+
+def _text(element) -> str:
+    # Same as BeautifulSoup's get_text(strip=True), which JsonCssExtractionStrategy uses
+    return "".join(part.strip() for part in element.itertext())
+
+
+class CompiledCssSchema:
+    """A JsonCssExtractionStrategy schema with its selectors precompiled"""
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self.base = _compile(schema.get("baseSelector"))
+        self.fields = [self._compile_field(f) for f in schema.get("fields", [])]
+
+    def _compile_field(self, field: Dict[str, Any]) -> Dict[str, Any]:
+        compiled = dict(field)
+        compiled["_xpath"] = _compile(field.get("selector"))
+        if field.get("type") == "regex" and field.get("pattern"):
+            compiled["_regex"] = re.compile(field["pattern"])
+        if field.get("fields"):
+            compiled["fields"] = [self._compile_field(f) for f in field["fields"]]
+        return compiled
+
+    def _value(self, element, field: Dict[str, Any]) -> Any:
+        field_type = field.get("type", "text")
+        if field_type == "text":
+            return _text(element) or None
+        if field_type == "attribute":
+            return element.get(field.get("attribute", ""))
+        if field_type == "html":
+            return etree.tostring(element, encoding="unicode", method="html")
+        if field_type == "regex":
+            match = field["_regex"].search(_text(element)) if "_regex" in field else None
+            return match.group(1 if match and match.groups() else 0) if match else None
+        return None
+
+    def _field(self, element, field: Dict[str, Any]) -> Any:
+        xpath = field["_xpath"]
+        field_type = field.get("type", "text")
+        if xpath is None:
+            return field.get("default")
+
+        matches = xpath(element)
+        if field_type in ("list", "nested_list"):
+            items = [self._item(m, field.get("fields", [])) for m in matches]
+            return [i for i in items if i] or field.get("default")
+        if not matches:
+            return field.get("default")
+        if field_type == "nested":
+            return self._item(matches[0], field.get("fields", [])) or field.get("default")
+
+        value = self._value(matches[0], field)
+        return value if value is not None else field.get("default")
+
+    def _item(self, element, fields: List[Dict[str, Any]]) -> Dict[str, Any]:
+        item = {}
+        for field in fields:
+            value = self._field(element, field)
+            if value is not None:
+                item[field["name"]] = value
+        return item
+
+    def extract(self, html: str) -> List[Dict[str, Any]]:
+        """Extract one item per base element"""
+        if not html:
+            return []
+        try:
+            root = lxml_html.fromstring(html)
+        except (etree.ParserError, ValueError):
+            return []
+
+        bases = self.base(root) if self.base is not None else [root]
+        items = [self._item(base, self.fields) for base in bases]
+        return [item for item in items if item]
+
+
+def _field_words(name: str) -> List[str]:
+    """Words of a field name: snake_case, camelCase or kebab-case"""
+    return re.findall(r"[a-z0-9]+", re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", name).lower())
+
+
+def is_required_field(name: str) -> bool:
+    """A product name or current price field (only name/price words and their qualifiers)"""
+    words = set(_field_words(name))
+    return any(
+        words & set(kind) and not words - set(kind) - set(REQUIRED_FIELD_QUALIFIERS)
+        for kind in REQUIRED_FIELD_WORDS
+    )
+
+
+def required_fields(schema: Dict[str, Any]) -> List[str]:
+    """Top-level fields a usable extraction must fill (product name and current price)"""
+    names = [f["name"] for f in schema.get("fields", []) if "name" in f]
+    return [n for n in names if is_required_field(n)]
+
+
+def required_fields_filled(products: List[Dict[str, Any]], required: List[str]) -> bool:
+    return bool(products) and all(
+        any(str(product.get(name) or "").strip() for product in products) for name in required
+    )
+
+
+class HttpSchemaExtractor:
+    """Fetches pages over HTTP and applies cached schemas without a browser"""
+
+    def __init__(self, timeout: int = 20, headers: Optional[Dict[str, str]] = None):
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.headers = headers or DEFAULT_HEADERS
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._compiled: Dict[str, CompiledCssSchema] = {}
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(headers=self.headers, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    def compiled(self, schema: Dict[str, Any]) -> CompiledCssSchema:
+        key = schema_hash(schema)
+        if key not in self._compiled:
+            self._compiled[key] = CompiledCssSchema(schema)
+        return self._compiled[key]
+
+    async def fetch(self, url: str) -> Optional[str]:
+        """Raw HTML of a page, or None if it could not be fetched"""
+        if self.session is None:
+            async with self:
+                return await self.fetch(url)
+        try:
+            async with self.session.get(url) as resp:
+                if resp.status != 200:
+                    return None
+                return await resp.text(errors="ignore")
+        except (aiohttp.ClientError, TimeoutError) as e:
+            print(f"⚠️ HTTP fetch failed for {url}: {e}")
+            return None
+
+    async def extract(self, url: str, schema: Dict[str, Any]) -> List[Dict[str, Any]]:
+        html = await self.fetch(url)
+        return self.compiled(schema).extract(html) if html else []
@@ -7,6 +7,7 @@ Uses Crawl4AI's built-in link extraction (which we know works)
 
 import json
 import asyncio
+import sys
 from pathlib import Path
 from typing import List
 from urllib.parse import urlparse
@@ -17,6 +18,10 @@ from crawl4ai import (
     CacheMode
 )
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from url_batch import UrlBatch
+
 
 async def discover_products(query_term: str = "leite integral") -> List[str]:
     """
@@ -95,10 +100,8 @@ async def discover_products(query_term: str = "leite integral") -> List[str]:
 
     # Filter by query term
     query_terms = query_term.lower().split()
-    matching_urls = [
-        url for url in all_product_urls
-        if any(term in url.lower() for term in query_terms)
-    ]
+    batch = UrlBatch.from_urls(all_product_urls)
+    matching_urls = batch.filter(batch.contains_any(query_terms)).to_pylist()
 
     print(f"\n{'='*80}")
     print(f"✅ Discovery Complete!")
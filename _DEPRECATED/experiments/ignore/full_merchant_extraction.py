@@ -4,22 +4,36 @@ Full Merchant Extraction Pipeline
 
 Combines product link discovery with product data extraction:
 1. Discovers ALL product URLs from merchant site
-2. Extracts product data from each URL using cached schemas
-3. Saves comprehensive results
+2. Extracts product data from each URL using cached schemas, while discovery
+   is still running (bounded queue feeding a pool of extraction workers)
+3. Streams per-URL results to result sinks (JSONL, optionally Parquet) as
+   they are extracted, with a manifest holding the run metadata and summary
 
 Usage:
-    python full_merchant_extraction.py --merchant "https://mercado.carrefour.com.br/" --max-products 50
+    python full_merchant_extraction.py --merchant "https://mercado.carrefour.com.br/" --max-products 50 --workers 8
+    python full_merchant_extraction.py --merchant "https://mercado.carrefour.com.br/" --formats jsonl parquet
 """
 
 import asyncio
 import argparse
-import json
+import math
+import time
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence
+from urllib.parse import urlparse
 
 from product_link_discovery import ProductLinkDiscovery, DiscoveryResult
 from product_extraction_pipeline import ProductExtractionPipeline
+from price_normalization import product_fields
+from price_store import PriceStore, PriceStoreSink
+from result_sinks import ResultRun
+
+
+def _price(product: Dict[str, Any]) -> Any:
+    """The product's price value, whatever its schema calls the field ("price", "current_price", ...)"""
+    field = product_fields(tuple(product))[0]
+    return product.get(field) if field else None
 
 
 class FullMerchantExtractor:
@@ -33,9 +47,18 @@ class FullMerchantExtractor:
         api_token: str = "env:OPENAI_API_KEY",
         discovery_cache_dir: str = "./discovery_cache",
         extraction_cache_dir: str = "./schema_cache",
-        output_dir: str = "./merchant_data"
+        output_dir: str = "./merchant_data",
+        browsers: int = 1,
+        tabs_per_browser: int = 4,
+        result_formats: Sequence[str] = ("jsonl",),
+        price_store_dir: Optional[str] = None
     ):
         self.api_token = api_token
+        self.result_formats = tuple(result_formats)
+        # Price observations of every run are also appended to this store
+        self.price_store = PriceStore(price_store_dir) if price_store_dir else None
+        self.browsers = browsers
+        self.tabs_per_browser = tabs_per_browser
         self.discovery_cache_dir = Path(discovery_cache_dir)
         self.extraction_cache_dir = Path(extraction_cache_dir)
         self.output_dir = Path(output_dir)
@@ -57,13 +80,19 @@ class FullMerchantExtractor:
 
         self.extraction_pipeline = ProductExtractionPipeline(
             cache_dir=str(self.extraction_cache_dir),
-            api_token=self.api_token
+            api_token=self.api_token,
+            browsers=self.browsers,
+            tabs_per_browser=self.tabs_per_browser
         )
+        # Long-lived browsers shared by every extraction worker, one tab each
+        await self.extraction_pipeline.__aenter__()
 
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Cleanup services"""
+        if self.extraction_pipeline:
+            await self.extraction_pipeline.__aexit__(exc_type, exc_val, exc_tb)
         if self.discovery_service:
             await self.discovery_service.__aexit__(exc_type, exc_val, exc_tb)
 
@@ -73,22 +102,35 @@ class FullMerchantExtractor:
         discovery_method: str = "auto",
         max_products: int = -1,
         max_urls_discovery: int = -1,
-        sample_first: int = None
+        sample_first: int = None,
+        workers: int = 4,
+        queue_size: int = 100,
+        progress_interval: float = 5.0
     ) -> Dict[str, Any]:
         """
         Complete extraction flow for a merchant.
 
+        Discovery and extraction run as one pipeline: product URLs flow into a
+        bounded queue as discovery finds them and a pool of workers extracts
+        them concurrently. When the queue is full, discovery waits for the
+        workers (backpressure). Each URL's result goes to the run's result
+        sinks as soon as it is extracted; products aren't kept in memory.
+
         Args:
             merchant_url: Merchant website URL
-            discovery_method: "auto", "url_seeding", or "deep_crawl"
+            discovery_method: "auto", "url_seeding", "deep_crawl" or "incremental"
             max_products: Maximum products to extract (-1 for all)
             max_urls_discovery: Maximum URLs to discover (-1 for all)
             sample_first: Extract only first N URLs for testing
+            workers: Concurrent extraction workers
+            queue_size: Discovered URLs buffered ahead of the workers
+            progress_interval: Seconds between live progress reports
 
         Returns:
-            Complete extraction results
+            Run summary (also stored in the run manifest)
         """
         start_time = datetime.now()
+        started = time.perf_counter()
 
         print("\n" + "="*80)
         print(f"🚀 FULL MERCHANT EXTRACTION PIPELINE")
@@ -96,26 +138,122 @@ class FullMerchantExtractor:
         print(f"Merchant: {merchant_url}")
         print(f"Discovery method: {discovery_method}")
         print(f"Max products: {max_products if max_products > 0 else 'unlimited'}")
+        print(f"Workers: {workers} (queue size {queue_size})")
         print(f"Started at: {start_time.isoformat()}")
         print("="*80)
 
-        # PHASE 1: Discover product URLs
+        limits = [n for n in (sample_first, max_products) if n and n > 0]
+        url_limit = min(limits) if limits else None
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        stats = {
+            "queued": 0,
+            "processed": 0,
+            "successful": 0,
+            "failed": 0,
+            "products": 0,
+            "first_price_seconds": None,
+        }
+        run_name = self._run_name(merchant_url, start_time)
+        run = ResultRun(
+            self.output_dir, run_name, formats=self.result_formats,
+            metadata={"merchant_url": merchant_url, "discovery_method": discovery_method, "workers": workers},
+            sinks=[PriceStoreSink(self.price_store, run_id=run_name)] if self.price_store else (),
+        )
+        discovery_done = asyncio.Event()
+
+        async def enqueue(urls: List[str]):
+            for url in urls:
+                if url_limit is not None and stats["queued"] >= url_limit:
+                    return
+                # Blocks while the workers are behind: discovery slows down to their pace
+                await queue.put(url)
+                stats["queued"] += 1
+
+        # The first URL loads (or generates) the merchant's schema; the other
+        # workers wait for it instead of all asking the LLM at once
+        schema_ready = asyncio.Event()
+        schema_lock = asyncio.Lock()
+
+        async def extract(url: str) -> None:
+            try:
+                products = await self.extraction_pipeline.extract_products_from_url(url)
+                error = None
+            except Exception as e:
+                products, error = [], str(e)
+
+            stats["processed"] += 1
+            if products:
+                stats["successful"] += 1
+                stats["products"] += len(products)
+                if stats["first_price_seconds"] is None and any(_price(p) for p in products):
+                    stats["first_price_seconds"] = time.perf_counter() - started
+                    print(f"  💰 First price after {stats['first_price_seconds']:.1f}s")
+            else:
+                stats["failed"] += 1
+                print(f"  {'❌ Error' if error else '⚠️ No products'}: {url}{f' ({error})' if error else ''}")
+
+            run.write(url, products, error)
+
+        async def worker():
+            while True:
+                url = await queue.get()
+                try:
+                    if url is None:
+                        return
+                    if not schema_ready.is_set():
+                        async with schema_lock:
+                            if not schema_ready.is_set():
+                                await extract(url)
+                                schema_ready.set()
+                                continue
+                    await extract(url)
+                finally:
+                    queue.task_done()
+
+        async def report_progress():
+            while True:
+                await asyncio.sleep(progress_interval)
+                elapsed = time.perf_counter() - started
+                rate = stats["processed"] / elapsed * 60 if elapsed else 0
+                phase = "done" if discovery_done.is_set() else "running"
+                print(
+                    f"\n📊 Progress: {stats['processed']}/{stats['queued']} URLs processed "
+                    f"(✅ {stats['successful']} ❌ {stats['failed']}, {stats['products']} products, "
+                    f"{rate:.0f} URLs/min, queue {queue.qsize()}, discovery {phase})"
+                )
+
         print("\n" + "="*80)
-        print("📍 PHASE 1: PRODUCT URL DISCOVERY")
+        print("📍 DISCOVERY → 📦 EXTRACTION (pipelined)")
         print("="*80)
 
-        discovery_result = await self.discovery_service.discover(
-            merchant_url=merchant_url,
-            method=discovery_method,
-            max_urls=max_urls_discovery,
-            max_depth=2,
-            max_pages=100
-        )
-
-        print(f"\n✅ Discovery complete:")
-        print(f"   - Total URLs: {discovery_result.total_urls}")
-        print(f"   - Product URLs: {len(discovery_result.product_urls)}")
-        print(f"   - Method: {discovery_result.discovery_method}")
+        with run:
+            worker_tasks = [asyncio.create_task(worker()) for _ in range(max(workers, 1))]
+            reporter = asyncio.create_task(report_progress())
+            try:
+                discovery_result = await self.discovery_service.discover(
+                    merchant_url=merchant_url,
+                    method=discovery_method,
+                    max_urls=max_urls_discovery,
+                    max_depth=2,
+                    max_pages=100,
+                    on_product_urls=enqueue
+                )
+                discovery_done.set()
+
+                print(f"\n✅ Discovery complete:")
+                print(f"   - Total URLs: {discovery_result.total_urls}")
+                print(f"   - Product URLs: {len(discovery_result.product_urls)}")
+                print(f"   - Method: {discovery_result.discovery_method}")
+
+                for _ in worker_tasks:
+                    await queue.put(None)
+                await asyncio.gather(*worker_tasks)
+            finally:
+                reporter.cancel()
+                for task in worker_tasks:
+                    task.cancel()
+                await asyncio.gather(reporter, *worker_tasks, return_exceptions=True)
 
         if not discovery_result.product_urls:
             print("\n❌ No product URLs found. Exiting.")
@@ -126,69 +264,24 @@ class FullMerchantExtractor:
                 "error": "No product URLs discovered"
             }
 
+        # Merge the small files this run added to the store's partitions
+        compaction = self.price_store.compact() if self.price_store else None
+
         # Save discovery results
         discovery_file = self.discovery_service.save_results(discovery_result)
 
-        # PHASE 2: Extract product data
+        # Compile results
         print("\n" + "="*80)
-        print("📦 PHASE 2: PRODUCT DATA EXTRACTION")
-        print("="*80)
-
-        # Limit URLs if requested
-        product_urls = discovery_result.product_urls
-
-        if sample_first:
-            print(f"🎲 Sampling first {sample_first} URLs for testing")
-            product_urls = product_urls[:sample_first]
-
-        if max_products > 0:
-            product_urls = product_urls[:max_products]
-
-        print(f"\n📋 Processing {len(product_urls)} product URLs...")
-
-        # Extract products (with progress tracking)
-        extraction_results = {}
-        successful_extractions = 0
-        failed_extractions = 0
-
-        for i, url in enumerate(product_urls, 1):
-            print(f"\n[{i}/{len(product_urls)}] Extracting from {url}")
-
-            try:
-                products = await self.extraction_pipeline.extract_products_from_url(url)
-
-                if products:
-                    extraction_results[url] = products
-                    successful_extractions += 1
-                    print(f"  ✅ Extracted {len(products)} product(s)")
-                else:
-                    extraction_results[url] = []
-                    failed_extractions += 1
-                    print(f"  ⚠️ No products extracted")
-
-            except Exception as e:
-                print(f"  ❌ Error: {e}")
-                extraction_results[url] = []
-                failed_extractions += 1
-
-            # Progress update every 10 URLs
-            if i % 10 == 0:
-                print(f"\n📊 Progress: {i}/{len(product_urls)} URLs processed")
-                print(f"   ✅ Successful: {successful_extractions}")
-                print(f"   ❌ Failed: {failed_extractions}")
-
-        # PHASE 3: Compile results
-        print("\n" + "="*80)
-        print("📊 PHASE 3: COMPILING RESULTS")
+        print("📊 COMPILING RESULTS")
         print("="*80)
 
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
-
-        # Flatten all products
-        all_products = []
-        for url, products in extraction_results.items():
-            all_products.extend(products)
+        urls_processed = stats["processed"]
+        successful_extractions = stats["successful"]
+        failed_extractions = stats["failed"]
+        success_rate = successful_extractions / urls_processed * 100 if urls_processed else 0.0
+        merchant_domain = urlparse(merchant_url).netloc
 
         final_results = {
             "merchant_url": merchant_url,
@@ -196,7 +289,9 @@ class FullMerchantExtractor:
                 "start_time": start_time.isoformat(),
                 "end_time": end_time.isoformat(),
                 "duration_seconds": duration,
+                "time_to_first_price_seconds": stats["first_price_seconds"],
                 "discovery_method": discovery_result.discovery_method,
+                "workers": workers,
             },
             "discovery_summary": {
                 "total_urls_discovered": discovery_result.total_urls,
@@ -205,52 +300,58 @@ class FullMerchantExtractor:
                 "discovery_file": str(discovery_file),
             },
             "extraction_summary": {
-                "urls_processed": len(product_urls),
+                "urls_processed": urls_processed,
                 "successful_extractions": successful_extractions,
                 "failed_extractions": failed_extractions,
-                "total_products_extracted": len(all_products),
-                "success_rate": f"{(successful_extractions/len(product_urls)*100):.1f}%" if product_urls else "0%",
+                "total_products_extracted": stats["products"],
+                "success_rate": f"{success_rate:.1f}%",
+                "extraction_modes": dict(self.extraction_pipeline.mode_stats),
+                "structured_data": self.extraction_pipeline.structured_stats.report().get(merchant_domain),
             },
-            "extraction_results": extraction_results,
-            "all_products": all_products,
+            "output": {"files": run.files, "manifest": str(run.manifest_path)},
         }
+        if compaction is not None:
+            final_results["price_store"] = {"root": str(self.price_store.root), "compaction": compaction}
 
-        # Save final results
-        output_file = self._save_results(final_results, merchant_url)
+        # The products are already on disk; the summary goes to the run manifest
+        run.update_metadata(**{k: v for k, v in final_results.items() if k != "output"})
 
         # Print summary
         print("\n" + "="*80)
         print("✅ EXTRACTION COMPLETE")
         print("="*80)
         print(f"Duration: {duration:.1f} seconds")
+        if stats["first_price_seconds"] is not None:
+            print(f"Time to first price: {stats['first_price_seconds']:.1f} seconds")
         print(f"\nDiscovery:")
         print(f"  - URLs discovered: {discovery_result.total_urls}")
         print(f"  - Product URLs: {len(discovery_result.product_urls)}")
         print(f"  - Method: {discovery_result.discovery_method}")
         print(f"\nExtraction:")
-        print(f"  - URLs processed: {len(product_urls)}")
+        print(f"  - URLs processed: {urls_processed}")
         print(f"  - Successful: {successful_extractions}")
         print(f"  - Failed: {failed_extractions}")
-        print(f"  - Success rate: {(successful_extractions/len(product_urls)*100):.1f}%")
-        print(f"  - Total products: {len(all_products)}")
+        print(f"  - Success rate: {success_rate:.1f}%")
+        print(f"  - Total products: {stats['products']}")
+        structured = self.extraction_pipeline.structured_stats.report().get(merchant_domain)
+        if structured:
+            print(f"  - Structured data hit rate: {structured['hit_rate']:.0%} {structured['sources']}")
         print(f"\nOutput:")
-        print(f"  - Results saved to: {output_file}")
+        for fmt, path in run.files.items():
+            print(f"  - Results ({fmt}): {path}")
+        print(f"  - Manifest: {run.manifest_path}")
+        if compaction is not None:
+            print(f"  - Price store: {self.price_store.root} "
+                  f"({compaction['files_before']} -> {compaction['files_after']} files after compaction)")
         print("="*80)
 
         return final_results
 
-    def _save_results(self, results: Dict[str, Any], merchant_url: str) -> Path:
-        """Save final results to file"""
-        # Create filename from merchant URL
-        from urllib.parse import urlparse
+    def _run_name(self, merchant_url: str, start_time: datetime) -> str:
+        """File name stem of a run's result files and manifest"""
         domain = urlparse(merchant_url).netloc.replace(".", "_")
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = self.output_dir / f"merchant_{domain}_{timestamp}.json"
-
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
-
-        return output_file
+        timestamp = start_time.strftime("%Y%m%d_%H%M%S")
+        return f"merchant_{domain}_{timestamp}"
 
 
 async def main():
@@ -266,7 +367,7 @@ async def main():
     parser.add_argument(
         "--method",
         default="auto",
-        choices=["auto", "url_seeding", "deep_crawl"],
+        choices=["auto", "url_seeding", "deep_crawl", "incremental"],
         help="Discovery method (default: auto)"
     )
     parser.add_argument(
@@ -287,6 +388,31 @@ async def main():
         default=None,
         help="Extract only first N URLs for testing"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Concurrent extraction workers (default: 4)"
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=100,
+        help="Discovered URLs buffered ahead of the workers (default: 100)"
+    )
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        default=["jsonl"],
+        choices=["jsonl", "parquet"],
+        help="Result files written while extracting (default: jsonl)"
+    )
+    parser.add_argument(
+        "--price-store",
+        default=None,
+        metavar="DIR",
+        help="Also append price observations to the partitioned Parquet store in DIR"
+    )
     parser.add_argument(
         "--api-token",
         default="env:OPENAI_API_KEY",
@@ -296,13 +422,20 @@ async def main():
     args = parser.parse_args()
 
     # Run extraction
-    async with FullMerchantExtractor(api_token=args.api_token) as extractor:
+    # Workers run as tabs: four per browser
+    browsers = math.ceil(args.workers / 4)
+    async with FullMerchantExtractor(
+        api_token=args.api_token, browsers=browsers, result_formats=args.formats,
+        price_store_dir=args.price_store
+    ) as extractor:
         await extractor.extract_merchant(
             merchant_url=args.merchant,
             discovery_method=args.method,
             max_products=args.max_products,
             max_urls_discovery=args.max_discovery,
-            sample_first=args.sample
+            sample_first=args.sample,
+            workers=args.workers,
+            queue_size=args.queue_size
         )
 
 
@@ -4,24 +4,53 @@ Product Link Discovery Strategy
 
 Discovers ALL product links from e-commerce websites using:
 1. URL Seeding (fast bulk discovery from sitemaps/Common Crawl)
-2. Deep Crawling (fallback for dynamic discovery)
+2. Deep Crawling (dynamic discovery)
 
+In "auto" mode both run concurrently and are merged as URLs arrive; the deep
+crawl is cancelled as soon as seeding alone covers the merchant.
 The strategy automatically detects product URL patterns and filters accordingly.
 """
 
 import asyncio
 import json
+import math
 import re
+import sys
+import time
+from collections import Counter
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Set
+from typing import List, Dict, Any, Optional, Set, Tuple, AsyncIterator, Awaitable, Callable
 from urllib.parse import urlparse, urljoin
 from dataclasses import dataclass, asdict
 
+import aiohttp
 from crawl4ai import AsyncUrlSeeder, SeedingConfig, AsyncWebCrawler, CrawlerRunConfig
 from crawl4ai.deep_crawling import BFSDeepCrawlStrategy, BestFirstCrawlingStrategy
 from crawl4ai.deep_crawling.filters import FilterChain, URLPatternFilter, DomainFilter
 from crawl4ai.deep_crawling.scorers import KeywordRelevanceScorer
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from url_classifier import (
+    ProductUrlClassifier,
+    COMMON_PRODUCT_PATTERNS,
+    PRODUCT_KEYWORDS,
+    EXCLUDE_PATTERNS,
+)
+from url_templates import TemplateInferer, TemplateMatcher, TemplateCache
+from url_batch import UrlBatch
+from discovery_store import DiscoveryStore, DiscoveryDelta, OTHER_PART
+from sitemap_delta import IncrementalSitemapWalker
+
+# BM25 query used to prioritize product URLs
+SCORING_QUERY = "product produto buy comprar price preco purchase"
+
+_URL_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+# Async callback receiving newly found product URLs while discovery is still running
+ProductUrlCallback = Callable[[List[str]], Awaitable[None]]
+
 
 @dataclass
 class DiscoveryResult:
@@ -37,37 +66,31 @@ class DiscoveryResult:
 class ProductLinkDiscovery:
     """Discovers product links from e-commerce websites"""
 
-    # Common product URL patterns for e-commerce sites
-    COMMON_PRODUCT_PATTERNS = [
-        "*/product/*",
-        "*/produtos/*",
-        "*/p/*",
-        "*/pd/*",
-        "*/item/*",
-        "*/items/*",
-        "*-p-*",
-        "*/dp/*",  # Amazon style
-        "*/gp/product/*",  # Amazon style
-    ]
-
-    # Keywords that indicate product pages
-    PRODUCT_KEYWORDS = [
-        "product", "produto", "item", "artigo",
-        "buy", "comprar", "shop", "loja"
-    ]
-
-    # Patterns to exclude (non-product pages)
-    EXCLUDE_PATTERNS = [
-        "*/cart/*", "*/checkout/*", "*/account/*", "*/login/*",
-        "*/register/*", "*/search/*", "*/category/*", "*/categories/*",
-        "*/blog/*", "*/about/*", "*/contact/*", "*/help/*",
-        "*/terms/*", "*/privacy/*", "*/faq/*"
-    ]
-
-    def __init__(self, cache_dir: str = "./discovery_cache"):
+    # Shared with the classifier; see url_classifier.py
+    COMMON_PRODUCT_PATTERNS = COMMON_PRODUCT_PATTERNS
+    PRODUCT_KEYWORDS = PRODUCT_KEYWORDS
+    EXCLUDE_PATTERNS = EXCLUDE_PATTERNS
+
+    # URLs sampled for template learning; matching then runs over the full batch
+    TEMPLATE_LEARN_SAMPLE = 200_000
+
+    # Seeding with at least this many product URLs covers the merchant on its own
+    MIN_SEEDED_PRODUCTS = 10
+    # Deep-crawled URLs are classified and merged in chunks of this size
+    DEEP_CRAWL_CHUNK = 20
+
+    def __init__(self, cache_dir: str = "./discovery_cache", template_cache_dir: str = "./template_cache"):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
         self.seeder = None
+        self.template_cache = TemplateCache(template_cache_dir)
+        self.classifier = ProductUrlClassifier(
+            include_patterns=self.COMMON_PRODUCT_PATTERNS,
+            exclude_patterns=self.EXCLUDE_PATTERNS,
+            keywords=self.PRODUCT_KEYWORDS,
+        )
+        self.template_inferer = TemplateInferer(classifier=self.classifier)
+        self.store = DiscoveryStore(cache_dir)
 
     async def __aenter__(self):
         self.seeder = AsyncUrlSeeder()
@@ -87,98 +110,127 @@ class ProductLinkDiscovery:
         Analyze URLs to detect product-specific patterns.
         Returns list of detected patterns.
         """
-        detected_patterns = set()
-
-        # Count URL path segments to find common patterns
-        path_patterns = {}
-
-        for url in urls[:100]:  # Sample first 100 URLs
-            parsed = urlparse(url)
-            path = parsed.path
-
-            # Check against common patterns
-            for pattern in self.COMMON_PRODUCT_PATTERNS:
-                pattern_regex = pattern.replace("*", ".*").replace("/", "\\/")
-                if re.search(pattern_regex, path):
-                    detected_patterns.add(pattern)
-
-            # Analyze path structure
-            segments = [s for s in path.split('/') if s]
-            if len(segments) >= 2:
-                # Check for product-like patterns
-                for segment in segments:
-                    # Look for product keywords
-                    if any(keyword in segment.lower() for keyword in self.PRODUCT_KEYWORDS):
-                        # Create a pattern from this structure
-                        pattern = f"*/{segment}/*"
-                        detected_patterns.add(pattern)
-
-        return list(detected_patterns) if detected_patterns else self.COMMON_PRODUCT_PATTERNS
+        return self.classifier.detect_patterns(urls, sample_size=100)
 
     def _is_likely_product_url(self, url: str) -> bool:
         """
         Heuristic check if a URL is likely a product page.
         """
-        parsed = urlparse(url)
-        path = parsed.path.lower()
-
-        # Exclude known non-product patterns
-        for exclude_pattern in self.EXCLUDE_PATTERNS:
-            exclude_regex = exclude_pattern.replace("*", ".*").replace("/", "\\/")
-            if re.search(exclude_regex, path):
-                return False
-
-        # Check for product indicators
-        product_indicators = [
-            # Common product URL structures
-            re.search(r'/p(?:roduct)?(?:o)?s?/[\w-]+', path),
-            re.search(r'/item/[\w-]+', path),
-            re.search(r'/dp/[\w-]+', path),
-            re.search(r'-p-\d+', path),
-            # Product ID patterns
-            re.search(r'/\d{4,}', path),  # Long numeric IDs
-            # SKU patterns
-            re.search(r'[\w]+-\d+', path),
-        ]
-
-        # Check query parameters
-        query = parsed.query.lower()
-        query_indicators = [
-            'productid' in query,
-            'product_id' in query,
-            'pid=' in query,
-            'sku=' in query,
-        ]
-
-        return any(product_indicators) or any(query_indicators)
+        return self.classifier.is_product(url)
 
     def _filter_product_urls(self, urls: List[Dict[str, Any]]) -> List[str]:
         """
         Filter URLs to keep only product pages.
         """
-        product_urls = []
-
-        for url_data in urls:
-            url = url_data.get('url', '')
+        batch = UrlBatch.from_seeder(urls)
+        return batch.filter(batch.classify(self.classifier)).to_pylist()
 
-            if not url:
-                continue
+    async def _filter_with_templates(
+        self,
+        domain: str,
+        batch: UrlBatch,
+        cache_learned: bool = True
+    ) -> Optional[Tuple[UrlBatch, List[str]]]:
+        """
+        Filter URLs with the merchant's learned product templates.
+
+        Uses the cached templates when they still match something, otherwise
+        learns them from a sample of `batch` and caches them (unless
+        `cache_learned` is off: templates learned from a partial batch must
+        not replace those learned from the full catalogue). Returns
+        (product_batch, template_patterns), or None when no product template
+        could be found.
+        """
+        templates = self.template_cache.load(domain)
+        if templates:
+            product_templates = [t for t in templates if t.is_product]
+            matched = batch.filter(batch.match_templates(TemplateMatcher(product_templates)))
+            if len(matched):
+                print(f"📐 Using {len(product_templates)} cached URL templates for {domain}")
+                return matched, [t.pattern for t in product_templates]
+
+        learned = self.template_inferer.learn(batch.sample(self.TEMPLATE_LEARN_SAMPLE).to_pylist())
+        product_templates = await self.template_inferer.select_product_templates(learned)
+        if not product_templates:
+            return None
+
+        if cache_learned:
+            self.template_cache.save(domain, learned)
+        print(f"📐 Learned {len(learned)} URL templates, {len(product_templates)} product:")
+        for template in product_templates:
+            print(f"  - {template.pattern} ({template.count} URLs)")
+        matched = batch.filter(batch.match_templates(TemplateMatcher(product_templates)))
+        return matched, [t.pattern for t in product_templates]
+
+    async def _seed_urls(self, domain: str, max_urls: int = -1) -> List[Dict[str, Any]]:
+        """Fetch the merchant's URLs from sitemap and Common Crawl (one pass)"""
+        config = SeedingConfig(
+            source="sitemap+cc",  # Use both sources for maximum coverage
+            extract_head=False,   # Fast discovery without metadata
+            max_urls=max_urls if max_urls > 0 else -1,
+            concurrency=50,
+            verbose=True,
+            filter_nonsense_urls=True,  # Remove utility URLs
+        )
+        return await self.seeder.urls(domain, config)
 
-            # Check if URL is valid
-            if url_data.get('status') == 'not_valid':
-                continue
+    async def _select_product_urls(
+        self,
+        domain: str,
+        batch: UrlBatch,
+        use_templates: bool = True,
+        cache_templates: bool = True
+    ) -> Tuple[UrlBatch, List[str]]:
+        """Pick product URLs out of a deduplicated batch; returns (products, patterns)"""
+        templated = await self._filter_with_templates(domain, batch, cache_templates) if use_templates else None
+        if templated:
+            # Learned templates already selected the product URLs
+            return templated
+
+        detected_patterns = self._detect_product_patterns(batch.urls.slice(0, 100).to_pylist())
+        print(f"📋 Detected patterns: {detected_patterns}")
+        return batch.filter(batch.classify(self.classifier)), detected_patterns
 
-            # Check if it's a product URL
-            if self._is_likely_product_url(url):
-                product_urls.append(url)
+    def _score_urls(self, urls: List[str], query: str = SCORING_QUERY) -> List[str]:
+        """
+        Rank already-discovered URLs with BM25 over their path tokens.
 
-        return product_urls
+        Only reorders: URLs matching the query come first and nothing is
+        dropped (most product URLs carry none of the query words, so a
+        score cut would discard them). Ties keep their discovery order.
+        """
+        terms = set(query.lower().split())
+        docs = [_URL_TOKEN_RE.findall(urlparse(url).path.lower()) for url in urls]
+        if not docs:
+            return urls
+
+        doc_freq = Counter(term for doc in docs for term in set(doc) if term in terms)
+        if not doc_freq:
+            return urls
+
+        n_docs = len(docs)
+        avg_len = sum(len(doc) for doc in docs) / n_docs or 1.0
+        idf = {t: math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) for t, df in doc_freq.items()}
+        k1, b = 1.2, 0.75
+
+        scores = []
+        for doc in docs:
+            counts = Counter(doc)
+            norm = k1 * (1 - b + b * len(doc) / avg_len)
+            scores.append(sum(
+                idf[t] * counts[t] * (k1 + 1) / (counts[t] + norm)
+                for t in idf if counts[t]
+            ))
+
+        ranked = sorted(zip(scores, urls), key=lambda pair: pair[0], reverse=True)
+        return [url for _, url in ranked]
 
     async def discover_via_url_seeding(
         self,
         merchant_url: str,
         max_urls: int = -1,
-        use_scoring: bool = False
+        use_scoring: bool = False,
+        use_templates: bool = True
     ) -> DiscoveryResult:
         """
         Discover product links using URL seeding (fast bulk discovery).
@@ -186,7 +238,8 @@ class ProductLinkDiscovery:
         Args:
             merchant_url: Base URL of the merchant site
             max_urls: Maximum URLs to discover (-1 for unlimited)
-            use_scoring: Whether to use BM25 scoring for relevance
+            use_scoring: Rank product URLs with BM25 (computed on the seeded set)
+            use_templates: Filter with learned URL templates instead of heuristics
         """
         print(f"\n🔍 Starting URL seeding discovery for {merchant_url}")
 
@@ -195,17 +248,8 @@ class ProductLinkDiscovery:
         # Step 1: Initial discovery without filtering
         print("📡 Discovering URLs from sitemap and Common Crawl...")
 
-        config = SeedingConfig(
-            source="sitemap+cc",  # Use both sources for maximum coverage
-            extract_head=False,   # Fast discovery without metadata
-            max_urls=max_urls if max_urls > 0 else -1,
-            concurrency=50,
-            verbose=True,
-            filter_nonsense_urls=True,  # Remove utility URLs
-        )
-
         try:
-            discovered_urls = await self.seeder.urls(domain, config)
+            discovered_urls = await self._seed_urls(domain, max_urls)
             print(f"✅ Discovered {len(discovered_urls)} total URLs")
         except Exception as e:
             print(f"❌ URL seeding failed: {e}")
@@ -229,44 +273,20 @@ class ProductLinkDiscovery:
                 metadata={}
             )
 
-        # Step 2: Detect product URL patterns
+        # Step 2-3: Detect product URL patterns and filter for product URLs
         print("\n🔎 Analyzing URL patterns...")
-        url_list = [u['url'] for u in discovered_urls]
-        detected_patterns = self._detect_product_patterns(url_list)
-        print(f"📋 Detected patterns: {detected_patterns}")
+        batch = UrlBatch.from_seeder(discovered_urls).dedup()
+        product_batch, detected_patterns = await self._select_product_urls(domain, batch, use_templates)
 
-        # Step 3: Filter for product URLs
-        print("\n🎯 Filtering product URLs...")
-        product_urls = self._filter_product_urls(discovered_urls)
+        # Stages above pass columnar batches; the result keeps a JSON-friendly list
+        product_urls = product_batch.to_pylist()
         print(f"✅ Found {len(product_urls)} product URLs")
 
-        # Step 4: Optional BM25 scoring for prioritization
+        # Step 4: Optional BM25 scoring for prioritization, on the URLs we already have
         if use_scoring and product_urls:
             print("\n📊 Applying BM25 scoring for prioritization...")
-
-            config_scored = SeedingConfig(
-                source="sitemap+cc",
-                extract_head=True,
-                query="product buy price purchase",
-                scoring_method="bm25",
-                score_threshold=0.3,
-                max_urls=max_urls if max_urls > 0 else -1,
-                concurrency=20,
-                verbose=True,
-            )
-
-            try:
-                scored_urls = await self.seeder.urls(domain, config_scored)
-                scored_product_urls = [
-                    u['url'] for u in scored_urls
-                    if self._is_likely_product_url(u['url'])
-                ]
-
-                if scored_product_urls:
-                    product_urls = scored_product_urls
-                    print(f"✅ Refined to {len(product_urls)} scored product URLs")
-            except Exception as e:
-                print(f"⚠️ Scoring failed, using unscored results: {e}")
+            product_urls = self._score_urls(product_urls)
+            print(f"✅ Ranked {len(product_urls)} product URLs")
 
         return DiscoveryResult(
             merchant_url=merchant_url,
@@ -280,22 +300,13 @@ class ProductLinkDiscovery:
             }
         )
 
-    async def discover_via_deep_crawl(
+    async def _iter_deep_crawl(
         self,
         merchant_url: str,
         max_depth: int = 2,
         max_pages: int = 100
-    ) -> DiscoveryResult:
-        """
-        Discover product links using deep crawling (dynamic discovery).
-
-        Args:
-            merchant_url: Starting URL
-            max_depth: Maximum depth to crawl
-            max_pages: Maximum pages to crawl
-        """
-        print(f"\n🕷️ Starting deep crawl discovery for {merchant_url}")
-
+    ) -> AsyncIterator[str]:
+        """Stream URLs of successfully crawled pages as the deep crawl reaches them"""
         domain = self._get_domain(merchant_url)
 
         # Create filters for product pages
@@ -325,19 +336,36 @@ class ProductLinkDiscovery:
             verbose=True
         )
 
+        async with AsyncWebCrawler() as crawler:
+            async for result in await crawler.arun(merchant_url, config=config):
+                if result.success:
+                    yield result.url
+
+    async def discover_via_deep_crawl(
+        self,
+        merchant_url: str,
+        max_depth: int = 2,
+        max_pages: int = 100
+    ) -> DiscoveryResult:
+        """
+        Discover product links using deep crawling (dynamic discovery).
+
+        Args:
+            merchant_url: Starting URL
+            max_depth: Maximum depth to crawl
+            max_pages: Maximum pages to crawl
+        """
+        print(f"\n🕷️ Starting deep crawl discovery for {merchant_url}")
+
         discovered_urls = []
 
         try:
-            async with AsyncWebCrawler() as crawler:
-                print(f"🚀 Crawling {merchant_url} (max_depth={max_depth}, max_pages={max_pages})")
-
-                async for result in await crawler.arun(merchant_url, config=config):
-                    if result.success:
-                        url = result.url
-                        discovered_urls.append(url)
-                        print(f"  ✓ Discovered: {url}")
+            print(f"🚀 Crawling {merchant_url} (max_depth={max_depth}, max_pages={max_pages})")
+            async for url in self._iter_deep_crawl(merchant_url, max_depth, max_pages):
+                discovered_urls.append(url)
+                print(f"  ✓ Discovered: {url}")
 
-                print(f"\n✅ Deep crawl completed: {len(discovered_urls)} URLs discovered")
+            print(f"\n✅ Deep crawl completed: {len(discovered_urls)} URLs discovered")
 
         except Exception as e:
             print(f"❌ Deep crawl failed: {e}")
@@ -351,7 +379,8 @@ class ProductLinkDiscovery:
             )
 
         # Filter for product URLs
-        product_urls = [url for url in discovered_urls if self._is_likely_product_url(url)]
+        batch = UrlBatch.from_urls(discovered_urls).dedup()
+        product_urls = batch.filter(batch.classify(self.classifier)).to_pylist()
 
         # Detect patterns
         detected_patterns = self._detect_product_patterns(product_urls)
@@ -368,64 +397,326 @@ class ProductLinkDiscovery:
             }
         )
 
-    async def discover(
+    async def discover_hybrid(
         self,
         merchant_url: str,
-        method: str = "auto",
         max_urls: int = -1,
         max_depth: int = 2,
-        max_pages: int = 100
+        max_pages: int = 100,
+        min_product_urls: Optional[int] = None,
+        target_product_urls: Optional[int] = None,
+        use_scoring: bool = False,
+        use_templates: bool = True,
+        on_product_urls: Optional[ProductUrlCallback] = None
     ) -> DiscoveryResult:
         """
-        Discover product links using the specified method.
+        Run URL seeding and deep crawling concurrently, merging URLs as they arrive.
+
+        Both sources feed one queue. Each chunk is deduplicated, filtered for
+        product URLs and merged into the running result. The deep crawl is
+        cancelled once coverage is met: seeding finished with at least
+        `min_product_urls` product URLs, or `target_product_urls` were found
+        in total.
 
         Args:
             merchant_url: Merchant website URL
-            method: Discovery method - "url_seeding", "deep_crawl", or "auto"
             max_urls: Maximum URLs for URL seeding (-1 for unlimited)
             max_depth: Maximum depth for deep crawling
             max_pages: Maximum pages for deep crawling
+            min_product_urls: Seeded product URLs that make the deep crawl unnecessary
+            target_product_urls: Stop the deep crawl once this many product URLs are known
+            use_scoring: Rank product URLs with BM25 (computed on the merged set)
+            use_templates: Filter seeded URLs with learned URL templates
+            on_product_urls: Awaited with each chunk of new product URLs as it is merged
         """
-        if method == "auto":
-            # Try URL seeding first (faster)
-            result = await self.discover_via_url_seeding(merchant_url, max_urls)
+        if min_product_urls is None:
+            min_product_urls = self.MIN_SEEDED_PRODUCTS
 
-            # If URL seeding found few results, try deep crawl
-            if len(result.product_urls) < 10:
-                print("\n⚠️ URL seeding found few results, trying deep crawl...")
-                deep_result = await self.discover_via_deep_crawl(
-                    merchant_url, max_depth, max_pages
+        print(f"\n🔀 Starting hybrid discovery for {merchant_url}")
+        domain = self._get_domain(merchant_url)
+        started = asyncio.get_running_loop().time()
+
+        queue: asyncio.Queue = asyncio.Queue()
+        totals = {"url_seeding": 0, "deep_crawl": 0}
+        errors: Dict[str, str] = {}
+
+        async def seed():
+            try:
+                print("📡 Discovering URLs from sitemap and Common Crawl...")
+                records = await self._seed_urls(domain, max_urls)
+                totals["url_seeding"] = len(records)
+                print(f"✅ Seeding discovered {len(records)} total URLs")
+                queue.put_nowait(("url_seeding", UrlBatch.from_seeder(records)))
+            except Exception as e:
+                print(f"❌ URL seeding failed: {e}")
+                errors["url_seeding"] = str(e)
+            finally:
+                queue.put_nowait(("url_seeding", None))
+
+        async def crawl():
+            chunk = []
+            try:
+                async for url in self._iter_deep_crawl(merchant_url, max_depth, max_pages):
+                    totals["deep_crawl"] += 1
+                    chunk.append(url)
+                    if len(chunk) >= self.DEEP_CRAWL_CHUNK:
+                        queue.put_nowait(("deep_crawl", UrlBatch.from_urls(chunk)))
+                        chunk = []
+            except Exception as e:
+                print(f"❌ Deep crawl failed: {e}")
+                errors["deep_crawl"] = str(e)
+            finally:
+                if chunk:
+                    queue.put_nowait(("deep_crawl", UrlBatch.from_urls(chunk)))
+                queue.put_nowait(("deep_crawl", None))
+
+        seed_task = asyncio.create_task(seed())
+        crawl_task = asyncio.create_task(crawl())
+
+        seen: Set[str] = set()
+        product_urls: List[str] = []
+        found = {"url_seeding": 0, "deep_crawl": 0}
+        detected_patterns: List[str] = []
+        running = {"url_seeding", "deep_crawl"}
+        crawl_cancelled = False
+
+        try:
+            while running:
+                source, batch = await queue.get()
+                if batch is None:
+                    running.discard(source)
+                else:
+                    batch = batch.dedup()
+                    if source == "url_seeding":
+                        print("\n🔎 Analyzing seeded URL patterns...")
+                        product_batch, detected_patterns = await self._select_product_urls(
+                            domain, batch, use_templates
+                        )
+                    else:
+                        product_batch = batch.filter(batch.classify(self.classifier))
+
+                    new_urls = [url for url in product_batch.to_pylist() if url not in seen]
+                    seen.update(new_urls)
+                    product_urls.extend(new_urls)
+                    found[source] += len(new_urls)
+                    print(f"  + {len(new_urls)} product URLs from {source} ({len(product_urls)} total)")
+                    if on_product_urls and new_urls:
+                        await on_product_urls(new_urls)
+
+                covered = (
+                    ("url_seeding" not in running and found["url_seeding"] >= min_product_urls)
+                    or (target_product_urls is not None and len(product_urls) >= target_product_urls)
                 )
+                if covered and "deep_crawl" in running:
+                    print("🎯 Coverage met, cancelling deep crawl")
+                    crawl_task.cancel()
+                    crawl_cancelled = True
+                    running.discard("deep_crawl")
+        finally:
+            for task in (seed_task, crawl_task):
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(seed_task, crawl_task, return_exceptions=True)
+
+        if not detected_patterns and product_urls:
+            detected_patterns = self._detect_product_patterns(product_urls)
 
-                # Combine results
-                if deep_result.product_urls:
-                    combined_urls = list(set(result.product_urls + deep_result.product_urls))
-                    return DiscoveryResult(
-                        merchant_url=merchant_url,
-                        total_urls=result.total_urls + deep_result.total_urls,
-                        product_urls=combined_urls,
-                        discovery_method="hybrid",
-                        url_patterns_detected=list(set(
-                            result.url_patterns_detected +
-                            deep_result.url_patterns_detected
-                        )),
-                        metadata={
-                            "url_seeding_count": len(result.product_urls),
-                            "deep_crawl_count": len(deep_result.product_urls)
-                        }
-                    )
+        if use_scoring and product_urls:
+            print("\n📊 Applying BM25 scoring for prioritization...")
+            product_urls = self._score_urls(product_urls)
+
+        elapsed = asyncio.get_running_loop().time() - started
+        print(f"✅ Hybrid discovery found {len(product_urls)} product URLs in {elapsed:.1f}s")
 
+        return DiscoveryResult(
+            merchant_url=merchant_url,
+            total_urls=totals["url_seeding"] + totals["deep_crawl"],
+            product_urls=product_urls,
+            discovery_method="hybrid" if found["deep_crawl"] else "url_seeding",
+            url_patterns_detected=detected_patterns,
+            metadata={
+                "url_seeding_count": found["url_seeding"],
+                "deep_crawl_count": found["deep_crawl"],
+                "deep_crawl_pages": totals["deep_crawl"],
+                "deep_crawl_cancelled": crawl_cancelled,
+                # Seeding stopped at max_urls, so sitemap parts may hold products not in the result
+                "truncated": 0 < max_urls <= totals["url_seeding"],
+                "scoring_used": use_scoring,
+                "elapsed_seconds": round(elapsed, 2),
+                **({"errors": errors} if errors else {}),
+            }
+        )
+
+    async def discover_incremental(
+        self,
+        merchant_url: str,
+        use_templates: bool = True
+    ) -> DiscoveryResult:
+        """
+        Re-discover a known merchant from its stored result and changed sitemap parts.
+
+        Only sitemap parts whose lastmod or ETag/Last-Modified changed are
+        downloaded and filtered; the product URLs of the others come from the
+        store. URLs stored from non-sitemap sources (Common Crawl, deep crawl)
+        are carried over. The result's metadata holds the delta of added and
+        removed product URLs.
+
+        Args:
+            merchant_url: Merchant website URL
+            use_templates: Filter changed parts with learned URL templates
+        """
+        print(f"\n♻️ Starting incremental discovery for {merchant_url}")
+        domain = self._get_domain(merchant_url)
+        started = time.perf_counter()
+
+        previous = self.store.load(domain)
+        if previous:
+            print(f"📦 Loaded {len(previous)} stored product URLs ({previous.updated_at})")
+
+        async with aiohttp.ClientSession() as session:
+            walker = IncrementalSitemapWalker(session, previous.parts if previous else None)
+            walk = await walker.walk(merchant_url)
+
+        print(
+            f"🗺️ {len(walk.changed)} sitemap parts changed, {len(walk.unchanged)} unchanged "
+            f"({walk.requests} requests, {walk.not_modified} not modified, "
+            f"{walk.skipped_by_lastmod} skipped by lastmod)"
+        )
+
+        if not walk.found_any:
+            print("⚠️ No sitemap found, running full discovery")
+            result = await self.discover_hybrid(merchant_url)
+            await self.save_store(result)
             return result
 
-        elif method == "url_seeding":
-            return await self.discover_via_url_seeding(merchant_url, max_urls)
+        part_products: Dict[str, List[str]] = {
+            part_url: previous.part_urls(part_url) for part_url in walk.unchanged
+        } if previous else {}
+        detected_patterns = previous.patterns if previous else []
 
-        elif method == "deep_crawl":
-            return await self.discover_via_deep_crawl(merchant_url, max_depth, max_pages)
+        if walk.changed:
+            part_batches = {
+                part_url: UrlBatch.from_urls(urls).dedup() for part_url, urls in walk.changed.items()
+            }
+            batch = UrlBatch.concat(list(part_batches.values())).unique()
+            # Changed parts are a partial batch: templates learned from them aren't cached
+            product_batch, detected_patterns = await self._select_product_urls(
+                domain, batch, use_templates, cache_templates=False
+            )
+            for part_url, part_batch in part_batches.items():
+                part_products[part_url] = part_batch.filter(part_batch.isin(product_batch)).to_pylist()
+
+        if previous:
+            # Non-sitemap URLs are kept unless a sitemap part now lists them
+            in_sitemaps = {u for urls in part_products.values() for u in urls}
+            part_products[OTHER_PART] = [
+                u for u in previous.part_urls(OTHER_PART) if u not in in_sitemaps
+            ]
+
+        stored = self.store.save(domain, merchant_url, part_products, walk.parts, detected_patterns)
+        delta = previous.delta(stored.urls) if previous else DiscoveryDelta(added=list(stored.urls), removed=[])
+
+        elapsed = time.perf_counter() - started
+        print(f"✅ {len(stored)} product URLs (+{len(delta.added)} / -{len(delta.removed)}) in {elapsed:.1f}s")
+
+        return DiscoveryResult(
+            merchant_url=merchant_url,
+            total_urls=sum(len(urls) for urls in walk.changed.values()),
+            product_urls=stored.urls,
+            discovery_method="incremental",
+            url_patterns_detected=detected_patterns,
+            metadata={
+                "delta": asdict(delta),
+                "parts_changed": len(walk.changed),
+                "parts_unchanged": len(walk.unchanged),
+                "sitemap_requests": walk.requests,
+                "elapsed_seconds": round(elapsed, 2),
+            }
+        )
+
+    async def discover(
+        self,
+        merchant_url: str,
+        method: str = "auto",
+        max_urls: int = -1,
+        max_depth: int = 2,
+        max_pages: int = 100,
+        use_cache: bool = True,
+        on_product_urls: Optional[ProductUrlCallback] = None
+    ) -> DiscoveryResult:
+        """
+        Discover product links using the specified method.
 
+        Args:
+            merchant_url: Merchant website URL
+            method: Discovery method - "url_seeding", "deep_crawl", "incremental",
+                or "auto" (incremental for known merchants, otherwise hybrid)
+            max_urls: Maximum URLs for URL seeding (-1 for unlimited)
+            max_depth: Maximum depth for deep crawling
+            max_pages: Maximum pages for deep crawling
+            use_cache: In "auto", reuse and update the stored result
+            on_product_urls: Awaited with product URLs as they are found (streamed
+                by hybrid discovery, delivered once at the end by the other methods)
+        """
+        if method == "auto" and not (use_cache and self.store.exists(self._get_domain(merchant_url))):
+            # Seed and deep crawl concurrently; the crawl stops once seeding covers the merchant
+            result = await self.discover_hybrid(
+                merchant_url, max_urls, max_depth, max_pages, on_product_urls=on_product_urls
+            )
+            if use_cache:
+                await self.save_store(result)
+            return result
+
+        if method in ("auto", "incremental"):
+            result = await self.discover_incremental(merchant_url)
+        elif method == "url_seeding":
+            result = await self.discover_via_url_seeding(merchant_url, max_urls)
+        elif method == "deep_crawl":
+            result = await self.discover_via_deep_crawl(merchant_url, max_depth, max_pages)
         else:
             raise ValueError(f"Unknown method: {method}")
 
+        if on_product_urls and result.product_urls:
+            await on_product_urls(result.product_urls)
+        return result
+
+    async def save_store(self, result: DiscoveryResult) -> None:
+        """
+        Store a full discovery result compactly so later runs can be incremental.
+
+        Product URLs are grouped by the sitemap part listing them (one full
+        sitemap walk), so an incremental run reports URLs that leave the
+        sitemap as removed; only URLs no sitemap lists go to OTHER_PART.
+        A result cut off by max_urls is stored without the parts' validators,
+        so the next incremental run downloads every part again instead of
+        taking the products that were cut off as unchanged.
+        """
+        if not result.product_urls:
+            return
+        async with aiohttp.ClientSession() as session:
+            walk = await IncrementalSitemapWalker(session).walk(result.merchant_url)
+
+        # Sitemap locs are compared in the canonical form the result's URLs are in
+        products = UrlBatch.from_urls(result.product_urls)
+        part_products: Dict[str, List[str]] = {}
+        for part_url, urls in walk.changed.items():
+            part_batch = UrlBatch.from_urls(urls).dedup()
+            part_products[part_url] = part_batch.filter(part_batch.isin(products)).to_pylist()
+        listed = {u for urls in part_products.values() for u in urls}
+        part_products[OTHER_PART] = [u for u in result.product_urls if u not in listed]
+
+        parts = walk.parts
+        if result.metadata.get("truncated"):
+            print("⚠️ Discovery was cut off by max_urls; sitemap parts will be re-read next run")
+            parts = None
+        self.store.save(
+            self._get_domain(result.merchant_url),
+            result.merchant_url,
+            part_products,
+            parts,
+            patterns=result.url_patterns_detected,
+        )
+
     def save_results(self, result: DiscoveryResult, output_file: str = None) -> Path:
         """Save discovery results to JSON file"""
         if output_file is None:
@@ -451,7 +742,7 @@ async def main():
         # Discover product links
         result = await discovery.discover(
             merchant_url=merchant_url,
-            method="auto",  # Try URL seeding first, fallback to deep crawl
+            method="auto",  # URL seeding and deep crawl concurrently
             max_urls=1000,  # Limit for testing
             max_depth=2,
             max_pages=100
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+LLM Schema Providers
+
+Schema generation goes through a SchemaProvider, so the pipeline doesn't
+depend on one LLM client:
+- Crawl4aiSchemaProvider: crawl4ai's JsonCssExtractionStrategy.generate_schema
+  (litellm providers such as "openai/gpt-4o-mini"; needs an API token)
+- ChatCompletionsSchemaProvider: any OpenAI-compatible /chat/completions
+  endpoint, such as the local stand-in (llm_standin.py), vLLM or Ollama
+
+`provider_from_config` picks one from the pipeline's llm_provider string:
+"local/<model>" means the chat-completions endpoint at `base_url`.
+"""
+
+import asyncio
+import json
+import re
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+
+DEFAULT_STANDIN_URL = "http://localhost:8799/v1"
+
+SYSTEM_PROMPT = (
+    "You write CSS extraction schemas for crawl4ai's JsonCssExtractionStrategy. "
+    "Reply with one JSON object only: {\"name\": str, \"baseSelector\": str, "
+    "\"fields\": [{\"name\": str, \"selector\": str, \"type\": \"text\" | \"attribute\", "
+    "\"attribute\": str (attribute fields only)}]}."
+)
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+class SchemaProviderError(Exception):
+    """The LLM endpoint failed or returned no usable schema"""
+
+
+def parse_schema_json(content: str) -> Dict[str, Any]:
+    """Schema object from an LLM reply (bare JSON, fenced, or with surrounding prose)"""
+    text = _FENCE.sub("", content.strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise SchemaProviderError(f"No JSON object in reply: {content[:200]!r}")
+    try:
+        schema = json.loads(text[start:end + 1])
+    except json.JSONDecodeError as e:
+        raise SchemaProviderError(f"Invalid JSON in reply: {e}") from e
+    if not isinstance(schema, dict) or "fields" not in schema:
+        raise SchemaProviderError("Reply is not an extraction schema")
+    return schema
+
+
+class SchemaProvider:
+    """Generates a JsonCssExtractionStrategy schema from page HTML and a query"""
+    name = "base"
+
+    def check(self):
+        """Raise if the provider can't be used (checked before the page is crawled)"""
+
+    async def generate_schema(self, html: str, query: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class Crawl4aiSchemaProvider(SchemaProvider):
+    """crawl4ai's LLM schema generation (run in a thread, it blocks)"""
+
+    def __init__(self, provider: str = "openai/gpt-4o-mini", api_token: Optional[str] = None, base_url: Optional[str] = None):
+        """
+        Args:
+            provider: litellm provider/model string
+            api_token: API token (or "env:VAR")
+            base_url: Optional API base URL (e.g. an OpenAI-compatible proxy)
+        """
+        self.name = provider
+        self.provider = provider
+        self.api_token = api_token
+        self.base_url = base_url
+
+    def check(self):
+        if not self.api_token:
+            raise ValueError("API token required for schema generation")
+
+    async def generate_schema(self, html: str, query: str) -> Dict[str, Any]:
+        from crawl4ai import JsonCssExtractionStrategy, LLMConfig
+
+        self.check()
+        llm_config = LLMConfig(provider=self.provider, api_token=self.api_token, base_url=self.base_url)
+        return await asyncio.to_thread(
+            JsonCssExtractionStrategy.generate_schema, html=html, query=query, llm_config=llm_config,
+        )
+
+
+class ChatCompletionsSchemaProvider(SchemaProvider):
+    """Schema generation over an OpenAI-compatible /chat/completions endpoint"""
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_STANDIN_URL,
+        model: str = "standin",
+        api_key: Optional[str] = None,
+        timeout: int = 120,
+    ):
+        """
+        Args:
+            base_url: API base URL, up to and including /v1
+            model: Model name sent with each request
+            api_key: Bearer token, if the endpoint needs one
+            timeout: Request timeout in seconds
+        """
+        self.name = f"local/{model}"
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def generate_schema(self, html: str, query: str) -> Dict[str, Any]:
+        if self.session is None:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self.session = aiohttp.ClientSession(headers=headers, timeout=self.timeout)
+        payload = {
+            "model": self.model,
+            "temperature": 0,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": f"{query}\n\nHTML:\n{html}"},
+            ],
+        }
+        try:
+            async with self.session.post(f"{self.base_url}/chat/completions", json=payload) as resp:
+                if resp.status != 200:
+                    raise SchemaProviderError(f"HTTP {resp.status}: {(await resp.text())[:200]}")
+                data = await resp.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            raise SchemaProviderError(f"{type(e).__name__}: {e}") from e
+        try:
+            content = data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise SchemaProviderError(f"Unexpected reply shape: {str(data)[:200]}") from e
+        if not isinstance(content, str):
+            raise SchemaProviderError(f"No text content in reply: {content!r}")
+        return parse_schema_json(content)
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+
+def provider_from_config(
+    llm_provider: str, api_token: Optional[str] = None, base_url: Optional[str] = None
+) -> SchemaProvider:
+    """'local/<model>' -> chat-completions endpoint at base_url, anything else -> crawl4ai/litellm"""
+    if llm_provider.startswith("local/"):
+        return ChatCompletionsSchemaProvider(
+            base_url or DEFAULT_STANDIN_URL, model=llm_provider.split("/", 1)[1], api_key=api_token,
+        )
+    return Crawl4aiSchemaProvider(llm_provider, api_token, base_url)
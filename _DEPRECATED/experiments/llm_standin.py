@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Local LLM Stand-in
+
+A deterministic, OpenAI-compatible /v1/chat/completions server for load
+tests and benchmarks of schema generation without network or API keys:
+- Replies with a canned schema: the one whose selectors (class names, ids,
+  attribute values) best match the HTML in the prompt, else a generic
+  h1/[class*=price] schema
+- Latency of `latency` seconds plus `per_1k_tokens` per thousand prompt
+  tokens, so smaller prompts answer faster like a real model
+- A `failure_rate` share of requests fails with HTTP 500; which ones is
+  decided by a hash of the prompt and how often it was seen, so runs are
+  reproducible whatever the request order
+- GET /v1/stats reports requests, failures, prompt tokens and replies per schema
+
+Usage:
+    python llm_standin.py --port 8799 --latency 0.8 --failure-rate 0.1
+    # pipeline: ProductExtractionPipeline(llm_provider="local/standin",
+    #                                     llm_base_url="http://localhost:8799/v1")
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+from html_pruning import estimate_tokens
+
+
+GENERIC_SCHEMA = {
+    "name": "generic",
+    "baseSelector": "body",
+    "fields": [
+        {"name": "product_name", "selector": "h1", "type": "text"},
+        {"name": "current_price", "selector": "[class*=price]", "type": "text"},
+    ],
+}
+
+_SELECTOR_TOKENS = re.compile(r"[.#]([A-Za-z_][\w-]*)|\[[\w-]+\s*[*^$~|]?=\s*['\"]?([^'\"\]]+)")
+# Share of a canned schema's selector tokens that must occur in the prompt
+MIN_MATCH = 0.5
+
+
+def selector_tokens(schema: Dict[str, Any]) -> List[str]:
+    """Class names, ids and attribute values a schema's selectors rely on"""
+    selectors = [schema.get("baseSelector", "")]
+    stack = list(schema.get("fields", []))
+    while stack:
+        field = stack.pop()
+        selectors.append(field.get("selector", ""))
+        stack.extend(field.get("fields", []))
+    return sorted({a or b for s in selectors for a, b in _SELECTOR_TOKENS.findall(s or "")})
+
+
+def load_canned_schemas(directory: Path) -> Dict[str, Dict[str, Any]]:
+    """Schemas (pattern_*.json) in a schema cache directory, by file stem"""
+    return {
+        path.stem: json.loads(path.read_text(encoding="utf-8"))
+        for path in sorted(Path(directory).glob("pattern_*.json"))
+    }
+
+
+class StandInLLM:
+    """Canned-schema chat-completions endpoint with configurable latency and failures"""
+
+    def __init__(
+        self,
+        schemas: Dict[str, Dict[str, Any]],
+        latency: float = 0.5,
+        per_1k_tokens: float = 0.05,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            schemas: Canned schemas by name
+            latency: Fixed seconds per reply
+            per_1k_tokens: Extra seconds per 1000 prompt tokens
+            failure_rate: Share of requests answered with HTTP 500
+            seed: Changes which requests fail
+        """
+        self.schemas = schemas
+        self.tokens = {name: selector_tokens(schema) for name, schema in schemas.items()}
+        self.latency = latency
+        self.per_1k_tokens = per_1k_tokens
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self._seen: Counter = Counter()
+        self.stats = {"requests": 0, "failures": 0, "prompt_tokens": 0, "replies": Counter()}
+
+    def choose(self, prompt: str) -> str:
+        """Name of the canned schema best matching the prompt, or 'generic'"""
+        best, best_score = "generic", MIN_MATCH
+        for name, tokens in self.tokens.items():
+            if tokens:
+                score = sum(token in prompt for token in tokens) / len(tokens)
+                if score >= best_score:
+                    best, best_score = name, score
+        return best
+
+    def _fails(self, prompt: str) -> bool:
+        digest = hashlib.blake2b(prompt.encode(), digest_size=8)
+        self._seen[digest.hexdigest()] += 1
+        digest.update(f"{self.seed}:{self._seen[digest.hexdigest()]}".encode())
+        return int.from_bytes(digest.digest(), "little") / 2 ** 64 < self.failure_rate
+
+    async def chat_completions(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        tokens = estimate_tokens(prompt)
+        self.stats["requests"] += 1
+        self.stats["prompt_tokens"] += tokens
+
+        await asyncio.sleep(self.latency + tokens / 1000 * self.per_1k_tokens)
+        if self._fails(prompt):
+            self.stats["failures"] += 1
+            return web.json_response(
+                {"error": {"message": "stand-in injected failure", "type": "server_error"}}, status=500,
+            )
+
+        name = self.choose(prompt)
+        self.stats["replies"][name] += 1
+        schema = self.schemas.get(name, GENERIC_SCHEMA)
+        return web.json_response({
+            "id": f"standin-{self.stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "standin"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(schema)},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": tokens, "completion_tokens": len(json.dumps(schema)) // 4},
+        })
+
+    async def stats_handler(self, request: web.Request) -> web.Response:
+        return web.json_response({**self.stats, "replies": dict(self.stats["replies"])})
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 ** 2)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_get("/v1/stats", self.stats_handler)
+        return app
+
+
+async def start_standin(llm: StandInLLM, host: str = "localhost", port: int = 8799) -> web.AppRunner:
+    """Serve the stand-in in the running event loop; call runner.cleanup() to stop"""
+    runner = web.AppRunner(llm.app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Deterministic local stand-in for LLM schema generation")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--schemas", default="./schema_cache", help="Directory with pattern_*.json schemas")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fixed seconds per reply")
+    parser.add_argument("--per-1k-tokens", type=float, default=0.05, help="Extra seconds per 1000 prompt tokens")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    options = parser.parse_args(args)
+
+    llm = StandInLLM(
+        load_canned_schemas(Path(options.schemas)), options.latency, options.per_1k_tokens,
+        options.failure_rate, options.seed,
+    )
+    print(f"🤖 Stand-in LLM with {len(llm.schemas)} canned schemas on http://localhost:{options.port}/v1")
+    web.run_app(llm.app(), host="localhost", port=options.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
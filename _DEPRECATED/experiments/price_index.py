@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Daily Price Index (chained Jevons)
+
+BPP-style daily price index computed from PriceStore observations:
+- A product's price on a day is the geometric mean of its observations that
+  day (several extraction runs)
+- Products (merchant + product_id) are matched to their price on the
+  previous day; the elementary index of a category is the Jevons index of
+  those price relatives (their geometric mean), and relatives beyond
+  `max_abs_log_change` (extraction errors, mostly) are dropped
+- Elementary indices are chained day to day into category levels; the
+  all-items index chains each day's weighted geometric mean of the
+  category relatives, over the categories with matches that day, with IPCA
+  weights (IBGE's weights table; see load_weights). Like the category
+  levels, it is stored per day and never revised by later days
+- Store categories are mapped to IPCA items by `category_map`; unmapped
+  categories and observations without a category are left out
+
+compute() builds the index over a whole history at once: observations are
+dictionary-coded into integer product keys, sorted once, and every day and
+category is aggregated with array operations. add_day() extends the index
+by one day from that day's observations and the last price of each product
+kept in the index state, so a daily update reads one day of data.
+
+Usage:
+    index = PriceIndex(load_weights("ipca_weights.csv"), category_map=mapping)
+    index.update_from_store(PriceStore("./price_store"))
+    index.save("./price_index")
+    index.levels()  # date x category levels plus "all_items"
+"""
+
+import csv
+import json
+import math
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from schema_store import atomic_write_json
+
+
+# What the index reads from a PriceStore scan
+OBSERVATION_SCHEMA = pa.schema([
+    ("observed_date", pa.date32()),
+    ("merchant", pa.string()),
+    ("product_id", pa.string()),
+    ("category", pa.string()),
+    ("price", pa.float64()),
+])
+OBSERVATION_COLUMNS = OBSERVATION_SCHEMA.names
+
+# Daily relatives beyond a tenfold change are taken as extraction errors
+MAX_ABS_LOG_CHANGE = math.log(10)
+EPOCH = date(1970, 1, 1)
+ALL_ITEMS = "all_items"
+
+
+def load_weights(path: str) -> Dict[str, float]:
+    """
+    IPCA weights by category from a JSON object ({"Arroz": 0.41, ...}) or a
+    CSV file with category and weight columns (decimal commas accepted).
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        with open(path, encoding="utf-8") as f:
+            return {category: float(weight) for category, weight in json.load(f).items()}
+    with open(path, encoding="utf-8", newline="") as f:
+        return {
+            row["category"]: float(str(row["weight"]).replace(",", "."))
+            for row in csv.DictReader(f) if row.get("weight") not in (None, "")
+        }
+
+
+def _codes(column: pa.ChunkedArray) -> Tuple[np.ndarray, List[Optional[str]]]:
+    """Dictionary indices of a column (-1 for nulls) and its dictionary values"""
+    if not pa.types.is_dictionary(column.type):
+        column = pc.dictionary_encode(column)
+    column = pa.table({"c": column}).unify_dictionaries().column(0)
+    if not column.num_chunks:
+        return np.empty(0, dtype=np.int32), []
+    indices = np.concatenate([
+        chunk.indices.fill_null(-1).to_numpy(zero_copy_only=False).astype(np.int32, copy=False)
+        for chunk in column.chunks
+    ])
+    return indices, column.chunk(0).dictionary.to_pylist()
+
+
+def _day_number(day: date) -> int:
+    return (day - EPOCH).days
+
+
+@dataclass
+class _Relatives:
+    """Log-relative sums and match counts by (day, category) from first_day on"""
+    first_day: int
+    sums: np.ndarray
+    counts: np.ndarray
+    last_seen: pa.Table
+
+
+class PriceIndex:
+    """Chained daily Jevons index by category and its IPCA-weighted aggregate"""
+
+    def __init__(
+        self,
+        weights: Optional[Dict[str, float]] = None,
+        category_map: Optional[Dict[str, str]] = None,
+        base: float = 100.0,
+        max_gap_days: int = 1,
+        max_abs_log_change: float = MAX_ABS_LOG_CHANGE,
+    ):
+        """
+        Args:
+            weights: IPCA weight of each index category (equal weights if None)
+            category_map: Store category -> index category (store categories used as is if None)
+            base: Level of every category on the first day
+            max_gap_days: Days a product's last price stays matchable (1: consecutive days only)
+            max_abs_log_change: Relatives with a larger absolute log change are dropped
+        """
+        self.weights = dict(weights or {})
+        self.category_map = dict(category_map) if category_map is not None else None
+        self.base = base
+        self.max_gap_days = max(max_gap_days, 1)
+        self.max_abs_log_change = max_abs_log_change
+        self.categories: List[str] = list(self.weights)
+        self._category_codes = {category: i for i, category in enumerate(self.categories)}
+        self.history = pd.DataFrame(
+            {"date": pd.Series(dtype="datetime64[s]"), "category": pd.Series(dtype=object),
+             "matched": pd.Series(dtype=np.int64), "relative": pd.Series(dtype=np.float64),
+             "level": pd.Series(dtype=np.float64)}
+        )
+        # Latest daily price of the products still matchable (OBSERVATION_SCHEMA)
+        self.last_seen = OBSERVATION_SCHEMA.empty_table()
+        self.last_date: Optional[date] = None
+
+    # ---------- Updates ----------
+
+    def compute(self, observations: pa.Table) -> pd.DataFrame:
+        """
+        Build the index from a whole history of observations, replacing any
+        previous state; returns the history rows.
+
+        Args:
+            observations: Table with OBSERVATION_COLUMNS (a PriceStore scan;
+                dictionary-encoded columns are used as they are)
+        """
+        self.history = self.history.iloc[0:0]
+        self.last_seen = OBSERVATION_SCHEMA.empty_table()
+        self.last_date = None
+        if not len(observations):
+            return self.history
+        relatives = self._relatives(observations)
+        return self._append(relatives)
+
+    def add_day(self, observations: pa.Table, day: Optional[date] = None) -> pd.DataFrame:
+        """
+        Extend the index by one day; returns the new history rows.
+
+        Only `observations` (that day's) and the last prices in the index
+        state are read. Days skipped since the last update get relatives of
+        1 (no matches).
+
+        Args:
+            observations: The day's observations (OBSERVATION_COLUMNS)
+            day: The day (read from the observations if None)
+        """
+        if day is None:
+            days = pc.unique(observations.column("observed_date").cast(pa.date32())).to_pylist()
+            if len(days) != 1:
+                raise ValueError(f"add_day() needs the observations of one day, got {len(days)} days")
+            day = days[0]
+        if self.last_date is None:
+            return self.compute(observations)
+        if day <= self.last_date:
+            raise ValueError(f"{day} is not after the last indexed day ({self.last_date}); use compute() to rebuild")
+        table = pa.concat_tables([
+            self.last_seen,
+            observations.select(OBSERVATION_COLUMNS).cast(OBSERVATION_SCHEMA),
+        ])
+        relatives = self._relatives(table, first_day=_day_number(self.last_date) + 1, last_day=_day_number(day))
+        return self._append(relatives)
+
+    def update_from_store(self, store, start: Optional[date] = None, through: Optional[date] = None) -> int:
+        """
+        Index the store's days after the last indexed one; returns the days added.
+
+        An empty index is built with compute() over the store's days from
+        `start`; an existing one is extended day by day with add_day().
+
+        Args:
+            store: price_store.PriceStore
+            start: First day of a new index (default: the first stored day)
+            through: Last day to index (default: the last stored day)
+        """
+        if self.last_date is not None:
+            start = self.last_date + timedelta(days=1)
+        days = sorted({day for day, _, _ in store.partitions(start=start, end=through)})
+        if not days:
+            return 0
+        if self.last_date is None:
+            self.compute(store.scan(start=days[0], end=days[-1], columns=OBSERVATION_COLUMNS))
+        else:
+            for day in days:
+                self.add_day(store.scan(start=day, end=day, columns=OBSERVATION_COLUMNS), day)
+        return len(days)
+
+    def _category_code(self, name: Optional[str]) -> int:
+        if name is None:
+            return -1
+        if self.category_map is not None:
+            name = self.category_map.get(name)
+            if name is None:
+                return -1
+        if name not in self._category_codes:
+            self._category_codes[name] = len(self.categories)
+            self.categories.append(name)
+        return self._category_codes[name]
+
+    def _relatives(self, table: pa.Table, first_day: Optional[int] = None, last_day: Optional[int] = None) -> _Relatives:
+        """Match each product's daily price to its previous one and sum the log relatives by day and category"""
+        day = table.column("observed_date").cast(pa.date32()).cast(pa.int32()).to_numpy()
+        price = table.column("price").cast(pa.float64()).fill_null(np.nan).to_numpy()
+        merchant, _ = _codes(table.column("merchant"))
+        product, products = _codes(table.column("product_id"))
+        raw_category, raw_names = _codes(table.column("category"))
+        # Index -1 (null) lands on the trailing -1
+        lookup = np.array([self._category_code(name) for name in raw_names] + [-1], dtype=np.int32)
+        category = lookup[raw_category]
+        del raw_category
+
+        rows = np.flatnonzero((merchant >= 0) & (product >= 0) & (category >= 0) & (price > 0))
+        first_day = int(day.min()) if first_day is None else first_day
+        last_day = int(day.max()) if last_day is None else last_day
+        n_days, n_categories = last_day - first_day + 1, len(self.categories)
+        sums = np.zeros((n_days, n_categories))
+        counts = np.zeros((n_days, n_categories), dtype=np.int64)
+        if not len(rows):
+            return _Relatives(first_day, sums, counts, OBSERVATION_SCHEMA.empty_table())
+
+        # One sort groups observations by product, then day (intermediates
+        # are released early: a year of observations is tens of millions of rows)
+        key = merchant[rows].astype(np.int64) * max(len(products), 1) + product[rows]
+        del merchant, product
+        day, category, log_price = day[rows], category[rows], np.log(price[rows])
+        del price
+        day0 = int(day.min())
+        combined = key * (last_day - day0 + 1) + (day - day0)
+        order = np.argsort(combined)
+        combined = combined[order]
+        starts = np.flatnonzero(np.r_[True, combined[1:] != combined[:-1]])
+        sizes = np.diff(np.r_[starts, len(combined)])
+        del combined
+
+        # Geometric mean price of each product-day
+        daily_log = np.add.reduceat(log_price[order], starts) / sizes
+        first_rows = order[starts]
+        del order, log_price
+        daily_key, daily_day, daily_category = key[first_rows], day[first_rows], category[first_rows]
+        del key, day, category
+
+        # Consecutive product-days of the same product within the gap
+        change = np.diff(daily_log)
+        matched = ((daily_key[1:] == daily_key[:-1]) & (np.diff(daily_day) <= self.max_gap_days)
+                   & (np.abs(change) <= self.max_abs_log_change) & (daily_day[1:] >= first_day))
+        current = np.flatnonzero(matched)
+        bins = (daily_day[current + 1].astype(np.int64) - first_day) * n_categories + daily_category[current + 1]
+        sums = np.bincount(bins, weights=change[current], minlength=n_days * n_categories).reshape(n_days, n_categories)
+        counts = np.bincount(bins, minlength=n_days * n_categories).reshape(n_days, n_categories)
+
+        # Last daily price of each product, kept while it can still be matched
+        last = np.flatnonzero(np.r_[daily_key[1:] != daily_key[:-1], True])
+        last = last[daily_day[last] > last_day - self.max_gap_days]
+        last_seen = table.take(rows[first_rows[last]]).select(OBSERVATION_COLUMNS[:-1])
+        last_seen = last_seen.append_column("price", pa.array(np.exp(daily_log[last])))
+        return _Relatives(first_day, sums, counts, last_seen.cast(OBSERVATION_SCHEMA))
+
+    def _append(self, relatives: _Relatives) -> pd.DataFrame:
+        """Chain the day relatives onto the current levels and add them to the history"""
+        n_days, n_categories = relatives.sums.shape
+        log_relative = np.divide(relatives.sums, relatives.counts, out=np.zeros(relatives.sums.shape),
+                                 where=relatives.counts > 0)
+        current = self.history.groupby("category", sort=False)["level"].last()
+        start = np.array([current.get(category, self.base) for category in self.categories[:n_categories]])
+        levels = start * np.exp(np.cumsum(log_relative, axis=0))
+
+        # All items: weighted mean log relative of the categories matched that day, weights renormalized per day
+        weights = np.array([
+            self.weights.get(category, 0.0) if self.weights else 1.0 for category in self.categories[:n_categories]
+        ])
+        day_weights = np.where(relatives.counts > 0, weights, 0.0)
+        total = day_weights.sum(axis=1)
+        all_log_relative = np.divide((day_weights * log_relative).sum(axis=1), total, out=np.zeros(n_days),
+                                     where=total > 0)
+        all_levels = current.get(ALL_ITEMS, self.base) * np.exp(np.cumsum(all_log_relative))
+
+        days = np.arange(relatives.first_day, relatives.first_day + n_days).astype("datetime64[D]")
+        names = np.array([*self.categories[:n_categories], ALL_ITEMS], dtype=object)
+        rows = pd.DataFrame({
+            "date": np.repeat(days, n_categories + 1).astype("datetime64[s]"),
+            "category": np.tile(names, n_days),
+            "matched": np.column_stack([relatives.counts, relatives.counts.sum(axis=1)]).ravel(),
+            "relative": np.exp(np.column_stack([log_relative, all_log_relative])).ravel(),
+            "level": np.column_stack([levels, all_levels]).ravel(),
+        })
+        self.history = rows if self.history.empty else pd.concat([self.history, rows], ignore_index=True)
+        self.last_seen = relatives.last_seen
+        self.last_date = EPOCH + timedelta(days=relatives.first_day + n_days - 1)
+        return rows
+
+    # ---------- Results ----------
+
+    def levels(self) -> pd.DataFrame:
+        """
+        Index levels by date (rows) and category (columns), plus the
+        all_items column as chained from each day's matched categories
+        (equal weights when the index has none). A category first seen by
+        add_day() stands at base on the days before, as it would in a full
+        compute().
+        """
+        if self.history.empty:
+            return pd.DataFrame()
+        wide = self.history.pivot(index="date", columns="category", values="level")
+        columns = [category for category in self.categories if category in wide.columns] + [ALL_ITEMS]
+        return wide[columns].fillna(self.base)
+
+    # ---------- Persistence ----------
+
+    def save(self, directory: str):
+        """Write the history, the last prices and the settings (index.json, written last)"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.history.to_parquet(directory / "history.parquet", index=False)
+        pq.write_table(self.last_seen, directory / "last_seen.parquet")
+        atomic_write_json(directory / "index.json", {
+            "weights": self.weights,
+            "category_map": self.category_map,
+            "base": self.base,
+            "max_gap_days": self.max_gap_days,
+            "max_abs_log_change": self.max_abs_log_change,
+            "categories": self.categories,
+            "last_date": self.last_date.isoformat() if self.last_date else None,
+        })
+
+    @classmethod
+    def load(cls, directory: str) -> "PriceIndex":
+        directory = Path(directory)
+        with open(directory / "index.json", encoding="utf-8") as f:
+            settings = json.load(f)
+        index = cls(settings["weights"], settings["category_map"], settings["base"],
+                    settings["max_gap_days"], settings["max_abs_log_change"])
+        index.categories = list(settings["categories"])
+        index._category_codes = {category: i for i, category in enumerate(index.categories)}
+        index.history = pd.read_parquet(directory / "history.parquet")
+        index.last_seen = pq.read_table(directory / "last_seen.parquet").cast(OBSERVATION_SCHEMA)
+        index.last_date = date.fromisoformat(settings["last_date"]) if settings["last_date"] else None
+        return index
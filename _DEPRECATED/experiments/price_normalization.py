@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Price and Package-Size Normalization
+
+Turns extracted pt-BR price strings ("R$ 4,65 un", "de R$ 10,99 por R$ 8,99",
+"R$ 1.299,00", "R$ 29,90/kg", "R$ 8,99 ou 2x de R$ 4,50") and package sizes
+("1L", "6x330ml", "500 g", "1/2 kg", "12 unidades", or the product name when
+the size field is missing) into the numeric fields of price_observation /
+product_snapshot: regular/sale/was price, pack_count, size_value, size_unit
+and unit_price.
+
+Whole batches are parsed at once, without a regex per record: the texts are
+joined into one latin-1 byte buffer, and numbers, separators and the unit
+word after each number are found with NumPy operations over the buffer.
+Unit prices are computed on the resulting columns.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from schema_health import field_format
+
+
+DIM_NONE = 0
+DIM_MASS = 1
+DIM_VOLUME = 2
+DIM_COUNT = 3
+DIM_MULTIPLIER = 4
+
+# Unit word -> (dimension, factor to grams / millilitres / items)
+UNITS = {
+    "mg": (DIM_MASS, 0.001), "g": (DIM_MASS, 1.0), "gr": (DIM_MASS, 1.0), "grs": (DIM_MASS, 1.0),
+    "grama": (DIM_MASS, 1.0), "gramas": (DIM_MASS, 1.0), "kg": (DIM_MASS, 1000.0), "kgs": (DIM_MASS, 1000.0),
+    "kilo": (DIM_MASS, 1000.0), "kilos": (DIM_MASS, 1000.0), "quilo": (DIM_MASS, 1000.0), "quilos": (DIM_MASS, 1000.0),
+    "ml": (DIM_VOLUME, 1.0), "cl": (DIM_VOLUME, 10.0), "l": (DIM_VOLUME, 1000.0), "lt": (DIM_VOLUME, 1000.0),
+    "lts": (DIM_VOLUME, 1000.0), "litro": (DIM_VOLUME, 1000.0), "litros": (DIM_VOLUME, 1000.0),
+    "un": (DIM_COUNT, 1.0), "und": (DIM_COUNT, 1.0), "unid": (DIM_COUNT, 1.0), "unidade": (DIM_COUNT, 1.0),
+    "unidades": (DIM_COUNT, 1.0), "pc": (DIM_COUNT, 1.0), "pcs": (DIM_COUNT, 1.0), "rolos": (DIM_COUNT, 1.0),
+    "lata": (DIM_COUNT, 1.0), "latas": (DIM_COUNT, 1.0), "garrafa": (DIM_COUNT, 1.0), "garrafas": (DIM_COUNT, 1.0),
+    "saches": (DIM_COUNT, 1.0), "x": (DIM_MULTIPLIER, 1.0),
+}
+# By dimension: quantity (g / ml / items) unit prices are quoted per, and its unit_price_unit
+UNIT_PRICE_SCALE = np.array([np.nan, 1000.0, 1000.0, 1.0, np.nan])
+UNIT_PRICE_UNITS = np.array([None, "kg", "L", "each", None], dtype=object)
+
+# "2x de R$ 4,50", "12 parcelas de R$ 9,90": a price after one of these is an installment
+INSTALLMENT_WORDS = ("x", "vezes", "parcela", "parcelas")
+# Most characters from the end of the installment count to the price ("12x sem juros de R$ 9,90")
+MAX_INSTALLMENT_GAP = 24
+
+# Longer digit runs (EANs, order numbers) aren't prices or sizes
+MAX_NUMBER_LENGTH = 12
+_WORD_LETTERS = 8
+# Zero bytes after the last text, so lookahead never leaves the buffer
+_PADDING = max(MAX_NUMBER_LENGTH, _WORD_LETTERS + 4)
+_SEPARATOR = "\x00"
+_DOLLAR, _SLASH, _SPACE, _NBSP, _COMMA, _DOT = (ord(c) for c in "$/ \xa0,.")
+
+
+def _word_hash(word: str) -> int:
+    h = 0
+    for ch in word:
+        h = h * 32 + (ord(ch) - 96)
+    return h
+
+
+_UNIT_WORDS = sorted(UNITS, key=_word_hash)
+_UNIT_HASHES = np.array([_word_hash(w) for w in _UNIT_WORDS], dtype=np.int64)
+_UNIT_DIMS = np.array([UNITS[w][0] for w in _UNIT_WORDS], dtype=np.int8)
+_UNIT_FACTORS = np.array([UNITS[w][1] for w in _UNIT_WORDS], dtype=np.float64)
+_INSTALLMENT_HASHES = np.array(sorted(_word_hash(w) for w in INSTALLMENT_WORDS), dtype=np.int64)
+
+
+def _text_buffer(texts: Sequence[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    All texts in one uint8 buffer, NUL-separated and NUL-padded at both ends.
+
+    Returns the buffer and the position of the separator before each text.
+    Characters outside latin-1 become "?".
+    """
+    try:
+        joined = _SEPARATOR.join(texts)
+    except TypeError:
+        texts = ["" if t is None else str(t) for t in texts]
+        joined = _SEPARATOR.join(texts)
+    data = (_SEPARATOR + joined).encode("latin-1", "replace")
+    boundaries = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 0)
+    if len(boundaries) != len(texts):
+        joined = _SEPARATOR.join(t.replace(_SEPARATOR, " ") for t in texts)
+        data = (_SEPARATOR + joined).encode("latin-1", "replace")
+        boundaries = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 0)
+    buffer = np.frombuffer(data + bytes(_PADDING), dtype=np.uint8)
+    return buffer, boundaries
+
+
+@dataclass
+class _Tokens:
+    """Numbers found in a text buffer, in buffer order"""
+    row: np.ndarray
+    start: np.ndarray     # buffer position of the first character
+    end: np.ndarray       # buffer position of the last character
+    value: np.ndarray
+    decimals: np.ndarray
+
+
+def _numbers(buffer: np.ndarray, boundaries: np.ndarray) -> _Tokens:
+    """
+    Numbers with pt-BR (and plain) separators: "1.299,00", "4,65", "12.5", "1.299".
+
+    A separator counts as decimal when 1-2 digits follow the last one of a
+    number; any other separators group thousands.
+    """
+    digit = (buffer - 48) < 10
+    inner = np.zeros(len(buffer), dtype=bool)
+    inner[1:-1] = ((buffer[1:-1] == _COMMA) | (buffer[1:-1] == _DOT)) & digit[:-2] & digit[2:]
+    positions = np.flatnonzero(digit | inner)
+
+    starts = np.ones(len(positions), dtype=bool)
+    starts[1:] = positions[1:] != positions[:-1] + 1
+    first = np.flatnonzero(starts)
+    start = positions[first]
+    length = np.diff(np.append(first, len(positions)))
+    keep = length <= MAX_NUMBER_LENGTH
+    start, length = start[keep], length[keep]
+
+    # One step per character position; separators reset the digits-after count
+    value = np.zeros(len(start))
+    after = np.zeros(len(start), dtype=np.int8)
+    separated = np.zeros(len(start), dtype=bool)
+    for offset in range(int(length.max()) if len(length) else 0):
+        code = buffer[start + offset] - np.uint8(48)
+        active = offset < length
+        is_digit = active & (code < 10)
+        value = np.where(is_digit, value * 10 + code, value)
+        after += is_digit
+        is_separator = active ^ is_digit
+        after[is_separator] = 0
+        separated |= is_separator
+    decimals = np.where(separated & (after <= 2), after, 0)
+
+    return _Tokens(
+        row=np.searchsorted(boundaries, start, side="right") - 1,
+        start=start,
+        end=start + length - 1,
+        value=value / 10.0 ** decimals,
+        decimals=decimals,
+    )
+
+
+def _word_after(buffer: np.ndarray, positions: np.ndarray, hashes: np.ndarray = _UNIT_HASHES) -> np.ndarray:
+    """Index into `hashes` (the unit tables) of the word right after each position (one space allowed), -1 if none"""
+    column = positions + 1
+    column = column + ((buffer[column] == _SPACE) | (buffer[column] == _NBSP))
+
+    word = np.zeros(len(column), dtype=np.int64)
+    active = np.ones(len(column), dtype=bool)
+    for offset in range(_WORD_LETTERS + 1):
+        lower = buffer[column + offset] | 0x20
+        letter = (lower >= 97) & (lower <= 122)
+        if offset == _WORD_LETTERS:
+            active &= ~letter          # longer words aren't units
+            break
+        active &= letter
+        word = np.where(active, word * 32 + (lower - 96), word)
+    index = np.minimum(np.searchsorted(hashes, word), len(hashes) - 1)
+    found = (word > 0) & (hashes[index] == word)
+    return np.where(found, index, -1)
+
+
+def _first_per_row(rows: np.ndarray) -> np.ndarray:
+    keep = np.ones(len(rows), dtype=bool)
+    keep[1:] = rows[1:] != rows[:-1]
+    return keep
+
+
+@dataclass
+class PriceColumns:
+    regular_price: np.ndarray
+    sale_price: np.ndarray
+    was_price: np.ndarray
+    # Price quoted per unit in the text itself ("R$ 29,90/kg")
+    quoted_unit_price: np.ndarray
+    quoted_unit_dim: np.ndarray
+
+    @property
+    def price(self) -> np.ndarray:
+        """Price paid now: the sale price if there is one, else the regular price"""
+        return np.where(np.isnan(self.sale_price), self.regular_price, self.sale_price)
+
+
+def parse_prices(texts: Sequence[Optional[str]]) -> PriceColumns:
+    """
+    Parse a batch of displayed price strings.
+
+    Numbers with decimals or right after "R$" are prices, except
+    installments ("ou 2x de R$ 4,50") and unit prices next to a price
+    ("R$ 3,49 (R$ 6,98/kg)"), which become the quoted unit price. One price
+    is the regular price; with two or more ("de R$ 10,99 por R$ 8,99") the
+    highest is the was price and the lowest the sale price.
+    """
+    n = len(texts)
+    buffer, boundaries = _text_buffer(texts)
+    tokens = _numbers(buffer, boundaries)
+
+    before = buffer[tokens.start - 1]
+    dollar = (before == _DOLLAR) | ((before == _SPACE) | (before == _NBSP)) & (buffer[tokens.start - 2] == _DOLLAR)
+    index = np.flatnonzero((tokens.decimals > 0) | dollar)
+    count = np.maximum(index - 1, 0)
+    installment = (index > 0) & (tokens.row[count] == tokens.row[index]) & (
+        tokens.start[index] - tokens.end[count] <= MAX_INSTALLMENT_GAP
+    ) & (_word_after(buffer, tokens.end[count], _INSTALLMENT_HASHES) >= 0)
+    index = index[~installment]
+
+    # "/kg", " /100g", "/un" right after a price
+    column = tokens.end[index] + 1
+    column = column + (buffer[column] == _SPACE)
+    slash = np.flatnonzero(buffer[column] == _SLASH)
+    per_unit = np.zeros(len(index), dtype=bool)
+    quoted = np.full(n, np.nan)
+    quoted_dim = np.zeros(n, dtype=np.int8)
+    if len(slash):
+        at, column = index[slash], column[slash]
+        # Quantity after the slash ("100g") or just a unit ("kg")
+        following = np.minimum(at + 1, len(tokens.start) - 1)
+        counted = (at + 1 < len(tokens.start)) & (tokens.start[following] == column + 1)
+        units = _word_after(buffer, np.where(counted, tokens.end[following], column))
+        known = units >= 0
+        slash, at, following, counted, units = slash[known], at[known], following[known], counted[known], units[known]
+        quantity = np.where(counted, tokens.value[following], 1.0) * _UNIT_FACTORS[units]
+        dims = _UNIT_DIMS[units]
+        quoted[tokens.row[at]] = tokens.value[at] / quantity * UNIT_PRICE_SCALE[dims]
+        quoted_dim[tokens.row[at]] = dims
+        per_unit[slash] = True
+
+    # A quoted unit price is the price only when the text has no other ("R$ 29,90/kg"),
+    # not next to one ("R$ 3,49 (R$ 6,98/kg)")
+    priced = np.zeros(n, dtype=bool)
+    priced[tokens.row[index[~per_unit]]] = True
+    index = index[~per_unit | ~priced[tokens.row[index]]]
+    row, value = tokens.row[index], tokens.value[index]
+
+    high = np.full(n, -np.inf)
+    low = np.full(n, np.inf)
+    np.maximum.at(high, row, value)
+    np.minimum.at(low, row, value)
+    promo = high > low
+    regular = np.where(~promo & np.isfinite(high), high, np.nan)
+    sale = np.where(promo, low, np.nan)
+    was = np.where(promo, high, np.nan)
+    return PriceColumns(regular, sale, was, quoted, quoted_dim)
+
+
+@dataclass
+class SizeColumns:
+    pack_count: np.ndarray
+    size_value: np.ndarray
+    size_dim: np.ndarray
+    # Unit factor to grams / millilitres / items
+    size_factor: np.ndarray
+
+    @property
+    def base_quantity(self) -> np.ndarray:
+        """Total grams, millilitres or items in the package"""
+        return self.pack_count * self.size_value * self.size_factor
+
+    def stored_size(self) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """size_value and size_unit as product_snapshot stores them (ml, g, l, kg or each)"""
+        kilo = (self.size_factor == 1000) & (self.size_dim != DIM_COUNT)
+        value = np.where(kilo, self.size_value, self.size_value * self.size_factor)
+        units = np.array([None, "g", "ml", "each", None, None, "kg", "l", None, None], dtype=object)
+        return value, units[self.size_dim + 5 * kilo].tolist()
+
+
+def parse_sizes(texts: Sequence[Optional[str]]) -> SizeColumns:
+    """
+    Parse a batch of package sizes (or product names containing one).
+
+    The first measured quantity ("330ml", "1,5 kg", "1/2 kg") is the size;
+    a number right before it followed by "x" or a count word ("6x",
+    "6 latas") is the pack count. Without a measured quantity, a count
+    ("12 unidades") is the size in items.
+    """
+    n = len(texts)
+    buffer, boundaries = _text_buffer(texts)
+    tokens = _numbers(buffer, boundaries)
+    # "1/2 kg": the denominator carries the unit, the numerator is folded into its value
+    numerator = np.maximum(np.arange(len(tokens.start)) - 1, 0)
+    fraction = (tokens.row[numerator] == tokens.row) & (tokens.end[numerator] == tokens.start - 2) & (
+        buffer[tokens.start - 1] == _SLASH
+    ) & (tokens.value > 0)
+    fraction[:1] = False
+    values = tokens.value.copy()
+    values[fraction] = tokens.value[numerator[fraction]] / tokens.value[fraction]
+    units = _word_after(buffer, tokens.end)
+    dims = np.where(units >= 0, _UNIT_DIMS[np.maximum(units, 0)], DIM_NONE)
+    factors = _UNIT_FACTORS[np.maximum(units, 0)]
+
+    pack = np.ones(n)
+    value = np.full(n, np.nan)
+    dim = np.zeros(n, dtype=np.int8)
+    factor = np.full(n, np.nan)
+
+    measured = np.flatnonzero((dims == DIM_MASS) | (dims == DIM_VOLUME))
+    first = measured[_first_per_row(tokens.row[measured])]
+    rows = tokens.row[first]
+    value[rows] = values[first]
+    dim[rows] = dims[first]
+    factor[rows] = factors[first]
+    before = first - 1 - fraction[first]
+    previous = np.maximum(before, 0)
+    has_pack = (before >= 0) & (tokens.row[previous] == rows) & (
+        (dims[previous] == DIM_MULTIPLIER) | (dims[previous] == DIM_COUNT)
+    )
+    pack[rows[has_pack]] = values[previous[has_pack]]
+
+    counted = np.flatnonzero(dims == DIM_COUNT)
+    counted = counted[np.isnan(value[tokens.row[counted]])]
+    first = counted[_first_per_row(tokens.row[counted])]
+    rows = tokens.row[first]
+    value[rows] = values[first]
+    dim[rows] = DIM_COUNT
+    factor[rows] = 1.0
+    return SizeColumns(pack, value, dim, factor)
+
+
+@dataclass
+class NormalizedBatch:
+    """Normalized prices and sizes of a batch, one array element per record"""
+    prices: PriceColumns
+    sizes: SizeColumns
+    unit_price: np.ndarray
+    unit_price_dim: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.unit_price)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """price_observation / product_snapshot fields per record (None where unknown)"""
+        def column(values: np.ndarray, digits: int) -> List[Optional[float]]:
+            rounded = np.round(values, digits).astype(object)
+            rounded[np.isnan(values)] = None
+            return rounded.tolist()
+
+        unit_names = UNIT_PRICE_UNITS[self.unit_price_dim].tolist()
+        size_value, size_unit = self.sizes.stored_size()
+        pack = np.where(np.isnan(size_value), np.nan, self.sizes.pack_count)
+        columns = {
+            "regular_price": column(self.prices.regular_price, 2),
+            "sale_price": column(self.prices.sale_price, 2),
+            "was_price": column(self.prices.was_price, 2),
+            "pack_count": column(pack, 3),
+            "size_value": column(size_value, 3),
+            "size_unit": size_unit,
+            "unit_price": column(self.unit_price, 6),
+            "unit_price_unit": unit_names,
+        }
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def normalize(
+    price_texts: Sequence[Optional[str]],
+    size_texts: Sequence[Optional[str]],
+    fallback_size_texts: Optional[Sequence[Optional[str]]] = None,
+) -> NormalizedBatch:
+    """
+    Normalize a batch of price and size strings.
+
+    Args:
+        price_texts: Displayed prices
+        size_texts: Package sizes as extracted
+        fallback_size_texts: Parsed where `size_texts` has no size (e.g. product names)
+    """
+    prices = parse_prices(price_texts)
+    sizes = parse_sizes(size_texts)
+    if fallback_size_texts is not None:
+        missing = np.flatnonzero(np.isnan(sizes.size_value))
+        if len(missing):
+            fallback = parse_sizes([fallback_size_texts[i] for i in missing])
+            for name in ("pack_count", "size_value", "size_dim", "size_factor"):
+                getattr(sizes, name)[missing] = getattr(fallback, name)
+
+    quantity = sizes.base_quantity
+    per = UNIT_PRICE_SCALE[sizes.size_dim]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        unit_price = prices.price / quantity * per
+    unit_dim = np.where(np.isnan(unit_price), 0, sizes.size_dim).astype(np.int8)
+
+    # A quoted unit price wins unless the package size says it's per the wrong thing (per kg of a 1,5 L bottle)
+    quoted = ~np.isnan(prices.quoted_unit_price) & (
+        (sizes.size_dim == DIM_NONE) | (sizes.size_dim == prices.quoted_unit_dim)
+    )
+    unit_price[quoted] = prices.quoted_unit_price[quoted]
+    unit_dim[quoted] = prices.quoted_unit_dim[quoted]
+    return NormalizedBatch(prices, sizes, unit_price, unit_dim)
+
+
+_NAME_HINTS = ("name", "nome", "title", "titulo")
+_NOT_NAME_HINTS = ("brand", "marca")
+
+
+def product_fields(names: Sequence[str]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Price, package size and product name fields among a schema's field names"""
+    price = next((n for n in names if field_format(n) == "price"), None)
+    size = next((n for n in names if field_format(n) == "size"), None)
+    name = next((
+        n for n in names
+        if any(h in n.lower() for h in _NAME_HINTS) and not any(h in n.lower() for h in _NOT_NAME_HINTS)
+    ), None)
+    return price, size, name
+
+
+def normalize_products(products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Add a "normalized" dict of price/size fields to extracted products (in place).
+
+    Fields are found by name, as schema_health validates them; products of
+    the same schema are normalized in one batch. The product name is the
+    fallback size text.
+    """
+    groups: Dict[Tuple[Optional[str], ...], List[Dict[str, Any]]] = {}
+    fields_by_keys: Dict[Tuple[str, ...], Tuple[Optional[str], ...]] = {}
+    for product in products:
+        keys = tuple(product)
+        if keys not in fields_by_keys:
+            fields_by_keys[keys] = product_fields(keys)
+        groups.setdefault(fields_by_keys[keys], []).append(product)
+
+    for (price_field, size_field, name_field), group in groups.items():
+        if not (price_field or size_field or name_field):
+            continue
+        batch = normalize(
+            [p.get(price_field) for p in group] if price_field else [None] * len(group),
+            [p.get(size_field) for p in group] if size_field else [None] * len(group),
+            [p.get(name_field) for p in group] if name_field else None,
+        )
+        for product, normalized in zip(group, batch.to_records()):
+            product["normalized"] = normalized
+    return products
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Columnar Price-Observation Store
+
+A local analytical store for price index queries such as "all prices for
+category X across merchants over time", which row-per-JSON files and
+per-row Postgres inserts make slow:
+- Parquet files under observed_date=YYYY-MM-DD/merchant=<domain>/ (hive
+  partitioning), so date ranges and merchant sets are pruned by listing
+  directories, before any file is opened; observed_date is the local date
+  in the store's timezone (America/Sao_Paulo by default), observed_at is UTC
+- Product ids, categories, units and run ids are dictionary-encoded in
+  each Parquet column chunk and read back as Arrow dictionary arrays;
+  prices are decimal(18, 6) like price_observation in the Postgres model
+- Rows are sorted by category and product within each file and written in
+  bounded row groups, so the Parquet min/max statistics work as zone maps
+  for category and product filters
+- PriceStoreSink feeds the store from an extraction run (see result_sinks);
+  every flush adds small files, which compact() merges per partition
+
+Usage:
+    store = PriceStore("./price_store")
+    table = store.scan(start=date(2026, 1, 1), end=date(2026, 12, 31), categories=["Laticínios"])
+"""
+
+import os
+import time
+import uuid
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import unquote, urlparse
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from price_normalization import normalize_products, product_fields
+from result_sinks import ResultSink
+from schema_health import field_format
+
+
+PRICE_TYPE = pa.decimal128(18, 6)
+PRICE_COLUMNS = ("price", "regular_price", "sale_price", "was_price", "unit_price")
+
+# Columns stored in the files; observed_date and merchant live in the partition path
+SCHEMA = pa.schema([
+    ("observed_at", pa.timestamp("us", tz="UTC")),
+    ("product_id", pa.string()),
+    ("category", pa.string()),
+    ("name", pa.string()),
+    ("currency", pa.string()),
+    *[(column, PRICE_TYPE) for column in PRICE_COLUMNS],
+    ("unit_price_unit", pa.string()),
+    ("pack_count", pa.float64()),
+    ("size_value", pa.float64()),
+    ("size_unit", pa.string()),
+    ("price_text", pa.string()),
+    ("url", pa.string()),
+    ("run_id", pa.string()),
+])
+# Dictionary-encoded per column chunk (one Arrow dictionary shared by every
+# partition a write touches would be stored whole in each file)
+DICTIONARY_COLUMNS = ("product_id", "category", "currency", "unit_price_unit", "size_unit", "run_id")
+PARTITIONING = pa.schema([("observed_date", pa.date32()), ("merchant", pa.string())])
+# What scans return: partition values first, then the stored columns with dictionaries
+DATASET_SCHEMA = pa.unify_schemas([PARTITIONING, pa.schema([
+    (f.name, pa.dictionary(pa.int32(), f.type) if f.name in DICTIONARY_COLUMNS else f.type) for f in SCHEMA
+])])
+SORT_KEYS = [("category", "ascending"), ("product_id", "ascending"), ("observed_at", "ascending")]
+
+DEFAULT_ROW_GROUP_SIZE = 64 * 1024
+# observed_date is the calendar day here, so a 22:00 observation isn't filed under the next day
+DEFAULT_TIMEZONE = "America/Sao_Paulo"
+# Partition files below this size are merged by compact()
+SMALL_FILE_BYTES = 32 * 1024 ** 2
+
+
+def merchant_key(url: str) -> str:
+    """Merchant partition value of a URL: its host without "www." """
+    host = urlparse(url).netloc.lower().split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+def _conform(table: pa.Table, schema: pa.Schema = SCHEMA) -> pa.Table:
+    """Cast to `schema` (filling missing columns with nulls) and sort for tight statistics"""
+    columns = []
+    for column in schema:
+        if column.name in table.column_names:
+            values = table.column(column.name)
+            if pa.types.is_decimal(column.type) and pa.types.is_floating(values.type):
+                values = pc.round(values, 6)
+            columns.append(values.cast(column.type))
+        else:
+            columns.append(pa.nulls(len(table), column.type))
+    return pa.table(columns, schema=schema).sort_by(SORT_KEYS)
+
+
+class PriceStore:
+    """Parquet price observations partitioned by observed_date/merchant"""
+
+    def __init__(
+        self,
+        root: str = "./price_store",
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        timezone: str = DEFAULT_TIMEZONE,
+    ):
+        """
+        Args:
+            root: Store directory
+            row_group_size: Rows per Parquet row group (the zone-map granularity)
+            timezone: IANA timezone whose calendar days observed_date partitions follow
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.row_group_size = row_group_size
+        self.timezone = timezone
+
+    def _write_options(self):
+        return ds.ParquetFileFormat().make_write_options(compression="zstd", use_dictionary=list(DICTIONARY_COLUMNS))
+
+    def _read_format(self) -> ds.ParquetFileFormat:
+        return ds.ParquetFileFormat(read_options=ds.ParquetReadOptions(dictionary_columns=set(DICTIONARY_COLUMNS)))
+
+    def write(self, table: pa.Table) -> int:
+        """
+        Add observations; returns the number of files written.
+
+        `table` needs observed_at and merchant columns plus any of SCHEMA's
+        (missing ones are stored as nulls); naive observed_at values are
+        UTC. Float prices are rounded to 6 decimals.
+        """
+        if not len(table):
+            return 0
+        observed_at = table.column("observed_at").cast(SCHEMA.field("observed_at").type)
+        local = observed_at.cast(pa.timestamp("us", tz=self.timezone))
+        table = table.append_column("observed_date", local.cast(pa.date32()))
+        table = _conform(table, pa.unify_schemas([PARTITIONING, SCHEMA]))
+        written: List[str] = []
+        ds.write_dataset(
+            table,
+            self.root,
+            format="parquet",
+            partitioning=ds.partitioning(PARTITIONING, flavor="hive"),
+            basename_template=f"part-{uuid.uuid4().hex[:12]}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            file_options=self._write_options(),
+            max_rows_per_group=self.row_group_size,
+            min_rows_per_group=min(self.row_group_size, len(table)),
+            file_visitor=lambda f: written.append(f.path),
+        )
+        return len(written)
+
+    # ---------- Partitions ----------
+
+    def partitions(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        merchants: Optional[Iterable[str]] = None,
+    ) -> List[Tuple[date, str, Path]]:
+        """(observed_date, merchant, directory) of the partitions in range, from the directory tree alone"""
+        wanted = set(merchants) if merchants is not None else None
+        found = []
+        for date_dir in sorted(self.root.glob("observed_date=*")):
+            day = date.fromisoformat(unquote(date_dir.name.split("=", 1)[1]))
+            if (start and day < start) or (end and day > end):
+                continue
+            for merchant_dir in sorted(date_dir.glob("merchant=*")):
+                merchant = unquote(merchant_dir.name.split("=", 1)[1])
+                if wanted is None or merchant in wanted:
+                    found.append((day, merchant, merchant_dir))
+        return found
+
+    def files(self, **partition_filter) -> List[Path]:
+        return [f for _, _, d in self.partitions(**partition_filter) for f in sorted(d.glob("*.parquet"))]
+
+    # ---------- Queries ----------
+
+    def scan(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        merchants: Optional[Iterable[str]] = None,
+        categories: Optional[Sequence[str]] = None,
+        product_ids: Optional[Sequence[str]] = None,
+        columns: Optional[List[str]] = None,
+        filter: Optional[pc.Expression] = None,
+    ) -> pa.Table:
+        """
+        Observations in a date range (inclusive) for some merchants, categories or products.
+
+        Date and merchant filters prune partitions by directory; category
+        and product filters skip row groups by their min/max statistics.
+
+        Args:
+            start, end: Observation dates (inclusive)
+            merchants: Merchant partition values (see merchant_key)
+            categories: Categories to keep
+            product_ids: Product ids to keep
+            columns: Columns to read (observed_date and merchant included)
+            filter: Extra dataset filter expression
+        """
+        files = self.files(start=start, end=end, merchants=merchants)
+        if not files:
+            empty = DATASET_SCHEMA.empty_table()
+            return empty if columns is None else empty.select(columns)
+
+        dataset = ds.dataset(
+            [str(f) for f in files],
+            schema=DATASET_SCHEMA,
+            format=self._read_format(),
+            partitioning=ds.partitioning(PARTITIONING, flavor="hive"),
+            partition_base_dir=str(self.root),
+        )
+        expression = filter
+        for name, values in (("category", categories), ("product_id", product_ids)):
+            if values is not None:
+                values = list(values)
+                condition = (ds.field(name) == values[0] if len(values) == 1
+                             else ds.field(name).isin(pa.array(values, pa.string())))
+                expression = condition if expression is None else expression & condition
+        return dataset.to_table(columns=columns, filter=expression)
+
+    # ---------- Maintenance ----------
+
+    def compact(
+        self,
+        before: Optional[date] = None,
+        small_file_bytes: int = SMALL_FILE_BYTES,
+    ) -> Dict[str, Any]:
+        """
+        Merge each partition's small files into one.
+
+        The merged file is written under a temporary name and renamed before
+        the old files are removed; a reader listing the partition in between
+        can see both.
+
+        Args:
+            before: Only partitions observed before this date (today's may still be written)
+            small_file_bytes: Partitions with 2+ files and at least one smaller than this are merged
+        """
+        start_time = time.perf_counter()
+        stats = {"partitions": 0, "files_before": 0, "files_after": 0, "bytes_before": 0, "bytes_after": 0}
+        for day, merchant, directory in self.partitions():
+            if before and day >= before:
+                continue
+            files = sorted(directory.glob("*.parquet"))
+            sizes = [f.stat().st_size for f in files]
+            if len(files) < 2 or min(sizes) >= small_file_bytes:
+                continue
+
+            table = _conform(ds.dataset([str(f) for f in files], schema=SCHEMA, format="parquet").to_table())
+            target = directory / f"compacted-{uuid.uuid4().hex[:12]}.parquet"
+            tmp = target.with_suffix(".parquet.tmp")
+            pq.write_table(table, tmp, row_group_size=self.row_group_size, compression="zstd",
+                           use_dictionary=list(DICTIONARY_COLUMNS))
+            os.replace(tmp, target)
+            for f in files:
+                f.unlink()
+
+            stats["partitions"] += 1
+            stats["files_before"] += len(files)
+            stats["files_after"] += 1
+            stats["bytes_before"] += sum(sizes)
+            stats["bytes_after"] += target.stat().st_size
+        stats["seconds"] = time.perf_counter() - start_time
+        return stats
+
+
+def _category_field(names: Sequence[str]) -> Optional[str]:
+    return next((n for n in names if "categ" in n.lower()), None)
+
+
+def _identifier_field(names: Sequence[str]) -> Optional[str]:
+    return next((n for n in names if field_format(n) == "identifier"), None)
+
+
+class PriceStoreSink(ResultSink):
+    """
+    Feeds a PriceStore from an extraction run: one observation per product.
+
+    Observations are buffered and written per `buffer_rows`; each flush adds
+    a file to every partition it touches, so run compact() after the run.
+    """
+    format = "prices"
+
+    def __init__(
+        self,
+        store: PriceStore,
+        run_id: Optional[str] = None,
+        buffer_rows: int = 50_000,
+        currency: str = "BRL",
+        normalize: bool = True,
+    ):
+        """
+        Args:
+            store: Store to write to
+            run_id: Stored with every observation (default: a timestamp)
+            buffer_rows: Observations buffered before a write
+            currency: ISO code of the extracted prices
+            normalize: Normalize products that aren't yet (prices are read from the normalized fields)
+        """
+        super().__init__(store.root, normalize)
+        self.store = store
+        self.run_id = run_id or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self.buffer_rows = max(buffer_rows, 1)
+        self.currency = currency
+        self.files_written = 0
+        self._rows: List[Tuple[str, datetime, Dict[str, Any]]] = []
+        self._pending_urls = self._pending_failed = 0
+        self._fields: Dict[Tuple[str, ...], Tuple[Optional[str], ...]] = {}
+
+    def write(self, url: str, products: List[Dict[str, Any]], error: Optional[str] = None) -> bool:
+        observed_at = datetime.now(timezone.utc)
+        self._rows.extend((url, observed_at, product) for product in products)
+        self._pending_urls += 1
+        self._pending_failed += error is not None
+        if len(self._rows) >= self.buffer_rows:
+            self.flush()
+            return True
+        return False
+
+    def _product_fields(self, product: Dict[str, Any]) -> Tuple[Optional[str], ...]:
+        keys = tuple(product)
+        if keys not in self._fields:
+            price, _, name = product_fields(keys)
+            self._fields[keys] = (_identifier_field(keys), _category_field(keys), name, price)
+        return self._fields[keys]
+
+    def flush(self):
+        if not self._rows:
+            self.urls += self._pending_urls
+            self.failed_urls += self._pending_failed
+            self._pending_urls = self._pending_failed = 0
+            return
+        rows, self._rows = self._rows, []
+        if self.normalize:
+            normalize_products([p for _, _, p in rows if "normalized" not in p])
+
+        columns: Dict[str, list] = {name: [] for name in (
+            "observed_at", "merchant", "product_id", "category", "name", "price_text", "url")}
+        normalized_columns = ("regular_price", "sale_price", "was_price", "unit_price", "unit_price_unit",
+                              "pack_count", "size_value", "size_unit")
+        for name in normalized_columns:
+            columns[name] = []
+        for url, observed_at, product in rows:
+            id_field, category_field, name_field, price_field = self._product_fields(product)
+            normalized = product.get("normalized") or {}
+            columns["observed_at"].append(observed_at)
+            columns["merchant"].append(merchant_key(url))
+            columns["product_id"].append(str(product.get(id_field) or url) if id_field else url)
+            columns["category"].append(product.get(category_field) if category_field else None)
+            columns["name"].append(product.get(name_field) if name_field else None)
+            columns["price_text"].append(product.get(price_field) if price_field else None)
+            columns["url"].append(url)
+            for name in normalized_columns:
+                columns[name].append(normalized.get(name))
+
+        table = pa.table(columns)
+        price = pc.if_else(pc.is_null(table.column("sale_price")), table.column("regular_price"),
+                           table.column("sale_price"))
+        table = table.append_column("price", price)
+        table = table.append_column("currency", pa.array([self.currency] * len(table)))
+        table = table.append_column("run_id", pa.array([self.run_id] * len(table)))
+        self.files_written += self.store.write(table)
+
+        self.urls += self._pending_urls
+        self.failed_urls += self._pending_failed
+        self.products += len(rows)
+        self._pending_urls = self._pending_failed = 0
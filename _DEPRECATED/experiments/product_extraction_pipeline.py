@@ -4,6 +4,8 @@ Product Extraction Pipeline
 
 This pipeline uses LLM-assisted schema generation to create extraction patterns
 for product data, then performs LLM-free extraction using the cached patterns.
+Pages with embedded product data skip schemas, and cached patterns are tried
+over plain HTTP before a browser; results stream to sinks (see result_sinks).
 
 The pipeline prioritizes collecting:
 - Product identification number
@@ -18,8 +20,11 @@ The pipeline prioritizes collecting:
 import json
 import asyncio
 import hashlib
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Iterable
 from urllib.parse import urlparse
 from crawl4ai import (
     AsyncWebCrawler,
@@ -28,11 +33,27 @@ from crawl4ai import (
     JsonCssExtractionStrategy,
     LLMExtractionStrategy,
     RegexExtractionStrategy,
-    LLMConfig,
     CacheMode
 )
 from pydantic import BaseModel, Field
 
+from browser_pool import BrowserPool
+from html_pruning import DEFAULT_TOKEN_BUDGET, prune_html
+from llm_provider import SchemaProvider, provider_from_config
+from http_extraction import CompiledCssSchema, HttpSchemaExtractor, required_fields, required_fields_filled, schema_hash
+from schema_store import CachedSchema, SchemaCache, atomic_write_json
+from structured_data import StructuredDataStats, extract_structured_products
+from dom_similarity import SimHashIndex, dom_fingerprint, dom_simhash, schema_fits_page
+from price_normalization import normalize_products
+from result_sinks import SINKS, ResultRun
+from schema_health import STATUS_DEGRADED, SchemaHealthMonitor, page_problems, top_level_fields
+from schema_keys import PAGE_LISTING, PAGE_PRODUCT, SchemaKey, SchemaKeyResolver
+from url_templates import TemplateCache
+
+# Extraction modes recorded per domain/URL template in url_patterns.json
+MODE_HTTP = "http"
+MODE_BROWSER = "browser"
+
 
 class ProductData(BaseModel):
     """Standard product data model"""
@@ -49,20 +70,120 @@ class ProductData(BaseModel):
     url: Optional[str] = Field(None, description="Source URL")
 
 
+@dataclass
+class UrlExtraction:
+    """Outcome of extracting one URL; failures carry the error instead of raising"""
+    index: int
+    url: str
+    products: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
 class ProductExtractionPipeline:
-    """Main pipeline for product extraction"""
+    """
+    Main pipeline for product extraction.
+
+    Used as an async context manager, the pipeline keeps a pool of long-lived
+    browsers (and one HTTP session) for all its URLs; otherwise every crawl
+    launches its own browser.
+    """
 
     def __init__(self,
                  cache_dir: str = "./schema_cache",
                  association_file: str = "./url_patterns.json",
+                 template_cache_dir: str = "./template_cache",
                  llm_provider: str = "openai/gpt-4o-mini",
-                 api_token: str = None):
+                 api_token: str = None,
+                 llm_base_url: Optional[str] = None,
+                 schema_provider: Optional[SchemaProvider] = None,
+                 browsers: int = 1,
+                 tabs_per_browser: int = 4,
+                 pages_per_browser: int = 100,
+                 max_browser_memory_mb: Optional[float] = 4096,
+                 concurrency: int = 4,
+                 per_domain_concurrency: int = 4,
+                 http_first: bool = True,
+                 http_failures_before_browser: int = 3,
+                 structured_data: bool = True,
+                 schema_cache_size: int = 256,
+                 url_patterns_flush_interval: float = 5.0,
+                 schema_health_window: int = 20,
+                 schema_token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
         self.association_file = Path(association_file)
         self.llm_provider = llm_provider
         self.api_token = api_token
+        self.schema_token_budget = schema_token_budget
+        # Schema generation backend: crawl4ai/litellm, or "local/<model>" at llm_base_url
+        self.schema_provider = schema_provider or provider_from_config(llm_provider, api_token, llm_base_url)
+        self.llm_stats = {"calls": 0, "failed": 0, "input_tokens": 0, "seconds": 0.0}
         self.url_patterns = self._load_url_patterns()
+        self.url_patterns_flush_interval = url_patterns_flush_interval
+        self._url_patterns_dirty = False
+        self._url_patterns_flushed_at = time.monotonic()
+        self.schema_cache = SchemaCache(max_entries=schema_cache_size)
+        self.schema_keys = SchemaKeyResolver(TemplateCache(template_cache_dir))
+        self.simhash_index = SimHashIndex()
+        self.schema_stats = {"generated": 0, "reused": 0, "degraded": 0, "regenerated": 0, "regeneration_failed": 0}
+        self.schema_health = SchemaHealthMonitor(window=schema_health_window)
+        self._regenerations: Dict[str, asyncio.Task] = {}
+        for key, association in self.url_patterns.items():
+            if "template" in association:
+                self.schema_keys.register(
+                    SchemaKey(association["domain"], association["template"], association["page_type"]),
+                    association.get("dom_fingerprint"),
+                )
+            if association.get("dom_simhash"):
+                self.simhash_index.add(key, int(association["dom_simhash"], 16), association["page_type"])
+        self.browser_config = BrowserConfig(headless=False, java_script_enabled=True)
+        self.browsers = browsers
+        self.tabs_per_browser = tabs_per_browser
+        self.pages_per_browser = pages_per_browser
+        self.max_browser_memory_mb = max_browser_memory_mb
+        self.browser_pool: Optional[BrowserPool] = None
+        self.concurrency = concurrency
+        self.per_domain_concurrency = per_domain_concurrency
+        self.http_first = http_first
+        self.http_failures_before_browser = http_failures_before_browser
+        self.http_extractor = HttpSchemaExtractor()
+        self.structured_data = structured_data
+        self.structured_stats = StructuredDataStats()
+        self.mode_stats = {"structured": 0, "http": 0, "browser": 0, "fallback": 0}
+
+    async def __aenter__(self):
+        self.browser_pool = BrowserPool(
+            self.browser_config,
+            size=self.browsers,
+            max_tabs=self.tabs_per_browser,
+            max_uses=self.pages_per_browser,
+            max_memory_mb=self.max_browser_memory_mb,
+        )
+        await self.browser_pool.start()
+        await self.http_extractor.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.finish_regenerations(cancel=exc_type is not None)
+        self.flush_url_patterns()
+        await self.http_extractor.__aexit__(exc_type, exc_val, exc_tb)
+        await self.schema_provider.close()
+        if self.browser_pool:
+            await self.browser_pool.close()
+            self.browser_pool = None
+
+    async def _crawl(self, url: str, config: CrawlerRunConfig):
+        """Crawl on a pooled browser, or on a fresh one outside the context manager"""
+        if self.browser_pool:
+            return await self.browser_pool.arun(url, config=config)
+
+        async with AsyncWebCrawler(config=self.browser_config) as crawler:
+            return await crawler.arun(url=url, config=config)
 
     def _load_url_patterns(self) -> Dict[str, Any]:
         """Load URL to pattern associations"""
@@ -71,20 +192,59 @@ class ProductExtractionPipeline:
                 return json.load(f)
         return {}
 
-    def _save_url_patterns(self):
-        """Save URL to pattern associations"""
-        with open(self.association_file, 'w') as f:
-            json.dump(self.url_patterns, f, indent=2)
+    def _save_url_patterns(self, force: bool = False):
+        """Mark URL to pattern associations changed; written at most every flush interval"""
+        self._url_patterns_dirty = True
+        if force or time.monotonic() - self._url_patterns_flushed_at >= self.url_patterns_flush_interval:
+            self.flush_url_patterns()
+
+    def flush_url_patterns(self):
+        """Write pending URL to pattern associations (atomically)"""
+        if not self._url_patterns_dirty:
+            return
+        atomic_write_json(self.association_file, self.url_patterns)
+        self._url_patterns_dirty = False
+        self._url_patterns_flushed_at = time.monotonic()
 
     def _get_domain_key(self, url: str) -> str:
         """Extract domain key from URL for pattern association"""
         parsed = urlparse(url)
         return f"{parsed.netloc}"
 
-    def _get_pattern_cache_path(self, domain_key: str) -> Path:
-        """Get cache file path for a domain pattern"""
-        # Create a hash of the domain key for filename safety
-        hash_key = hashlib.md5(domain_key.encode()).hexdigest()
+    def _get_extraction_mode(self, url: str) -> Optional[str]:
+        """Recorded mode for the URL's domain and template (None until settled)"""
+        modes = self.url_patterns.get(self._get_domain_key(url), {}).get("extraction_modes", {})
+        return modes.get(self.schema_keys.resolve(url).template, {}).get("mode")
+
+    def _get_mode_entry(self, url: str) -> Dict[str, Any]:
+        """Extraction mode record for the URL's domain and template"""
+        modes = self.url_patterns.setdefault(self._get_domain_key(url), {}).setdefault("extraction_modes", {})
+        return modes.setdefault(
+            self.schema_keys.resolve(url).template,
+            {"mode": None, "http_ok": 0, "http_failed": 0, "failure_streak": 0},
+        )
+
+    def _record_http_outcome(self, url: str, ok: bool):
+        """Settle on HTTP after a success, or on the browser after repeated failures"""
+        entry = self._get_mode_entry(url)
+        previous = entry["mode"]
+        if ok:
+            entry["http_ok"] += 1
+            entry["failure_streak"] = 0
+            entry["mode"] = MODE_HTTP
+        else:
+            entry["http_failed"] += 1
+            entry["failure_streak"] += 1
+            if entry["failure_streak"] >= self.http_failures_before_browser:
+                entry["mode"] = MODE_BROWSER
+        if entry["mode"] != previous:
+            print(f"Extraction mode for {self.schema_keys.resolve(url).key}: {entry['mode']}")
+            self._save_url_patterns()
+
+    def _get_pattern_cache_path(self, schema_key: str) -> Path:
+        """Get cache file path for a schema key (domain, or domain + template)"""
+        # Create a hash of the key for filename safety
+        hash_key = hashlib.md5(schema_key.encode()).hexdigest()
         return self.cache_dir / f"pattern_{hash_key}.json"
 
     def _validate_and_clean_schema(self, schema: Dict[str, Any]) -> Dict[str, Any]:
@@ -137,32 +297,20 @@ class ProductExtractionPipeline:
 
         return clean_schema_recursive(schema)
 
-    async def generate_schema_for_url(self, url: str) -> Dict[str, Any]:
+    async def generate_schema_for_url(self, url: str, page_type: str = PAGE_PRODUCT) -> Dict[str, Any]:
         """Generate extraction patterns for a specific URL using LLM"""
-        print(f"Generating patterns for {url}...")
-
-        if not self.api_token:
-            raise ValueError("API token required for schema generation")
+        print(f"Generating {page_type} patterns for {url}...")
 
-        # Configure LLM
-        llm_config = LLMConfig(
-            provider=self.llm_provider,
-            api_token=self.api_token,
-        )
+        self.schema_provider.check()
 
         # Get sample HTML for context
-        browser_config = BrowserConfig(headless=False)
-        async with AsyncWebCrawler(config=browser_config) as crawler:
-            result = await crawler.arun(
-                url=url,
-                config=CrawlerRunConfig(cache_mode=CacheMode.BYPASS)
-            )
+        result = await self._crawl(url, CrawlerRunConfig(cache_mode=CacheMode.BYPASS))
 
-            if not result.success:
-                raise Exception(
-                    f"Failed to crawl {url}: {result.error_message}")
+        if not result.success:
+            raise Exception(
+                f"Failed to crawl {url}: {result.error_message}")
 
-            html = result.fit_html
+        html = result.fit_html
 
         # Save HTML for debugging
         debug_html_file = self.cache_dir / \
@@ -171,6 +319,14 @@ class ProductExtractionPipeline:
             f.write(html)
         print(f"HTML saved for debugging: {debug_html_file}")
         print(f"HTML length: {len(html)} characters")
+
+        # Only the structure around the product goes to the LLM
+        pruned = prune_html(html, self.schema_token_budget)
+        print(f"HTML for schema generation: ~{pruned.tokens_before} -> ~{pruned.tokens_after} tokens "
+              f"({pruned.reduction:.0%} pruned in {pruned.seconds * 1000:.0f}ms)")
+        if pruned.over_budget:
+            print(f"  Warning: product regions alone exceed the {self.schema_token_budget} token budget")
+        html = pruned.html
         print(f"HTML preview (first 1000 chars):\n{html[:1000]}")
 
         # Generate patterns for each field using LLM
@@ -239,11 +395,36 @@ class ProductExtractionPipeline:
             Focus on the MAIN product being displayed using simple, reliable selectors.
             """
 
-            schema = JsonCssExtractionStrategy.generate_schema(
-                html=html,
-                query=comprehensive_query,
-                llm_config=llm_config,
-            )
+            listing_query = r"""
+            Analyze this e-commerce listing page (category, collection or search results)
+            and create CSS selectors for extracting EVERY product card on it.
+            The baseSelector must match each product card once; field selectors are
+            relative to the card:
+            1. Product name/title
+            2. Current price
+            3. Product link (attribute field "product_url" reading href)
+            4. Product ID/SKU if the card carries one (data attributes)
+            5. Brand and package size if shown on the card
+
+            IMPORTANT: Create SIMPLE CSS selectors only. Avoid escaped characters,
+            complex pseudo-selectors and Tailwind classes with escape sequences.
+            Ignore banners, filters, navigation and recommendation carousels.
+            """
+
+            start = time.perf_counter()
+            self.llm_stats["calls"] += 1
+            self.llm_stats["input_tokens"] += pruned.tokens_after
+            try:
+                schema = await self.schema_provider.generate_schema(
+                    html, listing_query if page_type == PAGE_LISTING else comprehensive_query,
+                )
+            except Exception:
+                self.llm_stats["failed"] += 1
+                raise
+            finally:
+                self.llm_stats["seconds"] += time.perf_counter() - start
+            elapsed = time.perf_counter() - start
+            print(f"  Schema generated in {elapsed:.1f}s")
 
             # Validate and clean CSS selectors
             if schema:
@@ -257,48 +438,222 @@ class ProductExtractionPipeline:
 
         return patterns
 
-    async def get_or_generate_schema(self, url: str) -> Dict[str, Any]:
-        """Get cached CSS schema or generate new one for URL"""
-        domain_key = self._get_domain_key(url)
-        pattern_file = self._get_pattern_cache_path(domain_key)
-
-        # Check if we have cached schema for this domain
-        if domain_key in self.url_patterns and pattern_file.exists():
-            print(f"Using cached CSS schema for {domain_key}")
-            with open(pattern_file, 'r') as f:
-                return json.load(f)
-
-        # Generate new schema
-        schema = await self.generate_schema_for_url(url)
-
-        if schema is None:
-            raise Exception(f"Failed to generate schema for {url}")
-
-        # Cache the schema
-        with open(pattern_file, 'w') as f:
-            json.dump(schema, f, indent=2)
+    def _get_schema_storage_key(self, key: SchemaKey, html: Optional[str]) -> str:
+        """
+        Key whose schema serves `key`: its own, one of a same-domain template
+        with the same DOM structure, or the legacy per-domain schema for
+        product pages (schemas generated before keys included the template).
+        """
+        if key.key in self.url_patterns:
+            return key.key
+        if html:
+            alias = self.schema_keys.by_fingerprint(key.domain, dom_fingerprint(html))
+            if alias:
+                return alias
+        if key.page_type == PAGE_PRODUCT and "pattern_file" in self.url_patterns.get(key.domain, {}):
+            return key.domain
+        return key.key
+
+    async def get_schema_entry(self, url: str, html: Optional[str] = None) -> CachedSchema:
+        """
+        Cached, stored or newly generated schema for the URL's domain and template.
+
+        Concurrent callers for a template without a schema share one generation.
+
+        Args:
+            url: Page URL
+            html: Raw page HTML if already fetched (settles the page type and
+                lets a new template reuse the schema of a structurally identical one)
+        """
+        key = self.schema_keys.resolve(url, html)
+        storage_key = self._get_schema_storage_key(key, html)
+        return await self.schema_cache.get_or_create(
+            storage_key,
+            self._get_pattern_cache_path(storage_key),
+            lambda: self._generate_schema(url, key, html),
+            load="pattern_file" in self.url_patterns.get(storage_key, {}),
+        )
 
-        # Update URL associations
-        self.url_patterns[domain_key] = {
-            "pattern_file": str(pattern_file),
+    def _find_similar_schema(self, key: SchemaKey, html: str, simhash: int) -> Optional[CachedSchema]:
+        """A cached schema of a structurally similar page that extracts this page correctly"""
+        for candidate, distance in self.simhash_index.nearest(simhash, key.page_type):
+            if candidate == key.key or self.schema_health.is_degraded(candidate):
+                continue
+            entry = self.schema_cache.get(candidate, self._get_pattern_cache_path(candidate))
+            min_items = 2 if key.page_type == PAGE_LISTING else 1
+            if entry is not None and schema_fits_page(entry.compiled, entry.required, html, min_items):
+                print(f"Reusing CSS schema of {candidate} for {key.key} ({distance} bits apart)")
+                return entry
+        return None
+
+    async def _generate_schema(self, url: str, key: SchemaKey, html: Optional[str]) -> Dict[str, Any]:
+        simhash = dom_simhash(html) if html else None
+        similar = self._find_similar_schema(key, html, simhash) if html else None
+
+        if similar is not None:
+            schema = similar.schema
+            self.schema_stats["reused"] += 1
+        else:
+            schema = await self.generate_schema_for_url(url, key.page_type)
+            if schema is None:
+                raise Exception(f"Failed to generate schema for {url}")
+            self.schema_stats["generated"] += 1
+            print(f"Generated and cached {key.page_type} CSS schema for {key.key}")
+
+        # Update URL associations (the schema cache writes the pattern file)
+        fingerprint = dom_fingerprint(html) if html else None
+        self.url_patterns[key.key] = {
+            "pattern_file": str(self._get_pattern_cache_path(key.key)),
             "generated_from": url,
-            "schema_hash": hashlib.md5(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+            "schema_hash": schema_hash(schema),
+            "domain": key.domain,
+            "template": key.template,
+            "page_type": key.page_type,
+            "dom_fingerprint": fingerprint,
+            "dom_simhash": f"{simhash:016x}" if simhash is not None else None,
+            "reused_from": similar.key if similar is not None else None,
         }
+        self.schema_keys.register(key, fingerprint)
+        if simhash is not None:
+            self.simhash_index.add(key.key, simhash, key.page_type)
         self._save_url_patterns()
-
-        print(f"Generated and cached CSS schema for {domain_key}")
         return schema
 
+    def _record_schema_health(self, url: str, entry: CachedSchema, products: List[Dict[str, Any]]):
+        """Track the schema's extraction health; a degraded schema is regenerated once in the background"""
+        association = self.url_patterns.get(entry.key)
+        health = self.schema_health.get(
+            entry.key, top_level_fields(entry.schema), entry.required,
+            association.get("health") if association else None,
+        )
+        if health.record(products):
+            self.schema_stats["degraded"] += 1
+            print(f"⚠️ Schema {entry.key} degraded: {'; '.join(health.reasons)}")
+        if association is not None:
+            association["health"] = health.to_dict()
+            self._save_url_patterns()
+
+        if health.status == STATUS_DEGRADED and entry.key not in self._regenerations:
+            # A regeneration already rejected for this schema version isn't retried on later runs
+            if association is None or association.get("regeneration_failed_for") != schema_hash(entry.schema):
+                self._regenerations[entry.key] = asyncio.create_task(self._regenerate_schema(entry, url))
+
+    async def _regenerate_schema(self, entry: CachedSchema, url: str) -> bool:
+        """
+        Replace a degraded schema with one generated from `url`.
+
+        The new schema must extract `url` cleanly over HTTP (unless the
+        template needs the browser); otherwise the old one stays in use.
+        """
+        key = self.schema_keys.resolve(url)
+        print(f"Regenerating degraded schema {entry.key} from {url}...")
+        try:
+            schema = await self.generate_schema_for_url(url, key.page_type)
+            if schema is None:
+                raise Exception("no schema generated")
+            if self._get_extraction_mode(url) != MODE_BROWSER:
+                html = await self.http_extractor.fetch(url)
+                products = CompiledCssSchema(schema).extract(html) if html else []
+                problems = page_problems(products, top_level_fields(schema), required_fields(schema))
+                if problems:
+                    raise Exception(f"new schema fails validation ({'; '.join(problems)})")
+        except Exception as e:
+            self.schema_stats["regeneration_failed"] += 1
+            print(f"⚠️ Keeping degraded schema {entry.key}: {e}")
+            if entry.key in self.url_patterns:
+                self.url_patterns[entry.key]["regeneration_failed_for"] = schema_hash(entry.schema)
+                self._save_url_patterns()
+            return False
+
+        previous_hash = schema_hash(entry.schema)
+        new_entry = self.schema_cache.put(entry.key, entry.path, schema)
+        health = self.schema_health.schemas[entry.key]
+        health.reset(top_level_fields(schema), new_entry.required)
+        association = self.url_patterns.setdefault(entry.key, {"pattern_file": str(entry.path)})
+        association.update({
+            "schema_hash": schema_hash(schema),
+            "previous_schema_hash": previous_hash,
+            "regenerated_from": url,
+            "regenerated_at": time.time(),
+            "health": health.to_dict(),
+        })
+        # The old schema may have pushed the template onto the browser; give HTTP another chance
+        self.url_patterns.get(key.domain, {}).get("extraction_modes", {}).pop(key.template, None)
+        self.schema_stats["regenerated"] += 1
+        self._save_url_patterns(force=True)
+        print(f"Regenerated schema {entry.key}")
+        return True
+
+    async def finish_regenerations(self, cancel: bool = False):
+        """Wait for (or cancel) background schema regenerations"""
+        pending = [task for task in self._regenerations.values() if not task.done()]
+        for task in pending if cancel else []:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def get_or_generate_schema(self, url: str) -> Dict[str, Any]:
+        """Get cached CSS schema or generate new one for URL"""
+        return (await self.get_schema_entry(url)).schema
+
+    def extract_structured(self, url: str, html: str) -> List[Dict[str, Any]]:
+        """Products embedded as structured data in the page source, as ProductData dicts"""
+        found = extract_structured_products(html, url)
+        self.structured_stats.record(self._get_domain_key(url), found)
+        if not found:
+            return []
+
+        products = [ProductData(**p.fields, url=url).model_dump() for p in found]
+        print(f"Successfully extracted {len(products)} products from {url} ({found[0].source})")
+        return products
+
+    def extract_via_http(
+        self, url: str, entry: CachedSchema, html: Optional[str]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Apply the compiled schema to the raw HTTP response; None if the browser is needed"""
+        products = entry.compiled.extract(html) if html else []
+        ok = required_fields_filled(products, entry.required)
+        self._record_http_outcome(url, ok)
+        if not ok:
+            return None
+
+        for product in products:
+            product['url'] = url
+        print(f"Successfully extracted {len(products)} products from {url} (http)")
+        return products
+
     async def extract_products_from_url(self, url: str) -> List[Dict[str, Any]]:
         """Extract products from URL using cached or generated CSS schema"""
         print(f"Extracting products from {url}...")
 
+        # One plain-HTTP fetch serves both the structured-data scan and the HTTP mode;
+        # merchants whose first pages had no structured data aren't scanned any more
+        use_http = self.http_first and self._get_extraction_mode(url) != MODE_BROWSER
+        use_structured = self.structured_data and self.structured_stats.worth_fetching(self._get_domain_key(url))
+        html = await self.http_extractor.fetch(url) if use_structured or use_http else None
+
+        # Embedded product data needs neither a schema nor a browser
+        if use_structured and html:
+            products = self.extract_structured(url, html)
+            if products:
+                self.mode_stats["structured"] += 1
+                return products
+
         # Get extraction schema
-        schema = await self.get_or_generate_schema(url)
+        entry = await self.get_schema_entry(url, html)
+        schema = entry.schema
+
+        # Server-rendered pages don't need a browser; fall back when fields come back empty
+        if use_http:
+            products = self.extract_via_http(url, entry, html)
+            if products is not None:
+                self.mode_stats["http"] += 1
+                self._record_schema_health(url, entry, products)
+                return products
+            self.mode_stats["fallback"] += 1
+        self.mode_stats["browser"] += 1
 
         # Extract data using CSS strategy (LLM-free)
-        browser_config = BrowserConfig(
-            headless=False, java_script_enabled=True)
         extraction_strategy = JsonCssExtractionStrategy(schema)
 
         config = CrawlerRunConfig(
@@ -307,51 +662,181 @@ class ProductExtractionPipeline:
             delay_before_return_html=2
         )
 
-        async with AsyncWebCrawler(config=browser_config) as crawler:
-            result = await crawler.arun(url=url, config=config)
+        result = await self._crawl(url, config)
 
-            if result.success and result.extracted_content:
-                try:
-                    products = json.loads(result.extracted_content)
+        if result.success and result.extracted_content:
+            try:
+                products = json.loads(result.extracted_content)
 
-                    # Add source URL to each product
-                    for product in products:
-                        product['url'] = url
+                # Add source URL to each product
+                for product in products:
+                    product['url'] = url
 
-                    print(
-                        f"Successfully extracted {len(products)} products from {url}")
-                    return products
+                print(
+                    f"Successfully extracted {len(products)} products from {url}")
+                self._record_schema_health(url, entry, products)
+                return products
 
-                except json.JSONDecodeError as e:
-                    print(f"Failed to parse extracted JSON: {e}")
-                    print(f"Raw content: {result.extracted_content[:500]}...")
-                    return []
-            else:
-                print(f"Failed to extract from {url}: {result.error_message}")
+            except json.JSONDecodeError as e:
+                print(f"Failed to parse extracted JSON: {e}")
+                print(f"Raw content: {result.extracted_content[:500]}...")
                 return []
+        else:
+            print(f"Failed to extract from {url}: {result.error_message}")
+            return []
+
+    async def iter_process_urls(
+        self,
+        urls: Iterable[str],
+        concurrency: Optional[int] = None,
+        per_domain_concurrency: Optional[int] = None,
+        ordered: bool = False
+    ) -> AsyncIterator[UrlExtraction]:
+        """
+        Extract URLs concurrently, yielding each outcome as it becomes available.
+
+        At most `concurrency` URLs are in flight overall and at most
+        `per_domain_concurrency` per domain; with the browser pool they run
+        as tabs of the shared browsers. Only a bounded window of URLs is
+        scheduled ahead, so huge URL lists don't become huge task lists.
+        A failing URL yields an UrlExtraction with `error` set and the batch
+        carries on.
+
+        Args:
+            urls: URLs to extract
+            concurrency: Global in-flight limit (default: the pipeline's)
+            per_domain_concurrency: In-flight limit per domain (default: the pipeline's)
+            ordered: Yield in input order instead of completion order
+        """
+        concurrency = max(concurrency or self.concurrency, 1)
+        per_domain_concurrency = max(per_domain_concurrency or self.per_domain_concurrency, 1)
+        slots = asyncio.Semaphore(concurrency)
+        domain_slots: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(per_domain_concurrency)
+        )
 
-    async def process_urls(self, urls: List[str]) -> Dict[str, List[Dict[str, Any]]]:
-        """Process multiple URLs and extract products"""
-        results = {}
-
-        for url in urls:
-            try:
-                products = await self.extract_products_from_url(url)
-                results[url] = products
-            except Exception as e:
-                print(f"Error processing {url}: {str(e)}")
-                results[url] = []
+        async def run(index: int, url: str) -> UrlExtraction:
+            outcome = UrlExtraction(index=index, url=url)
+            # Domain first, so URLs queued behind a busy domain don't hold global slots
+            async with domain_slots[self._get_domain_key(url)], slots:
+                start = time.perf_counter()
+                try:
+                    outcome.products = await self.extract_products_from_url(url)
+                except Exception as e:
+                    outcome.error = f"{type(e).__name__}: {e}"
+                    print(f"Error processing {url}: {outcome.error}")
+                outcome.elapsed = time.perf_counter() - start
+            return outcome
+
+        window = concurrency * 4
+        pending = set()
+        finished: Dict[int, UrlExtraction] = {}
+        next_index = 0
+        url_iter = enumerate(urls)
+        exhausted = False
+        completed = False
 
+        try:
+            while True:
+                while not exhausted and len(pending) + len(finished) < window:
+                    try:
+                        index, url = next(url_iter)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.create_task(run(index, url)))
+
+                if not pending:
+                    break
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    outcome = task.result()
+                    if not ordered:
+                        yield outcome
+                    else:
+                        finished[outcome.index] = outcome
+
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+            completed = True
+        finally:
+            # The consumer stopped early (or was cancelled): don't leave crawls running
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            await self.finish_regenerations(cancel=not completed)
+            self.flush_url_patterns()
+
+    async def process_urls(
+        self,
+        urls: List[str],
+        concurrency: Optional[int] = None,
+        per_domain_concurrency: Optional[int] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Process multiple URLs concurrently and extract products (failed URLs map to [])"""
+        results = {url: [] for url in urls}
+        async for outcome in self.iter_process_urls(urls, concurrency, per_domain_concurrency):
+            results[outcome.url] = outcome.products
         return results
 
-    def save_results(self, results: Dict[str, List[Dict[str, Any]]], output_file: str = "extracted_products.json"):
-        """Save extraction results to file"""
+    async def process_urls_to(
+        self,
+        urls: Iterable[str],
+        run: ResultRun,
+        concurrency: Optional[int] = None,
+        per_domain_concurrency: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Process URLs concurrently, writing each outcome to `run` as it completes.
+
+        Nothing is kept in memory past the run's write buffers. Returns the
+        URL, failure and product counts.
+        """
+        counts = {"urls": 0, "failed": 0, "products": 0}
+        async for outcome in self.iter_process_urls(urls, concurrency, per_domain_concurrency):
+            run.write(outcome.url, outcome.products, outcome.error)
+            counts["urls"] += 1
+            counts["failed"] += not outcome.ok
+            counts["products"] += len(outcome.products)
+        return counts
+
+    def save_results(
+        self,
+        results: Dict[str, List[Dict[str, Any]]],
+        output_file: str = "extracted_products.jsonl",
+        normalize: bool = True,
+    ):
+        """
+        Save extraction results to file
+
+        A .jsonl or .parquet output is written through the result sinks
+        (with a manifest next to it); .json keeps the old single-document
+        format.
+
+        Args:
+            results: Products by URL
+            output_file: File to write
+            normalize: Add parsed prices, package sizes and unit prices to each product
+        """
         output_path = Path(output_file)
 
+        if output_path.suffix.lstrip(".") in SINKS:
+            with ResultRun(output_path.parent, output_path.stem, formats=(output_path.suffix.lstrip("."),),
+                           normalize=normalize) as run:
+                for url, products in results.items():
+                    run.write(url, products)
+            print(f"Results saved to {output_path} (manifest {run.manifest_path})")
+            return output_path
+
         # Flatten results for easier analysis
         all_products = []
         for url, products in results.items():
             all_products.extend(products)
+        if normalize:
+            normalize_products(all_products)
 
         output_data = {
             "total_products": len(all_products),
@@ -369,29 +854,34 @@ class ProductExtractionPipeline:
 
 async def main():
     """Example usage"""
-    # Initialize pipeline
-    pipeline = ProductExtractionPipeline(
+    # Initialize pipeline (one browser pool shared by all URLs)
+    async with ProductExtractionPipeline(
         api_token="env:OPENAI_API_KEY"  # Will read from environment
-    )
+    ) as pipeline:
 
-    # Example URLs (replace with actual product URLs)
-    urls = [
-        "https://www.tendaatacado.com.br/produto/leite-integral-piracanjuba-1l-27748?region_id=000010",
-    ]
+        # Example URLs (replace with actual product URLs)
+        urls = [
+            "https://www.tendaatacado.com.br/produto/leite-integral-piracanjuba-1l-27748?region_id=000010",
+        ]
 
-    # Process URLs
-    results = await pipeline.process_urls(urls)
-
-    # Save results
-    pipeline.save_results(results)
+        # Stream each URL's products to disk as it's extracted
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        with ResultRun(".", f"extracted_products_{timestamp}", metadata={"urls": len(urls)}) as run:
+            counts = await pipeline.process_urls_to(urls, run)
 
     # Print summary
-    total_products = sum(len(products) for products in results.values())
     print(f"\nPipeline completed:")
-    print(f"- Processed {len(urls)} URLs")
-    print(f"- Extracted {total_products} products total")
-    print(f"- Cached patterns for {len(pipeline.url_patterns)} domains")
-
+    print(f"- Processed {counts['urls']} URLs ({counts['failed']} failed)")
+    print(f"- Extracted {counts['products']} products total")
+    print(f"- Results: {run.files}, manifest {run.manifest_path}")
+    print(f"- Cached patterns for {len(pipeline.url_patterns)} domains/templates")
+    print(f"- Extraction modes: {pipeline.mode_stats}")
+    print(f"- Schemas generated/reused/regenerated: {pipeline.schema_stats}")
+    print(f"- LLM schema calls: {pipeline.llm_stats}")
+    degraded = {k: h for k, h in pipeline.schema_health.report().items() if h["status"] == "degraded"}
+    if degraded:
+        print(f"- Degraded schemas: {degraded}")
+    print(f"- Structured data hit rate: {pipeline.structured_stats.report()}")
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Streaming Result Sinks
+
+Extractors write each URL's products to a sink as soon as they're extracted,
+instead of keeping every product in memory for one big JSON dump at the end:
+- JsonlSink: one line per URL ({"url", "products", "error"}), written in
+  batches; each batch is flushed and fsync'ed, so a crash loses at most the
+  batch being buffered
+- ParquetSink: one row per product (url, the raw product as JSON and typed
+  normalized price/size columns), buffered and written one row group at a
+  time; the file is readable once the sink is closed
+- ResultRun: the sinks of one extraction run plus a small manifest file with
+  the run metadata, status and durable counts, rewritten after every flush
+
+Products are normalized (see price_normalization) one batch at a time as
+they are written.
+
+Usage:
+    with ResultRun("./merchant_data", "merchant_x_20260101", formats=("jsonl", "parquet"),
+                   metadata={"merchant_url": url}) as run:
+        async for outcome in pipeline.iter_process_urls(urls):
+            run.write(outcome.url, outcome.products, outcome.error)
+"""
+
+import inspect
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from price_normalization import normalize_products
+from schema_store import atomic_write_json
+
+
+STATUS_RUNNING = "running"
+STATUS_COMPLETE = "complete"
+STATUS_FAILED = "failed"
+
+NORMALIZED_COLUMNS = (
+    ("regular_price", "float64"),
+    ("sale_price", "float64"),
+    ("was_price", "float64"),
+    ("pack_count", "float64"),
+    ("size_value", "float64"),
+    ("size_unit", "string"),
+    ("unit_price", "float64"),
+    ("unit_price_unit", "string"),
+)
+
+
+class ResultSink:
+    """Receives extraction outcomes one URL at a time"""
+    format = "base"
+
+    def __init__(self, path: Path, normalize: bool = True):
+        self.path = Path(path)
+        self.normalize = normalize
+        # Written durably (flushed) so far
+        self.urls = 0
+        self.failed_urls = 0
+        self.products = 0
+
+    def write(self, url: str, products: List[Dict[str, Any]], error: Optional[str] = None) -> bool:
+        """Buffer one URL's outcome; returns True when that triggered a flush"""
+        raise NotImplementedError
+
+    def flush(self):
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+
+
+class JsonlSink(ResultSink):
+    """One JSON line per URL, written and fsync'ed in batches"""
+    format = "jsonl"
+
+    def __init__(
+        self,
+        path: Path,
+        batch_size: int = 100,
+        max_delay: float = 5.0,
+        fsync: bool = True,
+        normalize: bool = True,
+    ):
+        """
+        Args:
+            path: JSONL file (replaced if it exists)
+            batch_size: URLs buffered before a flush
+            max_delay: Seconds after which a write flushes a smaller batch
+            fsync: fsync each flushed batch, not just hand it to the OS
+            normalize: Add parsed prices and sizes to each product
+        """
+        super().__init__(path, normalize)
+        self.batch_size = max(batch_size, 1)
+        self.max_delay = max_delay
+        self.fsync = fsync
+        self._buffer: List[Tuple[str, List[Dict[str, Any]], Optional[str]]] = []
+        self._last_flush = time.monotonic()
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def write(self, url: str, products: List[Dict[str, Any]], error: Optional[str] = None) -> bool:
+        self._buffer.append((url, products, error))
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.max_delay:
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        if self.normalize:
+            # Products another sink of the run already normalized are skipped
+            normalize_products([p for _, products, _ in batch for p in products if "normalized" not in p])
+        self._file.write("".join(
+            json.dumps({"url": url, "products": products, "error": error}, ensure_ascii=False) + "\n"
+            for url, products, error in batch
+        ))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.urls += len(batch)
+        self.failed_urls += sum(error is not None for _, _, error in batch)
+        self.products += sum(len(products) for _, products, _ in batch)
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class ParquetSink(ResultSink):
+    """
+    One row per product, written a row group at a time.
+
+    Failed URLs get a row with `error` set and no product. Parquet needs its
+    footer to be read, so the file is only usable after close(); pair it with
+    a JsonlSink when a crash must not lose the run.
+    """
+    format = "parquet"
+
+    def __init__(self, path: Path, row_group_size: int = 10_000, normalize: bool = True, compression: str = "zstd"):
+        """
+        Args:
+            path: Parquet file (replaced if it exists)
+            row_group_size: Rows buffered per row group
+            normalize: Fill the typed price/size columns
+            compression: Parquet codec
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        super().__init__(path, normalize)
+        self.row_group_size = max(row_group_size, 1)
+        self.row_groups = 0
+        self._pa = pa
+        self.schema = pa.schema(
+            [("url", pa.string()), ("error", pa.string()), ("product", pa.string())]
+            + [(name, pa.float64() if kind == "float64" else pa.string()) for name, kind in NORMALIZED_COLUMNS]
+        )
+        self._writer = pq.ParquetWriter(self.path, self.schema, compression=compression)
+        self._rows: List[Tuple[str, Optional[str], Optional[Dict[str, Any]]]] = []
+        self._pending_urls = self._pending_failed = 0
+
+    def write(self, url: str, products: List[Dict[str, Any]], error: Optional[str] = None) -> bool:
+        self._rows.extend((url, error, product) for product in products)
+        if not products:
+            self._rows.append((url, error, None))
+        self._pending_urls += 1
+        self._pending_failed += error is not None
+        if len(self._rows) >= self.row_group_size:
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        products = [product for _, _, product in rows if product is not None]
+        if self.normalize:
+            # Products another sink of the run already normalized are skipped
+            normalize_products([p for p in products if "normalized" not in p])
+
+        columns: Dict[str, list] = {
+            "url": [url for url, _, _ in rows],
+            "error": [error for _, error, _ in rows],
+            "product": [
+                None if product is None else json.dumps(
+                    {k: v for k, v in product.items() if k != "normalized"}, ensure_ascii=False)
+                for _, _, product in rows
+            ],
+        }
+        for name, _ in NORMALIZED_COLUMNS:
+            columns[name] = [
+                (product.get("normalized") or {}).get(name) if product is not None else None
+                for _, _, product in rows
+            ]
+        self._writer.write_table(self._pa.table(columns, schema=self.schema))
+        self.row_groups += 1
+        self.urls += self._pending_urls
+        self.failed_urls += self._pending_failed
+        self.products += len(products)
+        self._pending_urls = self._pending_failed = 0
+
+    def close(self):
+        if self._writer is not None:
+            self.flush()
+            self._writer.close()
+            self._writer = None
+
+
+SINKS = {"jsonl": JsonlSink, "parquet": ParquetSink}
+
+
+class ResultRun:
+    """
+    The sinks of one extraction run and its manifest.
+
+    The manifest (<name>.manifest.json) holds the run metadata, status
+    (running / complete / failed), output files and the counts written
+    durably so far; it is rewritten atomically after each flush and on close.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        name: str,
+        formats: Iterable[str] = ("jsonl",),
+        metadata: Optional[Dict[str, Any]] = None,
+        normalize: bool = True,
+        sinks: Iterable[ResultSink] = (),
+        **sink_options,
+    ):
+        """
+        Args:
+            output_dir: Directory for the result files and manifest
+            name: File name stem shared by the run's files
+            formats: Sinks to write ("jsonl", "parquet")
+            metadata: Run metadata stored in the manifest
+            normalize: Add parsed prices and sizes to the products
+            sinks: Further sinks written alongside the formats (e.g. a price_store.PriceStoreSink)
+            **sink_options: Passed to the sinks that accept them (batch_size, row_group_size, ...)
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.name = name
+        self.manifest_path = self.output_dir / f"{name}.manifest.json"
+        self.sinks: List[ResultSink] = []
+        for fmt in formats:
+            if fmt not in SINKS:
+                raise ValueError(f"Unknown result format {fmt!r} (expected one of {sorted(SINKS)})")
+            sink_cls = SINKS[fmt]
+            accepted = inspect.signature(sink_cls).parameters
+            options = {k: v for k, v in sink_options.items() if k in accepted}
+            self.sinks.append(sink_cls(self.output_dir / f"{name}.{fmt}", normalize=normalize, **options))
+        self.sinks.extend(sinks)
+        self.metadata: Dict[str, Any] = dict(metadata or {})
+        self.status = STATUS_RUNNING
+        self.started_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self._write_manifest()
+
+    @property
+    def files(self) -> Dict[str, str]:
+        return {sink.format: str(sink.path) for sink in self.sinks}
+
+    def write(self, url: str, products: List[Dict[str, Any]], error: Optional[str] = None):
+        """Write one URL's outcome to every sink"""
+        if any([sink.write(url, products, error) for sink in self.sinks]):
+            self._write_manifest()
+
+    def update_metadata(self, **metadata):
+        """Merge into the manifest metadata (also after close, e.g. for a run summary)"""
+        self.metadata.update(metadata)
+        self._write_manifest()
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+        self._write_manifest()
+
+    def close(self, status: str = STATUS_COMPLETE):
+        for sink in self.sinks:
+            sink.close()
+        self.status = status
+        self.finished_at = datetime.now()
+        self._write_manifest()
+
+    def manifest(self) -> Dict[str, Any]:
+        # Counts of the least advanced sink: what every output holds for sure
+        durable = min(self.sinks, key=lambda s: s.urls) if self.sinks else None
+        return {
+            "name": self.name,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "files": self.files,
+            "urls": durable.urls if durable else 0,
+            "failed_urls": durable.failed_urls if durable else 0,
+            "products": durable.products if durable else 0,
+            "metadata": self.metadata,
+        }
+
+    def _write_manifest(self):
+        atomic_write_json(self.manifest_path, self.manifest())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(STATUS_FAILED if exc_type else STATUS_COMPLETE)
+
+
+def read_jsonl_results(path: Path) -> Iterable[Dict[str, Any]]:
+    """URL outcomes of a JSONL sink file; a torn last line (crash mid-write) is skipped"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                if line.endswith("\n"):
+                    raise
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Schema Health
+
+Cached CSS schemas go stale silently when a merchant redeploys its frontend:
+selectors stop matching (fields come back empty) or start matching the wrong
+element (a price where the package size should be). This module tracks, per
+schema key, what each extracted page looked like:
+- Fill rate of every schema field (found on the page or not)
+- Format validation of price, package-size and identifier fields, and of
+  values copied from another field (`package_size == current_price`)
+- A rolling window of recent pages compared to a baseline learned while the
+  schema was healthy (exponentially weighted, so slow catalogue changes
+  don't raise alarms)
+
+A schema is marked degraded when a field's valid rate drops well below its
+baseline, when most values of a validated field fail their format check, or
+when required fields are missing on most pages. The pipeline then
+regenerates the schema once in the background.
+"""
+
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+STATUS_HEALTHY = "healthy"
+STATUS_DEGRADED = "degraded"
+
+# Page outcome per field
+FIELD_MISSING = 0
+FIELD_INVALID = 1
+FIELD_VALID = 2
+
+_PRICE = re.compile(r"\d+(?:[.,]\d{3})*[.,]\d{2}\b|R\$\s*\d")
+_SIZE = re.compile(
+    r"\d+(?:[.,]\d+)?\s*(?:kg|g|mg|l|lt|litros?|ml|un|und|unid|unidades?|cx|pct|pc|m|cm|mm|x)\b",
+    re.IGNORECASE,
+)
+_CURRENCY = re.compile(r"R\$|\bBRL\b")
+_IDENTIFIER = re.compile(r"^[\w./-]{1,64}$")
+
+# Field name hints -> format kind
+FORMAT_HINTS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("price", ("price", "preco", "preço")),
+    ("size", ("size", "package", "tamanho", "peso", "volume", "weight")),
+    ("identifier", ("sku", "product_id", "gtin", "ean")),
+)
+
+
+def field_format(name: str) -> Optional[str]:
+    """Format kind validated for a field name ('price', 'size', 'identifier'), if any"""
+    lowered = name.lower()
+    for kind, hints in FORMAT_HINTS:
+        if any(hint in lowered for hint in hints):
+            return kind
+    return None
+
+
+def value_is_valid(kind: Optional[str], value: str) -> bool:
+    if kind == "price":
+        return bool(_PRICE.search(value))
+    if kind == "size":
+        return bool(_SIZE.search(value)) and not _CURRENCY.search(value)
+    if kind == "identifier":
+        return bool(_IDENTIFIER.match(value.strip()))
+    return True
+
+
+def page_observation(
+    products: List[Dict[str, Any]], fields: List[str], formats: Dict[str, Optional[str]]
+) -> Dict[str, int]:
+    """
+    Outcome of every schema field on one page.
+
+    A field is valid if some product has a value passing its format check;
+    values equal to a price field's value count as invalid for non-price
+    fields (a selector that drifted onto the price element).
+    """
+    price_fields = [name for name in fields if formats.get(name) == "price"]
+    observation = {}
+    for name in fields:
+        outcome = FIELD_MISSING
+        for product in products:
+            value = str(product.get(name) or "").strip()
+            if not value:
+                continue
+            copied = name not in price_fields and any(
+                value == str(product.get(other) or "").strip() for other in price_fields
+            )
+            if value_is_valid(formats.get(name), value) and not copied:
+                outcome = FIELD_VALID
+                break
+            outcome = FIELD_INVALID
+        observation[name] = outcome
+    return observation
+
+
+def page_problems(products: List[Dict[str, Any]], fields: List[str], required: List[str]) -> List[str]:
+    """Validation of a single page: required fields missing, validated fields malformed"""
+    formats = {name: field_format(name) for name in fields}
+    observation = page_observation(products, fields, formats)
+    problems = [f"{name}: missing" for name in required if observation.get(name) == FIELD_MISSING]
+    problems += [f"{name}: fails the {formats[name]} check" for name, o in observation.items() if o == FIELD_INVALID]
+    return problems
+
+
+@dataclass
+class SchemaHealth:
+    """Rolling extraction health of one schema"""
+    key: str
+    fields: List[str]
+    required: List[str]
+    window: int = 20
+    min_pages: int = 10
+    max_drop: float = 0.5
+    max_invalid_share: float = 0.5
+    min_required_rate: float = 0.5
+    baseline_alpha: float = 0.05
+    status: str = STATUS_HEALTHY
+    reasons: List[str] = field(default_factory=list)
+    baseline: Dict[str, float] = field(default_factory=dict)
+    pages: int = 0
+    formats: Dict[str, Optional[str]] = field(init=False)
+    recent: Deque[Dict[str, int]] = field(init=False)
+
+    def __post_init__(self):
+        self.formats = {name: field_format(name) for name in self.fields}
+        self.recent = deque(maxlen=self.window)
+
+    def rates(self) -> Dict[str, Dict[str, float]]:
+        """Fill and valid rates per field over the recent window"""
+        n = len(self.recent) or 1
+        return {
+            name: {
+                "fill": sum(o[name] != FIELD_MISSING for o in self.recent) / n,
+                "valid": sum(o[name] == FIELD_VALID for o in self.recent) / n,
+            }
+            for name in self.fields
+        }
+
+    def _problems(self, rates: Dict[str, Dict[str, float]]) -> Dict[str, str]:
+        """Problem per field (at most one each)"""
+        problems = {}
+        for name, rate in rates.items():
+            base = self.baseline.get(name)
+            if base is not None and base >= 0.5 and rate["valid"] < base * (1 - self.max_drop):
+                problems[name] = f"{name}: valid rate {rate['valid']:.0%} (baseline {base:.0%})"
+            elif self.formats[name] and rate["fill"] and (
+                (rate["fill"] - rate["valid"]) / rate["fill"] > self.max_invalid_share
+            ):
+                problems[name] = f"{name}: {1 - rate['valid'] / rate['fill']:.0%} of values fail the {self.formats[name]} check"
+            elif name in self.required and rate["valid"] < self.min_required_rate:
+                problems[name] = f"{name}: required, valid on {rate['valid']:.0%} of pages"
+        return problems
+
+    def record(self, products: List[Dict[str, Any]]) -> bool:
+        """
+        Add one extracted page; True if this page turned the schema degraded.
+
+        The baseline is set from the first `min_pages` pages and then follows
+        the window slowly, except for fields already sliding towards the
+        threshold (so a gradual breakage doesn't drag its own baseline down).
+        """
+        self.recent.append(page_observation(products, self.fields, self.formats))
+        self.pages += 1
+        if len(self.recent) < self.min_pages:
+            return False
+
+        rates = self.rates()
+        problems = self._problems(rates)
+        if self.status == STATUS_DEGRADED:
+            self.reasons = list(problems.values()) or self.reasons
+            return False
+        if problems:
+            self.status = STATUS_DEGRADED
+            self.reasons = list(problems.values())
+            return True
+
+        for name, rate in rates.items():
+            base = self.baseline.get(name)
+            if base is None:
+                self.baseline[name] = rate["valid"]
+            elif rate["valid"] >= base * (1 - self.max_drop / 2):
+                self.baseline[name] += self.baseline_alpha * (rate["valid"] - base)
+        return False
+
+    def reset(self, fields: List[str], required: List[str]):
+        """Start over for a regenerated schema (new fields, no baseline)"""
+        self.fields = fields
+        self.required = required
+        self.__post_init__()
+        self.status = STATUS_HEALTHY
+        self.reasons = []
+        self.baseline = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "reasons": self.reasons,
+            "pages": self.pages,
+            "baseline": {name: round(rate, 3) for name, rate in self.baseline.items()},
+        }
+
+
+class SchemaHealthMonitor:
+    """SchemaHealth per schema key"""
+
+    def __init__(self, window: int = 20, min_pages: int = 10, max_drop: float = 0.5):
+        """
+        Args:
+            window: Recent pages the rates are computed over
+            min_pages: Pages needed before a schema is judged (and a baseline set)
+            max_drop: Relative drop of a field's valid rate below its baseline
+                that marks the schema degraded
+        """
+        self.window = window
+        self.min_pages = min_pages
+        self.max_drop = max_drop
+        self.schemas: Dict[str, SchemaHealth] = {}
+
+    def get(self, key: str, fields: List[str], required: List[str], saved: Optional[Dict[str, Any]] = None) -> SchemaHealth:
+        """Health of a schema key, restoring a saved baseline/status the first time"""
+        health = self.schemas.get(key)
+        if health is None:
+            saved = saved or {}
+            health = SchemaHealth(
+                key, fields, required, window=self.window, min_pages=self.min_pages, max_drop=self.max_drop,
+                status=saved.get("status", STATUS_HEALTHY), reasons=list(saved.get("reasons", [])),
+                baseline={k: v for k, v in saved.get("baseline", {}).items() if k in fields},
+                pages=saved.get("pages", 0),
+            )
+            self.schemas[key] = health
+        return health
+
+    def is_degraded(self, key: str) -> bool:
+        health = self.schemas.get(key)
+        return health is not None and health.status == STATUS_DEGRADED
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        return {key: health.to_dict() for key, health in self.schemas.items()}
+
+
+def top_level_fields(schema: Dict[str, Any]) -> List[str]:
+    return [f["name"] for f in schema.get("fields", []) if "name" in f]
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Schema Keys
+
+Decides which cached schema applies to a page. Schemas are keyed by domain
+plus page template instead of by domain alone, so product pages, category
+listings and search pages of one merchant each get their own schema:
+1. The merchant's learned URL templates (url_templates.TemplateCache, written
+   by discovery) are compiled into one matcher per domain
+2. URLs outside the learned templates fall back to their path shape, with
+   non-marker words generalized so category pages share one key; a shape
+   with no marker, identifier or size token (e.g. '/{slug}', which fits both
+   '/cafe-pilao' and '/bebidas') gets one key per page type, the type coming
+   from the page's product markup
+3. A DOM-structure fingerprint (dom_similarity.dom_fingerprint) maps a
+   template whose pages are built like an already known template onto that
+   template's schema
+
+Each key carries a page type: product pages get a single-item schema,
+listings a multi-item schema (one item per product card).
+"""
+
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from url_templates import (
+    ID_TOKENS, LISTING_MARKERS, PRODUCT_MARKERS, SLUG_TOKEN,
+    TemplateCache, TemplateMatcher, looks_like_product_page, segment_shape, tokenize_path,
+)
+
+
+PAGE_PRODUCT = "product"
+PAGE_LISTING = "listing"
+
+# Generalized words: a single word, or a slug with a package size (a product
+# name like 'cafe-pilao-500g'), which counts as product evidence
+WORD_TOKEN = "{word}"
+SIZED_SLUG_TOKEN = "{slug:size}"
+_SIZE_RE = re.compile(r"(?:^|-)\d+(?:[.,]\d+)?(?:g|gr|kg|mg|ml|l|lt|un|und|cx|pct)(?:-|$)")
+
+# Page-type-ambiguous keys resolved with HTML, remembered per URL
+URL_KEY_CACHE_SIZE = 50_000
+
+
+@dataclass(frozen=True)
+class SchemaKey:
+    """Which schema a page uses"""
+    domain: str
+    template: str
+    page_type: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.domain}{self.template}"
+
+
+def path_template(url: str) -> str:
+    """Path shape of a URL with identifiers and non-marker words generalized"""
+    tokens = []
+    for segment in tokenize_path(url):
+        shape = segment_shape(segment)
+        if shape == segment and segment not in PRODUCT_MARKERS | LISTING_MARKERS:
+            if _SIZE_RE.search(segment):
+                shape = SIZED_SLUG_TOKEN
+            else:
+                shape = SLUG_TOKEN if "-" in segment else WORD_TOKEN
+        tokens.append(shape)
+    return "/" + "/".join(tokens)
+
+
+def is_ambiguous_template(template: str) -> bool:
+    """No listing/product marker, identifier or size token: the shape alone can't tell the page type"""
+    tokens = {t for t in template.split("/") if t}
+    return not tokens & (LISTING_MARKERS | PRODUCT_MARKERS | ID_TOKENS | {SIZED_SLUG_TOKEN})
+
+
+def page_type_of_template(template: str) -> str:
+    """Product if the template has an identifier or product marker and no listing marker"""
+    tokens = {t for t in template.split("/") if t}
+    if tokens & LISTING_MARKERS:
+        return PAGE_LISTING
+    return PAGE_PRODUCT if tokens & (ID_TOKENS | PRODUCT_MARKERS | {SIZED_SLUG_TOKEN}) else PAGE_LISTING
+
+
+class SchemaKeyResolver:
+    """Resolves URLs to schema keys on the hot path"""
+
+    def __init__(self, template_cache: Optional[TemplateCache] = None):
+        """
+        Args:
+            template_cache: Learned URL templates per merchant (from discovery)
+        """
+        self.template_cache = template_cache or TemplateCache()
+        self._matchers: Dict[str, Optional[TemplateMatcher]] = {}
+        self._page_types: Dict[str, str] = {}
+        self._fingerprints: Dict[Tuple[str, str], str] = {}
+        self._url_keys: "OrderedDict[str, SchemaKey]" = OrderedDict()
+
+    def _matcher(self, domain: str) -> Optional[TemplateMatcher]:
+        if domain not in self._matchers:
+            templates = self.template_cache.load(domain)
+            self._matchers[domain] = TemplateMatcher(templates) if templates else None
+        return self._matchers[domain]
+
+    def resolve(self, url: str, html: Optional[str] = None) -> SchemaKey:
+        """
+        Schema key of a URL.
+
+        The page type of a key is settled by its first resolution: the
+        learned template's verdict, else the page's product markup when
+        `html` is given, else the template's markers. Ambiguous path shapes
+        (see is_ambiguous_template) instead get one key per page type, from
+        the page's markup; a URL resolved with `html` keeps that key when
+        resolved again without it, otherwise it is taken for a listing.
+        """
+        domain = urlsplit(url).netloc
+        matcher = self._matcher(domain)
+        learned = matcher.match(url) if matcher else None
+        template = learned.pattern if learned else path_template(url)
+
+        if not learned and is_ambiguous_template(template):
+            known = self._url_keys.get(url)
+            if known is not None and html is None:
+                return known
+            page_type = PAGE_PRODUCT if html and looks_like_product_page(html) else PAGE_LISTING
+            resolved = SchemaKey(domain, f"{template}#{page_type}", page_type)
+            if html is not None:
+                self._url_keys[url] = resolved
+                if len(self._url_keys) > URL_KEY_CACHE_SIZE:
+                    self._url_keys.popitem(last=False)
+            return resolved
+
+        key = f"{domain}{template}"
+        page_type = self._page_types.get(key)
+        if page_type is None:
+            if learned:
+                page_type = PAGE_PRODUCT if learned.is_product else page_type_of_template(template)
+            elif html:
+                page_type = PAGE_PRODUCT if looks_like_product_page(html) else page_type_of_template(template)
+            else:
+                return SchemaKey(domain, template, page_type_of_template(template))
+            self._page_types[key] = page_type
+        return SchemaKey(domain, template, page_type)
+
+    def register(self, key: SchemaKey, fingerprint: Optional[str]):
+        """Remember a key with a schema (and the DOM fingerprint it was generated from)"""
+        self._page_types[key.key] = key.page_type
+        if fingerprint:
+            self._fingerprints.setdefault((key.domain, fingerprint), key.key)
+
+    def by_fingerprint(self, domain: str, fingerprint: str) -> Optional[str]:
+        """Key of a same-domain template whose pages share this DOM fingerprint"""
+        return self._fingerprints.get((domain, fingerprint))
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Schema Cache
+
+In-memory layer over the pattern files in schema_cache/:
+- A bounded LRU of parsed schemas, each compiled once for HTTP extraction
+- Entries are invalidated when their file's mtime changes (edited or
+  regenerated by another process)
+- Single-flight generation: concurrent callers missing the same key await
+  one generation instead of each calling the LLM
+
+Also provides the atomic JSON write used for the pattern files and
+url_patterns.json.
+"""
+
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from http_extraction import CompiledCssSchema, required_fields
+
+
+def atomic_write_json(path: Path, data: Any):
+    """Write JSON to a temporary file and rename it over `path`"""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+@dataclass
+class CachedSchema:
+    """A parsed schema, its compiled form and the file version it came from"""
+    key: str
+    path: Path
+    schema: Dict[str, Any]
+    mtime_ns: int
+    compiled: CompiledCssSchema = field(init=False, repr=False)
+    required: List[str] = field(init=False)
+
+    def __post_init__(self):
+        self.compiled = CompiledCssSchema(self.schema)
+        self.required = required_fields(self.schema)
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class SchemaCache:
+    """Bounded LRU of schemas with file-mtime invalidation and single-flight generation"""
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Args:
+            max_entries: Schemas kept in memory; least recently used are dropped
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedSchema]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"hits": 0, "loads": 0, "generations": 0, "joined": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, entry: CachedSchema) -> CachedSchema:
+        self._entries[entry.key] = entry
+        self._entries.move_to_end(entry.key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def get(self, key: str, path: Path, load: bool = True) -> Optional[CachedSchema]:
+        """Cached schema for `key`, reloading it if the file changed; None on a miss"""
+        mtime = _mtime_ns(path)
+        entry = self._entries.get(key)
+        if entry is not None and entry.mtime_ns == mtime and entry.path == Path(path):
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+        if entry is not None:
+            del self._entries[key]
+        if not load or mtime is None:
+            return None
+
+        with open(path, 'r', encoding='utf-8') as f:
+            schema = json.load(f)
+        self.stats["loads"] += 1
+        return self._remember(CachedSchema(key, Path(path), schema, mtime))
+
+    def put(self, key: str, path: Path, schema: Dict[str, Any]) -> CachedSchema:
+        """Write a schema file atomically and cache it"""
+        atomic_write_json(path, schema)
+        return self._remember(CachedSchema(key, Path(path), schema, _mtime_ns(path)))
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+
+    async def get_or_create(
+        self,
+        key: str,
+        path: Path,
+        generate: Callable[[], Awaitable[Dict[str, Any]]],
+        load: bool = True,
+    ) -> CachedSchema:
+        """
+        Cached or stored schema for `key`, otherwise generate it once.
+
+        While a generation for `key` runs, other callers await the same
+        result. A failed generation is raised to all of them and not
+        cached, so the next call tries again.
+
+        Args:
+            key: Cache key (domain or domain + template)
+            path: Pattern file backing the key
+            generate: Coroutine factory producing a new schema
+            load: Whether an existing pattern file may be used
+        """
+        entry = self.get(key, path, load=load)
+        if entry is not None:
+            return entry
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["joined"] += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            schema = await generate()
+            entry = self.put(key, path, schema)
+            self.stats["generations"] += 1
+            future.set_result(entry)
+            return entry
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody may be waiting; don't let the loop report it as never retrieved
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Incremental Sitemap Walker
+
+Walks a merchant's sitemaps (robots.txt → sitemap indexes → sitemap parts)
+and only downloads the parts that changed since the previous walk:
+1. A part whose <lastmod> in the parent index is unchanged is not requested
+2. Other parts are fetched conditionally (If-None-Match / If-Modified-Since);
+   a 304 means the stored URLs for that part are still valid
+3. Parts that are gone from the indexes drop out of the result
+
+Gzipped sitemaps (.xml.gz served without Content-Encoding) are inflated.
+"""
+
+import asyncio
+import gzip
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import aiohttp
+
+from discovery_store import SitemapPart
+
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+@dataclass
+class SitemapWalk:
+    """Outcome of an incremental walk"""
+    parts: Dict[str, SitemapPart] = field(default_factory=dict)   # every live part, indexes included
+    changed: Dict[str, List[str]] = field(default_factory=dict)   # leaf part -> page URLs (re-fetched)
+    unchanged: List[str] = field(default_factory=list)            # leaf parts reusable from the store
+    requests: int = 0
+    not_modified: int = 0
+    skipped_by_lastmod: int = 0
+
+    @property
+    def found_any(self) -> bool:
+        return bool(self.changed or self.unchanged)
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_sitemap(body: bytes) -> Tuple[str, List[Tuple[str, Optional[str]]]]:
+    """Parse a sitemap body into (kind, [(loc, lastmod)]), kind 'index' or 'urlset'"""
+    if body[:2] == GZIP_MAGIC:
+        body = gzip.decompress(body)
+    root = ET.fromstring(body)
+    kind = "index" if _local_name(root.tag) == "sitemapindex" else "urlset"
+
+    entries = []
+    for entry in root:
+        loc = lastmod = None
+        for child in entry:
+            name = _local_name(child.tag)
+            if name == "loc":
+                loc = (child.text or "").strip()
+            elif name == "lastmod":
+                lastmod = (child.text or "").strip() or None
+        if loc:
+            entries.append((loc, lastmod))
+    return kind, entries
+
+
+class IncrementalSitemapWalker:
+    """Walks sitemaps, re-downloading only parts that changed"""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        previous_parts: Optional[Dict[str, SitemapPart]] = None,
+        concurrency: int = 8,
+        timeout: int = 60,
+    ):
+        """
+        Args:
+            session: HTTP session used for robots.txt and sitemap requests
+            previous_parts: Parts recorded by the previous walk (url -> SitemapPart)
+            concurrency: Sitemap parts fetched at once
+            timeout: Per-request timeout in seconds
+        """
+        self.session = session
+        self.previous_parts = previous_parts or {}
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async def _sitemaps_from_robots(self, base_url: str) -> List[str]:
+        try:
+            async with self.session.get(urljoin(base_url, "/robots.txt"), timeout=self.timeout) as resp:
+                if resp.status != 200:
+                    return []
+                text = await resp.text(errors="ignore")
+        except Exception as e:
+            print(f"⚠️ Could not read robots.txt: {e}")
+            return []
+
+        sitemaps = []
+        for line in text.splitlines():
+            key, _, value = line.partition(":")
+            if key.strip().lower() == "sitemap" and value.strip():
+                sitemaps.append(urljoin(base_url, value.strip()))
+        return sitemaps
+
+    async def _visit(self, url: str, lastmod: Optional[str], walk: SitemapWalk) -> List[Tuple[str, Optional[str]]]:
+        """Revalidate or fetch one part; returns child sitemaps still to visit"""
+        previous = self.previous_parts.get(url)
+
+        if previous and not previous.children and lastmod and previous.lastmod == lastmod:
+            walk.parts[url] = previous
+            walk.unchanged.append(url)
+            walk.skipped_by_lastmod += 1
+            return []
+
+        headers = {}
+        if previous and previous.etag:
+            headers["If-None-Match"] = previous.etag
+        if previous and previous.last_modified:
+            headers["If-Modified-Since"] = previous.last_modified
+
+        try:
+            async with self.semaphore:
+                walk.requests += 1
+                async with self.session.get(url, headers=headers, timeout=self.timeout) as resp:
+                    status = resp.status
+                    etag = resp.headers.get("ETag")
+                    last_modified = resp.headers.get("Last-Modified")
+                    body = await resp.read() if status == 200 else b""
+        except Exception as e:
+            print(f"⚠️ Failed to fetch sitemap {url}: {e}")
+            status = None
+
+        if status == 304 or (status != 200 and previous):
+            # Not modified, or unreachable right now: keep what we stored last time
+            if status == 304:
+                walk.not_modified += 1
+            part = replace(previous, lastmod=lastmod or previous.lastmod)
+            walk.parts[url] = part
+            if part.children:
+                return [(child, self._child_lastmod(child)) for child in part.children]
+            walk.unchanged.append(url)
+            return []
+
+        if status != 200:
+            if status is not None:
+                print(f"⚠️ Sitemap {url} returned {status}")
+            return []
+
+        try:
+            kind, entries = parse_sitemap(body)
+        except (ET.ParseError, OSError) as e:
+            print(f"⚠️ Malformed sitemap {url}: {e}")
+            return []
+
+        part = SitemapPart(url=url, etag=etag, last_modified=last_modified, lastmod=lastmod)
+        walk.parts[url] = part
+        if kind == "index":
+            part.children = [loc for loc, _ in entries]
+            return entries
+
+        walk.changed[url] = [loc for loc, _ in entries]
+        return []
+
+    def _child_lastmod(self, url: str) -> Optional[str]:
+        previous = self.previous_parts.get(url)
+        return previous.lastmod if previous else None
+
+    async def walk(self, base_url: str) -> SitemapWalk:
+        """Walk every sitemap reachable from robots.txt (or /sitemap.xml)"""
+        walk = SitemapWalk()
+        roots = await self._sitemaps_from_robots(base_url) or [urljoin(base_url, "/sitemap.xml")]
+        pending = [(url, None) for url in roots]
+        seen = set()
+
+        while pending:
+            level = []
+            for url, lastmod in pending:
+                if url not in seen:
+                    seen.add(url)
+                    level.append((url, lastmod))
+            results = await asyncio.gather(*(self._visit(url, lastmod, walk) for url, lastmod in level))
+            pending = [child for children in results for child in children]
+
+        return walk
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Structured Data Fast Path
+
+Many merchants embed complete product and offer data in the page source:
+- schema.org JSON-LD (<script type="application/ld+json">)
+- Next.js state (<script id="__NEXT_DATA__">)
+- VTEX store state (__STATE__ / __RUNTIME__ templates or window assignments)
+- schema.org microdata (itemprop attributes)
+
+This module finds those blobs by scanning the raw HTML for a few literal
+markers (no DOM is built, most of the page is never looked at by a regex)
+and maps them to ProductData fields. When it succeeds, the pipeline
+needs neither a browser render nor a CSS schema (and so no LLM call).
+"""
+
+import html as html_lib
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+SOURCE_JSON_LD = "json-ld"
+SOURCE_NEXT_DATA = "next-data"
+SOURCE_VTEX_STATE = "vtex-state"
+SOURCE_MICRODATA = "microdata"
+
+# Pages scanned per merchant before a zero hit rate stops the scans
+STRUCTURED_PROBE_PAGES = 20
+
+# Literal markers located first (case-insensitively); only their surroundings are matched by _BLOB_OPEN
+_BLOB_MARKERS = re.compile(r"<script|<template|window\.__", re.IGNORECASE)
+_BLOB_OPEN = re.compile(
+    r"<script\b(?=[^>]*\btype=[\"']application/ld\+json[\"'])[^>]*>"
+    r"|<script\b(?=[^>]*\bid=[\"']__NEXT_DATA__[\"'])[^>]*>"
+    r"|<template\b(?=[^>]*\bdata-varname=[\"'](?:__STATE__|__RUNTIME__)[\"'])[^>]*>\s*<script[^>]*>"
+    r"|\bwindow\.(?:__STATE__|__RUNTIME__|__NEXT_DATA__)\s*=\s*",
+    re.IGNORECASE,
+)
+_SCRIPT_CLOSE = re.compile(r"</script\s*>", re.IGNORECASE)
+_MICRODATA_PRODUCT = re.compile(r"itemtype=[\"']https?://schema\.org/Product[\"']", re.IGNORECASE)
+_MICRODATA_PROP = re.compile(
+    r"<(?P<tag>[a-z0-9]+)\b[^>]*\bitemprop=[\"'](?P<prop>name|description|sku|gtin13|gtin|brand|price|"
+    r"lowPrice|priceCurrency|category|weight)[\"'][^>]*>",
+    re.IGNORECASE,
+)
+_CONTENT_ATTR = re.compile(r"\bcontent=[\"']([^\"']*)[\"']", re.IGNORECASE)
+
+# Keys tried, in order, when reading product-like objects from embedded state
+NAME_KEYS = ("productName", "name", "title")
+ID_KEYS = ("sku", "productId", "productID", "gtin13", "gtin", "ean", "mpn", "itemId", "id")
+BRAND_KEYS = ("brand", "brandName")
+DESCRIPTION_KEYS = ("description", "metaTagDescription")
+CATEGORY_KEYS = ("category", "categories", "categoryName")
+SIZE_KEYS = ("packageSize", "measurementUnit", "unitMultiplier", "weight", "size")
+PRICE_KEYS = ("price", "Price", "sellingPrice", "bestPrice", "lowPrice", "spotPrice", "priceValue")
+# Keys under which product objects nest their offers (VTEX: items -> sellers -> commertialOffer)
+PRICE_CONTAINERS = ("offers", "offer", "items", "sellers", "commertialOffer", "priceRange", "prices", "pricing")
+
+_MAX_DEPTH = 12
+
+
+@dataclass
+class StructuredProduct:
+    """ProductData fields found in the page source, and where they came from"""
+    source: str
+    fields: Dict[str, Any]
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.fields.get("name")) and bool(self.fields.get("price"))
+
+
+_AMOUNT = re.compile(r"\d[\d.,]*")
+
+
+def parse_amount(text: str) -> Optional[float]:
+    """
+    Number in a price string, pt-BR or not: '1.299,90', '1,299.90', '1299.9',
+    '5.990000' (a lone separator followed by exactly three digits, as in
+    '1.299', is a thousands separator)
+    """
+    match = _AMOUNT.search(text)
+    if not match:
+        return None
+    digits = match.group().rstrip(".,")
+    last = max(digits.rfind(","), digits.rfind("."))
+    if last < 0:
+        return float(digits)
+    separators = re.findall(r"[.,]", digits)
+    decimals = len(digits) - last - 1
+    is_decimal = len(set(separators)) == 2 or (len(separators) == 1 and decimals != 3)
+    if not is_decimal:
+        return float(re.sub(r"[.,]", "", digits))
+    return float(re.sub(r"[.,]", "", digits[:last]) + "." + digits[last + 1:])
+
+
+def _plain_amount(text: str) -> Optional[float]:
+    """Number in a machine-readable price ('12.990' is 12.99), or in display text if it isn't one"""
+    try:
+        amount = float(text.strip())
+    except ValueError:
+        return parse_amount(text)
+    return amount if math.isfinite(amount) else None
+
+
+def format_price(value: Any, currency: Optional[str] = "BRL", plain: bool = False) -> Optional[str]:
+    """
+    Render a price the way product pages show it (e.g. 'R$ 5,99'), from a number or any price string.
+
+    Args:
+        value: Number or price string
+        currency: ISO currency code
+        plain: `value` is a dot-decimal string without grouping (schema.org
+            offers, application state), not display text
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        amount = float(value)
+    else:
+        amount = _plain_amount(str(value)) if plain else parse_amount(str(value))
+    if amount is None:
+        return str(value).strip() or None
+    if amount <= 0:
+        return None
+    if (currency or "BRL").upper() == "BRL":
+        return "R$ " + f"{amount:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+    return f"{currency} {amount:.2f}"
+
+
+def _first(obj: Dict[str, Any], keys: Tuple[str, ...]) -> Any:
+    for key in keys:
+        value = obj.get(key)
+        if value not in (None, "", [], {}):
+            return value
+    return None
+
+
+def _as_text(value: Any) -> Optional[str]:
+    """Text of a scalar, a {'name': ...} object or the last entry of a list (most specific category)"""
+    if isinstance(value, dict):
+        value = _first(value, ("name", "@id", "value"))
+    elif isinstance(value, list):
+        texts = [t for t in (_as_text(v) for v in value) if t]
+        return texts[-1] if texts else None
+    if value is None:
+        return None
+    text = html_lib.unescape(str(value)).strip().strip("/")
+    return text or None
+
+
+def _category(value: Any) -> Optional[str]:
+    """Most specific category of a value or a '/Dept/Aisle/' path"""
+    text = _as_text(value)
+    return (text.split("/")[-1].strip() or None) if text else None
+
+
+def _blob_openings(html: str) -> Iterator[re.Match]:
+    for marker in _BLOB_MARKERS.finditer(html):
+        match = _BLOB_OPEN.match(html, marker.start())
+        if match:
+            yield match
+
+
+def iter_blobs(html: str) -> Iterator[Tuple[str, Any]]:
+    """Yield (source, parsed JSON) for every embedded data blob in the page"""
+    decoder = json.JSONDecoder()
+    for match in _blob_openings(html):
+        opening = match.group(0).lower()
+        if "ld+json" in opening:
+            source = SOURCE_JSON_LD
+        elif "__next_data__" in opening:
+            source = SOURCE_NEXT_DATA
+        else:
+            source = SOURCE_VTEX_STATE
+
+        start = match.end()
+        if opening.startswith("window."):
+            try:
+                data, _ = decoder.raw_decode(html, start)
+            except ValueError:
+                continue
+            yield source, data
+            continue
+
+        end = _SCRIPT_CLOSE.search(html, start)
+        if end is None:
+            continue
+        try:
+            yield source, json.loads(html[start:end.start()])
+        except ValueError:
+            # Some sites leave trailing commas or HTML comments in JSON-LD
+            continue
+
+
+def _ld_types(node: Dict[str, Any]) -> List[str]:
+    types = node.get("@type", [])
+    return types if isinstance(types, list) else [types]
+
+
+def _iter_ld_products(data: Any, depth: int = 0) -> Iterator[Dict[str, Any]]:
+    if depth > _MAX_DEPTH:
+        return
+    if isinstance(data, list):
+        for item in data:
+            yield from _iter_ld_products(item, depth + 1)
+    elif isinstance(data, dict):
+        if "Product" in _ld_types(data):
+            yield data
+        for key in ("@graph", "mainEntity", "itemListElement", "item"):
+            if key in data:
+                yield from _iter_ld_products(data[key], depth + 1)
+
+
+def _ld_offer_price(offers: Any) -> Tuple[Any, Optional[str]]:
+    if isinstance(offers, list):
+        for offer in offers:
+            price, currency = _ld_offer_price(offer)
+            if price is not None:
+                return price, currency
+        return None, None
+    if not isinstance(offers, dict):
+        return None, None
+    price = _first(offers, ("price", "lowPrice"))
+    if price is None and isinstance(offers.get("priceSpecification"), (dict, list)):
+        return _ld_offer_price(offers["priceSpecification"])
+    if price is None and "offers" in offers:
+        return _ld_offer_price(offers["offers"])
+    return price, offers.get("priceCurrency")
+
+
+def map_json_ld(node: Dict[str, Any]) -> Dict[str, Any]:
+    """schema.org Product (with Offer/AggregateOffer) -> ProductData fields"""
+    price, currency = _ld_offer_price(node.get("offers"))
+    return {
+        "product_id": _as_text(_first(node, ("sku", "gtin13", "gtin", "productID", "mpn"))),
+        "name": _as_text(node.get("name")),
+        "description": _as_text(node.get("description")),
+        "brand": _as_text(node.get("brand")),
+        "package_size": _as_text(_first(node, ("weight", "size"))),
+        "category": _category(node.get("category")),
+        "price": format_price(price, currency, plain=True),
+    }
+
+
+class _StateWalker:
+    """Finds product-like objects in embedded application state"""
+
+    def __init__(self, root: Any):
+        self.root = root
+
+    def resolve(self, value: Any) -> Any:
+        # VTEX/Apollo normalized caches reference objects as {"type": "id", "id": key}
+        # and wrap plain JSON values as {"type": "json", "json": value}
+        if isinstance(value, dict) and value.get("type") == "id" and isinstance(self.root, dict):
+            key = value.get("id")
+            return self.root.get(key, self.root.get(f"${key}", value))
+        if isinstance(value, dict) and value.get("type") == "json" and "json" in value:
+            return value["json"]
+        return value
+
+    def find_price(self, value: Any, depth: int = 0) -> Any:
+        """First price below an object, following only offer/price containers"""
+        value = self.resolve(value)
+        if depth > 6:
+            return None
+        if isinstance(value, list):
+            for item in value:
+                price = self.find_price(item, depth + 1)
+                if price is not None:
+                    return price
+            return None
+        if not isinstance(value, dict):
+            return None
+        for key in PRICE_KEYS:
+            price = value.get(key)
+            if isinstance(price, (int, float, str)) and not isinstance(price, bool) and price != "":
+                return price
+        for key in PRICE_KEYS + PRICE_CONTAINERS:
+            if isinstance(value.get(key), (dict, list)):
+                price = self.find_price(value[key], depth + 1)
+                if price is not None:
+                    return price
+        return None
+
+    def products(self) -> List[Dict[str, Any]]:
+        """Mapped products; VTEX SKU objects are dropped when their product is present"""
+        found = list(self._candidates())
+        if any(has_product_name for has_product_name, _ in found):
+            found = [(flag, fields) for flag, fields in found if flag]
+        return [fields for _, fields in found]
+
+    def _candidates(self) -> Iterator[Tuple[bool, Dict[str, Any]]]:
+        stack = [(self.root, 0)]
+        seen = set()
+        while stack:
+            node, depth = stack.pop()
+            if id(node) in seen or depth > _MAX_DEPTH:
+                continue
+            seen.add(id(node))
+            if isinstance(node, dict):
+                name = _first(node, NAME_KEYS)
+                if isinstance(name, str) and ("productName" in node or _first(node, ID_KEYS) is not None):
+                    price = self.find_price(node)
+                    if price is not None:
+                        yield "productName" in node, self.map(node, price)
+                        continue
+                stack.extend((self.resolve(v), depth + 1) for v in node.values() if isinstance(v, (dict, list)))
+            elif isinstance(node, list):
+                stack.extend((v, depth + 1) for v in node if isinstance(v, (dict, list)))
+
+    def map(self, node: Dict[str, Any], price: Any) -> Dict[str, Any]:
+        return {
+            "product_id": _as_text(_first(node, ID_KEYS)),
+            "name": _as_text(_first(node, NAME_KEYS)),
+            "description": _as_text(_first(node, DESCRIPTION_KEYS)),
+            "brand": _as_text(self.resolve(_first(node, BRAND_KEYS))),
+            "package_size": _as_text(_first(node, SIZE_KEYS)),
+            "category": _category(self.resolve(_first(node, CATEGORY_KEYS))),
+            "price": format_price(price, _as_text(node.get("currency") or node.get("priceCurrency")), plain=True),
+            "slug": _as_text(_first(node, ("linkText", "slug", "link"))),
+        }
+
+
+def _microdata_product(html: str) -> Optional[Dict[str, Any]]:
+    if "schema.org/Product" not in html or not _MICRODATA_PRODUCT.search(html):
+        return None
+    props: Dict[str, str] = {}
+    for match in _MICRODATA_PROP.finditer(html):
+        prop = match.group("prop")
+        if prop in props:
+            continue
+        content = _CONTENT_ATTR.search(match.group(0))
+        if content:
+            value = content.group(1)
+        else:
+            end = html.find("<", match.end())
+            value = html[match.end():end if end != -1 else None]
+        value = html_lib.unescape(value).strip()
+        if value:
+            props[prop] = value
+    if not props:
+        return None
+    return {
+        "product_id": props.get("sku") or props.get("gtin13") or props.get("gtin"),
+        "name": props.get("name"),
+        "description": props.get("description"),
+        "brand": props.get("brand"),
+        "package_size": props.get("weight"),
+        "category": props.get("category"),
+        "price": format_price(props.get("price") or props.get("lowPrice"), props.get("priceCurrency")),
+    }
+
+
+def _matches_url(fields: Dict[str, Any], url: str) -> bool:
+    path = url.lower()
+    return any(
+        value and len(str(value)) >= 3 and str(value).lower() in path
+        for value in (fields.get("slug"), fields.get("product_id"))
+    )
+
+
+def extract_structured_products(html: str, url: Optional[str] = None) -> List[StructuredProduct]:
+    """
+    Complete products (name and price) embedded in the page, best source first.
+
+    JSON-LD is preferred, then embedded state, then microdata. Embedded state
+    usually also lists related products; when `url` is given and some
+    products match it by slug or id, only those are kept.
+    """
+    if not html:
+        return []
+
+    by_source: Dict[str, List[StructuredProduct]] = defaultdict(list)
+    for source, data in iter_blobs(html):
+        if source == SOURCE_JSON_LD:
+            mapped = [map_json_ld(node) for node in _iter_ld_products(data)]
+        else:
+            mapped = _StateWalker(data).products()
+        by_source[source].extend(StructuredProduct(source, fields) for fields in mapped)
+
+    microdata = _microdata_product(html)
+    if microdata:
+        by_source[SOURCE_MICRODATA].append(StructuredProduct(SOURCE_MICRODATA, microdata))
+
+    for source in (SOURCE_JSON_LD, SOURCE_NEXT_DATA, SOURCE_VTEX_STATE, SOURCE_MICRODATA):
+        products = [p for p in by_source.get(source, []) if p.complete]
+        if url and len(products) > 1:
+            products = [p for p in products if _matches_url(p.fields, url)] or products
+        if products:
+            for product in products:
+                product.fields.pop("slug", None)
+            return products
+    return []
+
+
+@dataclass
+class StructuredDataStats:
+    """Structured-data hit rate per merchant"""
+    pages: Counter = field(default_factory=Counter)
+    hits: Counter = field(default_factory=Counter)
+    sources: Dict[str, Counter] = field(default_factory=lambda: defaultdict(Counter))
+
+    def worth_fetching(self, merchant: str, probe_pages: int = STRUCTURED_PROBE_PAGES) -> bool:
+        """False once a merchant's first `probe_pages` pages had no structured data at all"""
+        return self.pages[merchant] < probe_pages or self.hits[merchant] > 0
+
+    def record(self, merchant: str, products: List[StructuredProduct]):
+        self.pages[merchant] += 1
+        if products:
+            self.hits[merchant] += 1
+            self.sources[merchant][products[0].source] += 1
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            merchant: {
+                "pages": pages,
+                "hits": self.hits[merchant],
+                "hit_rate": round(self.hits[merchant] / pages, 3),
+                "sources": dict(self.sources[merchant]),
+            }
+            for merchant, pages in self.pages.items()
+        }
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Columnar URL Batches
+
+Discovery stages used to pass Python lists of URL strings (or lists of
+seeder dicts) and loop over them one URL at a time. A UrlBatch keeps URLs in
+a single Arrow string array and runs every step as a vectorized kernel:
+- Host/path/query splitting with one regex extraction
+- Regex matching (RE2) over a chosen URL component
+- Canonicalization (lowercase scheme/host, drop fragment, default ports,
+  trailing slashes, optionally the query string)
+- Order-preserving dedup
+
+Batches are immutable; every operation returns a new batch.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+URL_REGEX = (
+    r"^(?P<scheme>[a-zA-Z][a-zA-Z0-9+.-]*)://"
+    r"(?P<host>[^/?#]*)"
+    r"(?P<path>[^?#]*)"
+    r"(?:\?(?P<query>[^#]*))?"
+    r"(?:#(?P<fragment>.*))?$"
+)
+
+URL_FIELDS = ("scheme", "host", "path", "query", "fragment")
+
+
+class UrlBatch:
+    """Immutable batch of URLs backed by an Arrow string array"""
+
+    def __init__(self, urls: pa.Array):
+        if isinstance(urls, pa.ChunkedArray):
+            urls = urls.combine_chunks()
+        if urls.type != pa.string():
+            urls = urls.cast(pa.string())
+        self.urls = urls
+        self._parts: Optional[pa.StructArray] = None
+
+    # ---------- Construction / conversion ----------
+
+    @classmethod
+    def from_urls(cls, urls: Iterable[str]) -> "UrlBatch":
+        if not isinstance(urls, (list, tuple)):
+            urls = list(urls)
+        return cls(pa.array(urls, type=pa.string()))
+
+    @classmethod
+    def from_seeder(cls, records: Iterable[Dict[str, Any]]) -> "UrlBatch":
+        """Build from AsyncUrlSeeder results, dropping entries marked not_valid"""
+        return cls.from_urls(
+            r.get('url', '') for r in records
+            if r.get('url') and r.get('status') != 'not_valid'
+        )
+
+    @classmethod
+    def concat(cls, batches: Sequence["UrlBatch"]) -> "UrlBatch":
+        if not batches:
+            return cls.from_urls([])
+        return cls(pa.concat_arrays([b.urls for b in batches]))
+
+    def to_pylist(self) -> List[str]:
+        return self.urls.to_pylist()
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.to_pylist())
+
+    def _all_false(self) -> pa.BooleanArray:
+        return pa.array(np.zeros(len(self), dtype=bool))
+
+    def sample(self, n: int, seed: int = 0) -> "UrlBatch":
+        """Uniform random sample of up to n URLs, in original order"""
+        if n >= len(self):
+            return self
+        rng = np.random.default_rng(seed)
+        return self.take(np.sort(rng.choice(len(self), size=n, replace=False)))
+
+    # ---------- Components ----------
+
+    @property
+    def parts(self) -> pa.StructArray:
+        """Struct array of scheme/host/path/query/fragment, split once and cached"""
+        if self._parts is None:
+            self._parts = pc.extract_regex(self.urls, URL_REGEX)
+        return self._parts
+
+    def component(self, name: str) -> pa.Array:
+        """One URL component as a string array ('' when absent)"""
+        if name == "url":
+            return self.urls
+        if name not in URL_FIELDS:
+            raise ValueError(f"Unknown URL component: {name}")
+        return pc.fill_null(self.parts.field(name), "")
+
+    @property
+    def valid(self) -> pa.BooleanArray:
+        """True for entries that parse as absolute URLs"""
+        return self.parts.is_valid()
+
+    # ---------- Matching / filtering ----------
+
+    def match(self, pattern: str, component: str = "path", ignore_case: bool = False) -> pa.BooleanArray:
+        """Unanchored regex search over a component (RE2 syntax)"""
+        return pc.fill_null(
+            pc.match_substring_regex(self.component(component), pattern, ignore_case=ignore_case),
+            False,
+        )
+
+    def contains_any(self, terms: Sequence[str], component: str = "url", ignore_case: bool = True) -> pa.BooleanArray:
+        """True where the component contains any of the literal terms"""
+        values = self.component(component)
+        mask = self._all_false()
+        for term in terms:
+            mask = pc.or_(mask, pc.match_substring(values, term, ignore_case=ignore_case))
+        return pc.fill_null(mask, False)
+
+    def classify(self, classifier) -> pa.BooleanArray:
+        """Vectorized ProductUrlClassifier.is_product over the whole batch"""
+        mask = self._all_false()
+        if classifier.indicator_regex:
+            mask = self.match(classifier.indicator_regex, "path", ignore_case=True)
+        if classifier.query_regex:
+            mask = pc.or_(mask, self.match(classifier.query_regex, "query", ignore_case=True))
+        if classifier.exclude_regex:
+            mask = pc.and_(mask, pc.invert(self.match(classifier.exclude_regex, "path", ignore_case=True)))
+        return mask
+
+    def match_templates(self, matcher) -> pa.BooleanArray:
+        """Vectorized TemplateMatcher.filter mask over the whole batch"""
+        if not matcher.regex:
+            return self._all_false()
+        return self.match(matcher.regex, "path", ignore_case=True)
+
+    def isin(self, other: "UrlBatch") -> pa.BooleanArray:
+        """True where the URL also appears in `other`"""
+        return pc.is_in(self.urls, value_set=other.urls)
+
+    def filter(self, mask: pa.BooleanArray) -> "UrlBatch":
+        batch = UrlBatch(self.urls.filter(mask))
+        if self._parts is not None:
+            # Already split; don't pay for the regex extraction again
+            batch._parts = self._parts.filter(mask)
+        return batch
+
+    def same_host(self, host: str) -> "UrlBatch":
+        """Keep URLs on `host` (case-insensitive)"""
+        return self.filter(pc.equal(pc.utf8_lower(self.component("host")), host.lower()))
+
+    # ---------- Canonicalization / dedup ----------
+
+    def canonicalize(self, drop_query: bool = False, strip_trailing_slash: bool = True) -> "UrlBatch":
+        """
+        Normalize URLs so equivalent spellings dedup together.
+
+        Lowercases scheme and host, drops fragments and the scheme's default
+        port (:80 for http, :443 for https), turns an empty path into '/',
+        and optionally strips trailing slashes and the query string.
+        Unparseable entries are dropped.
+        """
+        batch = self.filter(self.valid)
+        scheme = pc.utf8_lower(batch.component("scheme"))
+        host = pc.utf8_lower(batch.component("host"))
+        host = pc.if_else(
+            pc.equal(scheme, "https"),
+            pc.replace_substring_regex(host, r":443$", ""),
+            pc.if_else(pc.equal(scheme, "http"), pc.replace_substring_regex(host, r":80$", ""), host),
+        )
+        path = batch.component("path")
+        if strip_trailing_slash:
+            path = pc.replace_substring_regex(path, r"/+$", "")
+        path = pc.if_else(pc.equal(pc.utf8_length(path), 0), "/", path)
+
+        base = pc.binary_join_element_wise(scheme, "://", host, path, "")
+        query = batch.component("query")
+        if drop_query:
+            query = pc.cast(pa.nulls(len(base)), pa.string())
+            urls = base
+        else:
+            with_query = pc.binary_join_element_wise(base, "?", query, "")
+            urls = pc.if_else(pc.equal(pc.utf8_length(query), 0), base, with_query)
+
+        canonical = UrlBatch(urls)
+        # The components are already at hand, so later matching needn't re-split
+        canonical._parts = pa.StructArray.from_arrays(
+            [scheme, host, path, query, pc.cast(pa.nulls(len(base)), pa.string())],
+            names=URL_FIELDS,
+        )
+        return canonical
+
+    def take(self, indices) -> "UrlBatch":
+        indices = pa.array(indices)
+        batch = UrlBatch(self.urls.take(indices))
+        if self._parts is not None:
+            batch._parts = self._parts.take(indices)
+        return batch
+
+    def unique(self) -> "UrlBatch":
+        """Drop duplicates, keeping first-seen order"""
+        codes = pc.dictionary_encode(self.urls).indices.to_numpy(zero_copy_only=False)
+        # Dictionary codes follow first-seen order, so first occurrences come out in order
+        _, first = np.unique(codes, return_index=True)
+        return self.take(first)
+
+    def dedup(self, drop_query: bool = False) -> "UrlBatch":
+        """Canonicalize then deduplicate"""
+        return self.canonicalize(drop_query=drop_query).unique()
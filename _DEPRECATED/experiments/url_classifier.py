@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Product URL Classifier
+
+Compiles the include/exclude URL heuristics used by product link discovery
+once, instead of rebuilding regexes from glob strings for every URL:
+- All exclude globs become a single alternation regex
+- All product indicators become a single alternation regex
+- Query-string hints are matched with one literal alternation
+
+Classification is exposed per URL and in batch over whole URL lists.
+"""
+
+import re
+from typing import Iterable, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+
+# Common product URL patterns for e-commerce sites
+COMMON_PRODUCT_PATTERNS = [
+    "*/product/*",
+    "*/produtos/*",
+    "*/p/*",
+    "*/pd/*",
+    "*/item/*",
+    "*/items/*",
+    "*-p-*",
+    "*/dp/*",  # Amazon style
+    "*/gp/product/*",  # Amazon style
+]
+
+# Keywords that indicate product pages
+PRODUCT_KEYWORDS = [
+    "product", "produto", "item", "artigo",
+    "buy", "comprar", "shop", "loja"
+]
+
+# Patterns to exclude (non-product pages)
+EXCLUDE_PATTERNS = [
+    "*/cart/*", "*/checkout/*", "*/account/*", "*/login/*",
+    "*/register/*", "*/search/*", "*/category/*", "*/categories/*",
+    "*/blog/*", "*/about/*", "*/contact/*", "*/help/*",
+    "*/terms/*", "*/privacy/*", "*/faq/*"
+]
+
+# Path structures that indicate a product page
+PRODUCT_INDICATORS = [
+    r'/p(?:roduct)?(?:o)?s?/[\w-]+',
+    r'/item/[\w-]+',
+    r'/dp/[\w-]+',
+    r'-p-\d+',
+    r'/\d{4,}',  # Long numeric IDs
+    r'[\w]+-\d+',  # SKU patterns
+]
+
+# Query parameters that indicate a product page
+QUERY_INDICATORS = ['productid', 'product_id', 'pid=', 'sku=']
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Convert a '*' glob into an unanchored regex for re.search.
+
+    Leading and trailing '*' are dropped since search is unanchored anyway,
+    which lets the regex engine use a literal prefix scan.
+    """
+    core = pattern.strip("*")
+    return ".*".join(re.escape(part) for part in core.split("*"))
+
+
+def _alternation(regexes: Iterable[str]) -> Optional[re.Pattern]:
+    regexes = [r for r in regexes if r]
+    if not regexes:
+        return None
+    return re.compile("|".join(f"(?:{r})" for r in regexes))
+
+
+class ProductUrlClassifier:
+    """Classifies URLs as product pages using precompiled pattern sets"""
+
+    def __init__(
+        self,
+        include_patterns: Sequence[str] = COMMON_PRODUCT_PATTERNS,
+        exclude_patterns: Sequence[str] = EXCLUDE_PATTERNS,
+        keywords: Sequence[str] = PRODUCT_KEYWORDS,
+        indicators: Sequence[str] = PRODUCT_INDICATORS,
+        query_indicators: Sequence[str] = QUERY_INDICATORS,
+    ):
+        self.include_patterns = list(include_patterns)
+        self.keywords = [k.lower() for k in keywords]
+
+        self._exclude = _alternation(glob_to_regex(p) for p in exclude_patterns)
+        self._indicator = _alternation(indicators)
+        self._query = _alternation(re.escape(q) for q in query_indicators)
+        # Pattern sources, reused by vectorized matchers (see url_batch.UrlBatch.classify)
+        self.exclude_regex = self._exclude.pattern if self._exclude else None
+        self.indicator_regex = self._indicator.pattern if self._indicator else None
+        self.query_regex = self._query.pattern if self._query else None
+        self._keyword = _alternation(re.escape(k) for k in self.keywords)
+        # Kept separate because detection must report which globs matched
+        self._include = [(p, re.compile(glob_to_regex(p))) for p in self.include_patterns]
+
+    def is_product(self, url: str) -> bool:
+        """Heuristic check if a URL is likely a product page"""
+        parts = urlsplit(url)
+        path = parts.path.lower()
+
+        if self._exclude is not None and self._exclude.search(path):
+            return False
+        if self._indicator is not None and self._indicator.search(path):
+            return True
+        return bool(self._query is not None and parts.query and self._query.search(parts.query.lower()))
+
+    def classify(self, urls: Iterable[str]) -> List[bool]:
+        """Classify a batch of URLs; returns one flag per URL"""
+        is_product = self.is_product
+        return [bool(url) and is_product(url) for url in urls]
+
+    def filter(self, urls: Iterable[str]) -> List[str]:
+        """Keep only URLs classified as product pages"""
+        is_product = self.is_product
+        return [url for url in urls if url and is_product(url)]
+
+    def detect_patterns(self, urls: Sequence[str], sample_size: int = 100) -> List[str]:
+        """
+        Analyze a sample of URLs to detect product-specific patterns.
+        Falls back to the configured include patterns when nothing matches.
+        """
+        detected = set()
+        for url in urls[:sample_size]:
+            path = urlsplit(url).path
+
+            for pattern, regex in self._include:
+                if regex.search(path):
+                    detected.add(pattern)
+
+            # Segments containing a product keyword become patterns themselves
+            segments = [s for s in path.split('/') if s]
+            if len(segments) >= 2 and self._keyword is not None:
+                for segment in segments:
+                    if self._keyword.search(segment.lower()):
+                        detected.add(f"*/{segment}/*")
+
+        return list(detected) if detected else list(self.include_patterns)
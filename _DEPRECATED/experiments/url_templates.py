@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+URL Template Inference
+
+Learns a merchant's URL templates from discovered URLs instead of relying on
+hand-written product heuristics:
+1. Tokenize each path into segment shapes ({int}, {slug}-{id:int}, {hex}, words)
+2. Cluster URLs by shape, keeping frequent words literal (e.g. "/p", "/produto")
+3. Count members per template (e.g. "/{slug}-{id:int}/p": 12,994 URLs)
+4. Pick product templates by structure, optionally confirmed by sampling pages
+5. Cache the learned templates per merchant and compile them into one matcher
+
+Future discovery filters millions of URLs with a handful of compiled templates.
+"""
+
+import asyncio
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+from url_classifier import ProductUrlClassifier
+
+
+INT_TOKEN = "{int}"
+SLUG_ID_TOKEN = "{slug}-{id:int}"
+HEX_TOKEN = "{hex}"
+SLUG_TOKEN = "{slug}"
+
+# Variable tokens that carry a per-page identifier
+ID_TOKENS = {INT_TOKEN, SLUG_ID_TOKEN, HEX_TOKEN}
+
+TOKEN_REGEX = {
+    INT_TOKEN: r"\d+",
+    SLUG_ID_TOKEN: r"[^/]*?-\d{3,}",
+    HEX_TOKEN: r"[0-9a-f]{16,}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}",
+    SLUG_TOKEN: r"[^/]+",
+}
+
+# Literal segments that usually mark a product detail page
+PRODUCT_MARKERS = {"p", "produto", "produtos", "product", "products", "dp", "item", "pd"}
+
+# Literal segments that mark listing pages (collections, categories, search)
+LISTING_MARKERS = {
+    "colecao", "colecoes", "categoria", "categorias", "category", "categories",
+    "departamento", "busca", "search", "s", "c", "marca", "marcas", "brand",
+}
+
+_INT_RE = re.compile(r"^\d+$")
+_SLUG_ID_RE = re.compile(r"^.*[a-z].*-\d{3,}$")
+_HEX_RE = re.compile(
+    r"^(?:[0-9a-f]{16,}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$"
+)
+
+# Signals that a fetched page is a single-product page
+_PRODUCT_CONTENT_RE = re.compile(
+    r'"@type"\s*:\s*"Product"|og:type"\s+content="product|itemtype="https?://schema\.org/Product"',
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class UrlTemplate:
+    """A learned URL template and its members"""
+    pattern: str
+    count: int
+    samples: List[str] = field(default_factory=list)
+    has_id: bool = False
+    product_share: float = 0.0
+    is_product: bool = False
+    score: float = 0.0
+
+    @property
+    def regex(self) -> str:
+        return template_to_regex(self.pattern)
+
+
+def segment_shape(segment: str) -> str:
+    """Map a path segment to a variable token, or return it as a literal word"""
+    if _INT_RE.match(segment):
+        return INT_TOKEN
+    if _HEX_RE.match(segment):
+        return HEX_TOKEN
+    if _SLUG_ID_RE.match(segment):
+        return SLUG_ID_TOKEN
+    return segment
+
+
+def tokenize_path(url: str) -> List[str]:
+    """Lowercased, non-empty path segments of a URL"""
+    return [s for s in urlsplit(url).path.lower().split("/") if s]
+
+
+def _template_body(pattern: str) -> str:
+    parts = [TOKEN_REGEX.get(s, re.escape(s)) for s in pattern.split("/") if s]
+    return "/" + "/".join(parts)
+
+
+def template_to_regex(pattern: str) -> str:
+    """Compile a template like '/{slug}-{id:int}/p' into an anchored path regex"""
+    return "^" + _template_body(pattern) + "/?$"
+
+
+class TemplateInferer:
+    """Clusters URLs into path templates and picks the product ones"""
+
+    def __init__(
+        self,
+        literal_min_share: float = 0.05,
+        literal_min_support: int = 3,
+        min_product_members: int = 20,
+        sample_size: int = 20,
+        classifier: Optional[ProductUrlClassifier] = None,
+    ):
+        """
+        Args:
+            literal_min_share: A word stays literal if at least this share of its cluster uses it
+            literal_min_support: ...and at least this many URLs use it
+            min_product_members: Templates smaller than this are never product templates
+            sample_size: Sample URLs kept per template (also used for content probing)
+            classifier: Heuristic classifier used to score templates structurally
+        """
+        self.literal_min_share = literal_min_share
+        self.literal_min_support = literal_min_support
+        self.min_product_members = min_product_members
+        self.sample_size = sample_size
+        self.classifier = classifier or ProductUrlClassifier()
+
+    def learn(self, urls: Iterable[str]) -> List[UrlTemplate]:
+        """Cluster URLs into templates, largest first"""
+        # Pass 1: group by segment count and shape, words still raw
+        clusters: Dict[tuple, List[tuple]] = defaultdict(list)
+        for url in urls:
+            shapes = tuple(segment_shape(s) for s in tokenize_path(url))
+            key = (len(shapes), tuple(s if s.startswith("{") else "" for s in shapes))
+            clusters[key].append((url, shapes))
+
+        # Pass 2: per cluster, keep frequent words literal and generalize the rest
+        members: Dict[str, List[str]] = defaultdict(list)
+        for key, entries in clusters.items():
+            threshold = max(self.literal_min_support, self.literal_min_share * len(entries))
+            word_counts = [Counter() for _ in range(key[0])]
+            for _, shapes in entries:
+                for i, shape in enumerate(shapes):
+                    if not shape.startswith("{"):
+                        word_counts[i][shape] += 1
+
+            for url, shapes in entries:
+                tokens = [
+                    shape if shape.startswith("{") or word_counts[i][shape] >= threshold else SLUG_TOKEN
+                    for i, shape in enumerate(shapes)
+                ]
+                members["/" + "/".join(tokens)].append(url)
+
+        templates = []
+        for pattern, urls_in_template in members.items():
+            samples = urls_in_template[:self.sample_size]
+            templates.append(UrlTemplate(
+                pattern=pattern,
+                count=len(urls_in_template),
+                samples=samples,
+                has_id=any(t in ID_TOKENS for t in pattern.split("/")),
+                product_share=sum(self.classifier.classify(samples)) / len(samples),
+            ))
+        templates.sort(key=lambda t: t.count, reverse=True)
+        return templates
+
+    def _structural_score(self, template: UrlTemplate, total: int) -> float:
+        tokens = [t for t in template.pattern.split("/") if t]
+        score = template.product_share
+        if template.has_id:
+            score += 1.0
+        if any(t in PRODUCT_MARKERS for t in tokens):
+            score += 0.5
+        if any(t in LISTING_MARKERS for t in tokens):
+            score -= 1.0
+        # Product catalogs dominate a merchant's URL space
+        score += math.log1p(template.count) / math.log1p(max(total, 1))
+        return score
+
+    async def select_product_templates(
+        self,
+        templates: List[UrlTemplate],
+        probe: Optional[Callable[[str], Awaitable[bool]]] = None,
+        probe_samples: int = 3,
+    ) -> List[UrlTemplate]:
+        """
+        Mark and return the templates that hold product pages.
+
+        Structure decides by default: an identifier token or product marker
+        segment ("/p", "/produto"), no listing marker ("/colecao", "/busca"),
+        enough members and a majority of samples passing the URL heuristics.
+        With a `probe`
+        (async url -> bool, e.g. probe_product_page) a few sample pages per
+        candidate are fetched and the majority verdict wins.
+        """
+        total = sum(t.count for t in templates)
+        candidates = []
+        for template in templates:
+            tokens = {t for t in template.pattern.split("/") if t}
+            template.score = self._structural_score(template, total)
+            is_candidate = (
+                (template.has_id or bool(tokens & PRODUCT_MARKERS))
+                and template.count >= self.min_product_members
+            )
+            template.is_product = (
+                is_candidate
+                and not tokens & LISTING_MARKERS
+                and template.product_share >= 0.5
+            )
+            if is_candidate:
+                candidates.append(template)
+
+        if probe:
+            for template in candidates:
+                verdicts = await asyncio.gather(
+                    *(probe(url) for url in template.samples[:probe_samples]),
+                    return_exceptions=True,
+                )
+                positives = sum(1 for v in verdicts if v is True)
+                template.is_product = positives * 2 > len(verdicts)
+
+        return [t for t in templates if t.is_product]
+
+
+class TemplateMatcher:
+    """Matches URLs against a few templates with one compiled regex"""
+
+    def __init__(self, templates: Sequence[UrlTemplate]):
+        self.templates = list(templates)
+        self.regex = None
+        self._regex = None
+        if self.templates:
+            alternatives = "|".join(
+                f"(?P<t{i}>{_template_body(t.pattern)})" for i, t in enumerate(self.templates)
+            )
+            self.regex = f"^(?:{alternatives})/?$"
+            self._regex = re.compile(self.regex)
+
+    def match(self, url: str) -> Optional[UrlTemplate]:
+        """Template matching the URL's path, or None"""
+        if self._regex is None:
+            return None
+        m = self._regex.match(urlsplit(url).path.lower())
+        if not m:
+            return None
+        return self.templates[int(m.lastgroup[1:])]
+
+    def filter(self, urls: Iterable[str]) -> List[str]:
+        """Keep URLs whose path matches any template"""
+        if self._regex is None:
+            return []
+        match = self._regex.match
+        return [url for url in urls if match(urlsplit(url).path.lower())]
+
+
+class TemplateCache:
+    """Per-merchant cache of learned templates"""
+
+    def __init__(self, cache_dir: str = "./template_cache"):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(exist_ok=True)
+
+    def _path(self, domain: str) -> Path:
+        return self.cache_dir / f"templates_{domain.replace('.', '_')}.json"
+
+    def load(self, domain: str) -> Optional[List[UrlTemplate]]:
+        path = self._path(domain)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return [UrlTemplate(**t) for t in data["templates"]]
+
+    def save(self, domain: str, templates: List[UrlTemplate]) -> Path:
+        path = self._path(domain)
+        data = {
+            "domain": domain,
+            "templates": [asdict(t) for t in templates],
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return path
+
+
+def looks_like_product_page(html: str) -> bool:
+    """Cheap content check: schema.org Product markup or og:type=product"""
+    return bool(_PRODUCT_CONTENT_RE.search(html))
+
+
+async def probe_product_page(url: str, session=None, timeout: int = 15) -> bool:
+    """Fetch a page and check it for product markup (for select_product_templates)"""
+    import aiohttp
+
+    if session is None:
+        async with aiohttp.ClientSession() as own_session:
+            return await probe_product_page(url, own_session, timeout)
+
+    async with session.get(url, timeout=timeout) as resp:
+        if resp.status != 200:
+            return False
+        return looks_like_product_page(await resp.text(errors="ignore"))
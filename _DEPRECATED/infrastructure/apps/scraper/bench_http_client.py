@@ -0,0 +1,124 @@
+"""
+Benchmark: per-run ClientSession vs the shared tuned session.
+
+Starts a local HTTPS stand-in server with a throwaway self-signed cert and
+replays the same request pattern through both clients, counting TLS
+handshakes (new server-side connections) and request latency.
+
+Usage:
+    python bench_http_client.py --runs 5 --requests 200 --concurrency 10
+"""
+import argparse
+import asyncio
+import os
+import ssl
+import statistics
+import subprocess
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+import http_client
+
+PAGE = "<html><body>" + "<a href='/p/{0}'>produto {0}</a>" * 200 + "</body></html>"
+
+
+def make_cert(directory):
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost",
+         "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+async def start_server(cert, key, port):
+    connections = []
+
+    async def handler(request):
+        # Keep the transport itself so a recycled id() can't hide a new connection
+        if not any(t is request.transport for t in connections):
+            connections.append(request.transport)
+        return web.Response(text=PAGE, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    server_ssl = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    server_ssl.load_cert_chain(cert, key)
+    await web.TCPSite(runner, "localhost", port, ssl_context=server_ssl).start()
+    return runner, connections
+
+
+async def replay(get_session, release_session, base_url, client_ssl, runs, requests, concurrency):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(session, i):
+        async with semaphore:
+            start = time.perf_counter()
+            async with session.get(f"{base_url}/p/{i}", ssl=client_ssl) as resp:
+                await resp.text()
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    for _ in range(runs):
+        session = get_session()
+        await asyncio.gather(*(one(session, i) for i in range(requests)))
+        await release_session(session)
+    return time.perf_counter() - started, latencies
+
+
+def report(name, wall, latencies, handshakes):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<22} handshakes={handshakes:<5} wall={wall:.2f}s "
+          f"mean={statistics.mean(latencies) * 1000:.2f}ms p95={p95 * 1000:.2f}ms "
+          f"rps={len(latencies) / wall:.0f}")
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = make_cert(tmp)
+        client_ssl = ssl.create_default_context(cafile=cert)
+        runner, connections = await start_server(cert, key, args.port)
+        base_url = f"https://localhost:{args.port}"
+
+        async def close(session):
+            await session.close()
+
+        async def keep(session):
+            pass
+
+        try:
+            # Old pattern: a default ClientSession per crawl run
+            wall, latencies = await replay(
+                aiohttp.ClientSession, close, base_url, client_ssl,
+                args.runs, args.requests, args.concurrency,
+            )
+            report("per-run session", wall, latencies, len(connections))
+
+            connections.clear()
+            wall, latencies = await replay(
+                http_client.get_session, keep, base_url, client_ssl,
+                args.runs, args.requests, args.concurrency,
+            )
+            report("shared tuned session", wall, latencies, len(connections))
+        finally:
+            await http_client.close_session()
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8443)
+    asyncio.run(main(parser.parse_args()))
@@ -1,32 +1,64 @@
 import asyncio
-import aiohttp
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import itertools
 import os
+import time
 from db import get_conn
 from datetime import datetime
 from log_utils import log_message
+from http_client import get_session
+from sitemap import iter_changed_urls
+import metrics
 
 SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", 10))
 SCRAPE_MAX_DEPTH = int(os.getenv("SCRAPE_MAX_DEPTH", 0))  # 0 = unlimited
+# "sitemap" tries sitemaps first and falls back to BFS; "bfs" always crawls
+SCRAPE_DISCOVERY = os.getenv("SCRAPE_DISCOVERY", "sitemap").lower()
+SHUTDOWN_GRACE_SECONDS = float(os.getenv("SHUTDOWN_GRACE_SECONDS", 15))
 semaphore = asyncio.Semaphore(SCRAPE_CONCURRENCY)
 
+# Set once on service shutdown; crawls stop dequeuing and checkpoint their frontier
+shutdown_event = asyncio.Event()
+
+
+def request_shutdown():
+    shutdown_event.set()
+
+
+def shutdown_requested():
+    return shutdown_event.is_set()
+
 
 async def fetch(session, url, proxy=None):
     """Fetch a page and return HTML, or None on failure."""
+    host = urlparse(url).netloc
     try:
         async with semaphore:
-            async with session.get(url, proxy=proxy, timeout=15) as resp:
-                if resp.status == 200:
-                    return await resp.text(errors="ignore")
+            metrics.INFLIGHT_REQUESTS.inc()
+            try:
+                async with session.get(url, proxy=proxy, timeout=15) as resp:
+                    metrics.FETCH_REQUESTS.labels(host, str(resp.status)).inc()
+                    if proxy:
+                        metrics.PROXY_REQUESTS.labels("success" if 200 <= resp.status < 400 else "failure").inc()
+                    if resp.status == 200:
+                        start = time.perf_counter()
+                        html = await resp.text(errors="ignore")
+                        metrics.observe_since(metrics.FETCH_STAGE_SECONDS.labels("body", host), start)
+                        return html
+            finally:
+                metrics.INFLIGHT_REQUESTS.dec()
     except Exception as e:
+        metrics.FETCH_REQUESTS.labels(host, "error").inc()
+        if proxy:
+            metrics.PROXY_REQUESTS.labels("failure").inc()
         print(f"Fetch failed for {url}: {e}")
     return None
 
 
 def extract_links(html, base_url):
     """Extract same-domain links."""
+    start = time.perf_counter()
     soup = BeautifulSoup(html, "html.parser")
     links = set()
     for a in soup.find_all("a", href=True):
@@ -34,11 +66,13 @@ def extract_links(html, base_url):
         abs_url = urljoin(base_url, href)
         if urlparse(abs_url).netloc == urlparse(base_url).netloc:
             links.add(abs_url.split("#")[0])
+    metrics.observe_since(metrics.PARSE_SECONDS.labels(urlparse(base_url).netloc), start)
     return list(links)
 
 
 async def save_link_to_db(conn, run_id, store_id, url):
     """Insert a single discovered link into the scrape table."""
+    start = time.perf_counter()
     try:
         await conn.execute(
             '''
@@ -55,35 +89,59 @@ async def save_link_to_db(conn, run_id, store_id, url):
             ''',
             run_id, store_id, url, datetime.utcnow()
         )
+        metrics.observe_since(metrics.DB_SECONDS.labels("insert_link"), start)
     except Exception as e:
         print(f"DB insert failed for {url}: {e}")
         await log_message(None, "ERROR", f"Failed to save link {url}: {e}")
 
 
-async def crawl_domain(base_url, proxies, run_id=None, store_id=None):
-    """Recursively crawl and save all same-domain links."""
-    visited = set()
+async def crawl_domain(base_url, proxies, run_id=None, store_id=None, checkpoint=None):
+    """
+    Recursively crawl and save all same-domain links.
+
+    `checkpoint` is an optional dict with the "visited" URLs and pending
+    "frontier" of an interrupted crawl. The crawl resumes from it, and if a
+    shutdown is requested mid-crawl it is updated in place with what is left.
+    Returns only the URLs fetched by this call.
+    """
+    checkpoint = checkpoint if checkpoint is not None else {}
+    already_done = set(checkpoint.get("visited", []))
+    visited = set(already_done)
+    in_flight = {}
+    frontier = []
     proxy_cycle = itertools.cycle(proxies) if proxies else None
 
-    conn = await get_conn()
-    async with aiohttp.ClientSession() as session:
-        queue = asyncio.Queue()
-        await queue.put((base_url, 0))
+    host = urlparse(base_url).netloc
+    queue_depth = metrics.QUEUE_DEPTH.labels(host)
 
-        async def worker():
-            while not queue.empty():
-                url, depth = await queue.get()
+    conn = await get_conn()
+    session = get_session()
+    queue = asyncio.Queue()
+    for url, depth in checkpoint.get("frontier") or [(base_url, 0)]:
+        queue.put_nowait((url, depth))
+
+    async def worker():
+        while True:
+            url, depth = await queue.get()
+            queue_depth.set(queue.qsize())
+            try:
+                # Stop dequeuing once shutdown starts; the item goes back to the frontier
+                if shutdown_event.is_set():
+                    frontier.append((url, depth))
+                    return
                 if url in visited:
-                    queue.task_done()
                     continue
                 visited.add(url)
+                in_flight[url] = depth
                 proxy = next(proxy_cycle) if proxy_cycle else None
                 html = await fetch(session, url, proxy)
                 if not html:
                     await log_message(None, "ERROR", f"Failed to fetch {url}")
-                    queue.task_done()
+                    del in_flight[url]
                     continue
 
+                metrics.PAGES_CRAWLED.labels(host).inc()
+
                 # Save found link immediately
                 if run_id and store_id:
                     await save_link_to_db(conn, run_id, store_id, url)
@@ -94,13 +152,98 @@ async def crawl_domain(base_url, proxies, run_id=None, store_id=None):
                     for link in new_links:
                         if link not in visited:
                             await queue.put((link, depth + 1))
+                    queue_depth.set(queue.qsize())
 
+                del in_flight[url]
+            finally:
                 queue.task_done()
 
-        tasks = [asyncio.create_task(worker()) for _ in range(SCRAPE_CONCURRENCY)]
-        await queue.join()
-        for t in tasks:
-            t.cancel()
+    tasks = [asyncio.create_task(worker()) for _ in range(SCRAPE_CONCURRENCY)]
+
+    finished = asyncio.create_task(queue.join())
+    stopping = asyncio.create_task(shutdown_event.wait())
+    await asyncio.wait({finished, stopping}, return_when=asyncio.FIRST_COMPLETED)
+    interrupted = not finished.done()
+    finished.cancel()
+    stopping.cancel()
+
+    if interrupted:
+        # Let in-flight fetches finish, but never past the grace deadline
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SHUTDOWN_GRACE_SECONDS
+        while in_flight and loop.time() < deadline:
+            await asyncio.sleep(0.1)
+
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    queue_depth.set(0)
 
     await conn.close()
-    return list(visited)
+
+    # Anything still in flight after the deadline was never completed
+    done = visited - in_flight.keys()
+
+    checkpoint["interrupted"] = interrupted
+    if interrupted:
+        while not queue.empty():
+            frontier.append(queue.get_nowait())
+        frontier.extend(in_flight.items())
+        pending = {}
+        for url, depth in frontier:
+            if url not in done and url not in pending:
+                pending[url] = depth
+        checkpoint["visited"] = sorted(done)
+        checkpoint["frontier"] = list(pending.items())
+        print(f"Crawl of {base_url} interrupted: {len(done)} done, {len(pending)} pending")
+
+    return list(done - already_done)
+
+
+async def discover_via_sitemaps(base_url, since=None, checkpoint=None):
+    """
+    Collect URLs changed since `since` from the store's sitemaps, without fetching pages.
+
+    Returns None when the store has no sitemap. Like crawl_domain, URLs already
+    recorded in the checkpoint are skipped and an interrupted walk records
+    what it collected so a resumed run does not enqueue them twice.
+    """
+    checkpoint = checkpoint if checkpoint is not None else {}
+    already_done = set(checkpoint.get("visited", []))
+    found = []
+    seen = set(already_done)
+    try:
+        async for url in iter_changed_urls(get_session(), base_url, since, stop=shutdown_requested):
+            url = url.split("#")[0]
+            if url not in seen:
+                seen.add(url)
+                found.append(url)
+    except LookupError as e:
+        print(e)
+        return None
+
+    # The walk stops early only when asked to shut down
+    checkpoint["interrupted"] = shutdown_requested()
+    if checkpoint["interrupted"]:
+        checkpoint["mode"] = "sitemap"
+        checkpoint["visited"] = sorted(seen)
+    print(f"Sitemaps for {base_url}: {len(found)} URL(s) changed since {since}")
+    return found
+
+
+async def discover_store(base_url, proxies, since=None, checkpoint=None):
+    """
+    Discover a store's URLs: sitemap-first, BFS only for stores without sitemaps.
+
+    Returns (urls, status) where status is the scrape row status to record:
+    'queued' for sitemap URLs that still need fetching, 'success' for pages
+    the BFS already fetched. checkpoint["interrupted"] tells whether the
+    discovery was cut short by a shutdown.
+    """
+    checkpoint = checkpoint if checkpoint is not None else {}
+    if SCRAPE_DISCOVERY == "sitemap" and checkpoint.get("mode", "sitemap") == "sitemap":
+        urls = await discover_via_sitemaps(base_url, since, checkpoint)
+        if urls is not None:
+            return urls, "queued"
+    checkpoint["mode"] = "bfs"
+    return await crawl_domain(base_url, proxies, checkpoint=checkpoint), "success"
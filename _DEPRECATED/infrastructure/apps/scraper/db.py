@@ -1,10 +1,35 @@
+import asyncio
 import asyncpg
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DB_URL = os.getenv("DATABASE_URL")
+DB_READY_TIMEOUT = float(os.getenv("DB_READY_TIMEOUT", 60))
 
 async def get_conn():
     return await asyncpg.connect(DB_URL)
+
+
+async def wait_for_db(timeout=DB_READY_TIMEOUT):
+    """Probe the database with fast exponential backoff until it answers a query."""
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            conn = await asyncpg.connect(DB_URL, timeout=5)
+            try:
+                await conn.fetchval("SELECT 1")
+            finally:
+                await conn.close()
+            print(f"Database ready after {attempt} attempt(s).")
+            return
+        except (OSError, asyncio.TimeoutError, asyncpg.PostgresError) as e:
+            if time.monotonic() + delay > deadline:
+                raise RuntimeError(f"Database not ready after {timeout}s: {e}") from e
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 2.0)
@@ -0,0 +1,58 @@
+import asyncio
+import os
+
+import aiohttp
+
+import metrics
+
+HTTP_CONNECTION_LIMIT = int(os.getenv("HTTP_CONNECTION_LIMIT", 100))
+HTTP_LIMIT_PER_HOST = int(os.getenv("HTTP_LIMIT_PER_HOST", 10))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", 300))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 60))
+
+# Advertised explicitly; aiohttp decodes br only when the Brotli package is installed
+ACCEPT_ENCODING = "gzip, deflate, br"
+
+_session = None
+
+
+def build_connector(**overrides):
+    """TCPConnector tuned for many requests to few hosts."""
+    options = dict(
+        limit=HTTP_CONNECTION_LIMIT,
+        limit_per_host=HTTP_LIMIT_PER_HOST,
+        use_dns_cache=True,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True,
+    )
+    options.update(overrides)
+    return aiohttp.TCPConnector(**options)
+
+
+def get_session():
+    """
+    Return the process-wide ClientSession, creating it on first use.
+
+    One connector serves every caller. aiohttp keys pooled connections by
+    host, TLS settings and proxy, so each proxy gets its own keep-alive pool
+    that survives from one scrape run to the next. The session is never
+    closed by callers; close_session() runs at service shutdown.
+    """
+    global _session
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session._loop is not loop:
+        _session = aiohttp.ClientSession(
+            connector=build_connector(),
+            headers={"Accept-Encoding": ACCEPT_ENCODING},
+            auto_decompress=True,
+            trace_configs=[metrics.http_trace_config()],
+        )
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
@@ -1,14 +1,45 @@
 from db import get_conn
 from datetime import datetime
+import os
+import time
+import metrics
+
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", 50))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", 5))
+
+# Log rows waiting to be written, flushed in batches by flush_logs()
+_pending = []
+_last_flush = time.monotonic()
+
 
 async def log_message(scrape_id: int, level: str, message: str):
-    """Insert a log entry linked to a scrape task."""
+    """Buffer a log entry linked to a scrape task; flushes when the batch is full or stale."""
+    _pending.append((scrape_id, level, message, datetime.utcnow()))
+    if len(_pending) >= LOG_BATCH_SIZE or time.monotonic() - _last_flush >= LOG_FLUSH_INTERVAL:
+        await flush_logs()
+
+
+async def flush_logs():
+    """Write every buffered log entry in a single executemany."""
+    global _last_flush
+    _last_flush = time.monotonic()
+    if not _pending:
+        return
+    batch = _pending[:]
+    del _pending[:]
+
+    start = time.perf_counter()
     conn = await get_conn()
-    await conn.execute(
-        '''
-        INSERT INTO scrape_log (scrape_id, "logLevel", message, "createdAt")
-        VALUES ($1, $2, $3, $4)
-        ''',
-        scrape_id, level, message, datetime.utcnow()
-    )
-    await conn.close()
+    try:
+        await conn.executemany(
+            '''
+            INSERT INTO scrape_log (scrape_id, "logLevel", message, "createdAt")
+            VALUES ($1, $2, $3, $4)
+            ''',
+            batch
+        )
+    except Exception as e:
+        print(f"Failed to flush {len(batch)} log entries: {e}")
+    finally:
+        await conn.close()
+    metrics.observe_since(metrics.DB_SECONDS.labels("flush_logs"), start)
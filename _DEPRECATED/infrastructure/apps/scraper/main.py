@@ -1,19 +1,35 @@
-from fastapi import FastAPI, BackgroundTasks
-from scraper_service import run_scrape
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Response
+from scraper_service import run_scrape, wait_for_runs
+from crawler import request_shutdown, SHUTDOWN_GRACE_SECONDS
+from log_utils import flush_logs
+from http_client import close_session
 from seed import seed_stores
+from db import wait_for_db
 import asyncio
 import os       
 from contextlib import asynccontextmanager
 from proxy_refresher import refresh_proxies
+import metrics
 
 
+# Flipped by the startup task; /ready reports them, /health never waits on them
+readiness = {
+    "db": False,
+    "seeded": False,
+    "proxies_warm": False,
+    "draining": False,
+}
+
+# Strong references to long-running tasks so they are not garbage collected
+service_tasks = []
+
+
+def is_ready():
+    return readiness["db"] and readiness["seeded"] and not readiness["draining"]
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("Running startup tasks...")
-    await asyncio.sleep(5)  # ensure DB is ready
-    await seed_stores()
-    await refresh_proxies() 
 
     async def scrape_loop():
         while True:
@@ -25,24 +41,55 @@ async def lifespan(app: FastAPI):
             print("Scrape run complete, sleeping...")
             await asyncio.sleep(int(os.getenv("SCRAPE_INTERVAL", 21600)))
 
-    if os.getenv("AUTO_SCRAPE_ON_STARTUP", "true").lower() == "true":
-        asyncio.create_task(scrape_loop())
-        print("Auto scrape loop enabled.")
-    else:
-        print("Auto scrape disabled by env variable.")
-
     async def proxy_loop():
         while True:
-            await refresh_proxies()
+            try:
+                await refresh_proxies()
+                readiness["proxies_warm"] = True
+            except Exception as e:
+                print(f"Proxy refresh error: {e}")
             await asyncio.sleep(43200)  # 12 hours
 
-    # handle /health endpoint
-    
-    asyncio.create_task(proxy_loop())
+    async def startup():
+        print("Running startup tasks...")
+        try:
+            await wait_for_db()
+            readiness["db"] = True
+            await seed_stores()
+            readiness["seeded"] = True
+        except Exception as e:
+            print(f"Startup failed: {e}")
+            return
+        print("Scraper service ready.")
+
+        # Heavy warmup runs behind the readiness flag instead of blocking startup
+        service_tasks.append(asyncio.create_task(proxy_loop()))
+
+        if os.getenv("AUTO_SCRAPE_ON_STARTUP", "true").lower() == "true":
+            service_tasks.append(asyncio.create_task(scrape_loop()))
+            print("Auto scrape loop enabled.")
+        else:
+            print("Auto scrape disabled by env variable.")
+
+    service_tasks.append(asyncio.create_task(startup()))
+    service_tasks.append(asyncio.create_task(metrics.monitor_event_loop_lag()))
 
     yield  # ← everything above runs at startup, below runs at shutdown
 
     print("Shutting down scraper service...")
+    readiness["draining"] = True
+
+    # Stop dequeuing, let in-flight fetches drain, then checkpoint as 'partial'
+    request_shutdown()
+    if not await wait_for_runs(SHUTDOWN_GRACE_SECONDS + 10):
+        print("Scrape runs did not drain in time; cancelling.")
+
+    for task in service_tasks:
+        task.cancel()
+    await asyncio.gather(*service_tasks, return_exceptions=True)
+    await flush_logs()
+    await close_session()
+    print("Scraper service stopped.")
 
 
 
@@ -50,10 +97,24 @@ async def lifespan(app: FastAPI):
 app = FastAPI(title="Domain Scraper", lifespan=lifespan)
 
 @app.get("/")
+@app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/ready")
+def ready(response: Response):
+    if not is_ready():
+        response.status_code = 503
+    return {"ready": is_ready(), **readiness}
+
 @app.get("/scrape")
 async def start_scrape(background_tasks: BackgroundTasks):
+    if not is_ready():
+        raise HTTPException(status_code=503, detail="Scraper service is still starting up")
     background_tasks.add_task(run_scrape)
     return {"message": "Scraping started manually"}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    # Rendered on the event loop, so no coroutine adds label children mid-iteration
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,278 @@
+import asyncio
+import time
+from bisect import bisect_left
+from types import SimpleNamespace
+
+import aiohttp
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, shared by every histogram unless overridden
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+
+_registry = []
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    Base for all metric families.
+
+    Children are created lazily per label set and updated without locks: the
+    scraper is a single event loop, so plain attribute/list updates are atomic
+    with respect to other coroutines. Nothing is formatted until render().
+    """
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+        _registry.append(self)
+
+    def labels(self, *values):
+        key = tuple(values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _render_samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._render_samples())
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def _render_samples(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def _render_samples(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One slot per bucket plus the +Inf overflow, allocated up front
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def _render_samples(self):
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+def render():
+    """Render every registered metric in Prometheus text format."""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# ---------- Scraper metrics ----------
+
+FETCH_STAGE_SECONDS = Histogram(
+    "scraper_fetch_stage_seconds",
+    "Time spent per HTTP fetch stage (dns, connect, ttfb, body).",
+    ("stage", "host"),
+)
+FETCH_REQUESTS = Counter(
+    "scraper_fetch_requests",
+    "HTTP fetches by host and outcome (HTTP status or 'error').",
+    ("host", "outcome"),
+)
+PARSE_SECONDS = Histogram(
+    "scraper_parse_seconds",
+    "Time spent parsing HTML and extracting links.",
+    ("host",),
+)
+DB_SECONDS = Histogram(
+    "scraper_db_seconds",
+    "Latency of database writes by operation.",
+    ("operation",),
+)
+INFLIGHT_REQUESTS = Gauge(
+    "scraper_inflight_requests",
+    "HTTP fetches currently in flight.",
+)
+QUEUE_DEPTH = Gauge(
+    "scraper_queue_depth",
+    "URLs waiting in the crawl frontier per host.",
+    ("host",),
+)
+PROXY_REQUESTS = Counter(
+    "scraper_proxy_requests",
+    "Fetches routed through a proxy by outcome (success/failure).",
+    ("outcome",),
+)
+PAGES_CRAWLED = Counter(
+    "scraper_pages_crawled",
+    "Pages fetched successfully per host.",
+    ("host",),
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "scraper_event_loop_lag_seconds",
+    "Delay between a scheduled wake-up and the event loop running it.",
+)
+
+
+def observe_since(child, start):
+    """Observe perf_counter() elapsed since `start` into a histogram child."""
+    child.observe(time.perf_counter() - start)
+
+
+# ---------- aiohttp tracing ----------
+
+async def _on_request_start(session, ctx, params):
+    ctx.host = params.url.host or ""
+    ctx.request_start = time.perf_counter()
+
+
+async def _on_dns_start(session, ctx, params):
+    ctx.dns_start = time.perf_counter()
+
+
+async def _on_dns_end(session, ctx, params):
+    FETCH_STAGE_SECONDS.labels("dns", params.host).observe(time.perf_counter() - ctx.dns_start)
+
+
+async def _on_connection_create_start(session, ctx, params):
+    ctx.connect_start = time.perf_counter()
+
+
+async def _on_connection_create_end(session, ctx, params):
+    FETCH_STAGE_SECONDS.labels("connect", ctx.host).observe(time.perf_counter() - ctx.connect_start)
+
+
+async def _on_request_end(session, ctx, params):
+    # Fired once response headers are in: time to first byte
+    FETCH_STAGE_SECONDS.labels("ttfb", ctx.host).observe(time.perf_counter() - ctx.request_start)
+
+
+def http_trace_config():
+    """TraceConfig that records DNS, connect and TTFB per host."""
+    trace = aiohttp.TraceConfig(trace_config_ctx_factory=lambda trace_request_ctx: SimpleNamespace(
+        host="", request_start=0.0, dns_start=0.0, connect_start=0.0,
+    ))
+    trace.on_request_start.append(_on_request_start)
+    trace.on_dns_resolvehost_start.append(_on_dns_start)
+    trace.on_dns_resolvehost_end.append(_on_dns_end)
+    trace.on_connection_create_start.append(_on_connection_create_start)
+    trace.on_connection_create_end.append(_on_connection_create_end)
+    trace.on_request_end.append(_on_request_end)
+    return trace
+
+
+# ---------- Event loop lag ----------
+
+async def monitor_event_loop_lag(interval=0.5):
+    """Sample event loop lag forever; run as a background task."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - start - interval))
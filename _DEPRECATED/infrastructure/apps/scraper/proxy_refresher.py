@@ -1,6 +1,6 @@
-import aiohttp
 import asyncio
 from db import get_conn
+from http_client import get_session
 from datetime import datetime
 
 # needs: 
@@ -21,26 +21,26 @@ async def fetch_text(session, url):
         print(f"Failed to fetch proxy list from {url}: {e}")
         return ""
 
-async def detect_country(ip):
+async def detect_country(ip, session=None):
     # Free, rate-limited API (fallback: ipapi.co)
     url = f"https://ipapi.co/{ip}/country/"
+    session = session or get_session()
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=5) as resp:
-                if resp.status == 200:
-                    text = await resp.text()
-                    return text.strip()[:2].upper()
+        async with session.get(url, timeout=5) as resp:
+            if resp.status == 200:
+                text = await resp.text()
+                return text.strip()[:2].upper()
     except Exception:
         pass
     return None
 
 async def refresh_proxies():
     print("Refreshing free proxies...")
-    async with aiohttp.ClientSession() as session:
-        all_proxies = []
-        for src in PROXY_SOURCES:
-            text = await fetch_text(session, src)
-            all_proxies.extend(line.strip() for line in text.splitlines() if ":" in line)
+    session = get_session()
+    all_proxies = []
+    for src in PROXY_SOURCES:
+        text = await fetch_text(session, src)
+        all_proxies.extend(line.strip() for line in text.splitlines() if ":" in line)
 
     all_proxies = list(set(all_proxies))
     conn = await get_conn()
@@ -49,7 +49,7 @@ async def refresh_proxies():
     for p in all_proxies:
         try:
             ip, port = p.split(":")
-            country = await detect_country(ip)
+            country = await detect_country(ip, session)
             await conn.execute("""
                 INSERT INTO proxy (ip, port, type, last_used, country)
                 SELECT $1, $2::int, 'anonymous', $3, $4
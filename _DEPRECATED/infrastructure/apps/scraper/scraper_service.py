@@ -1,7 +1,14 @@
 import asyncio
+import json
+import time
 from db import get_conn
-from crawler import crawl_domain
-from log_utils import log_message
+from crawler import discover_store, shutdown_requested
+from sitemap import parse_lastmod
+from log_utils import log_message, flush_logs
+import metrics
+
+# Runs currently executing, so shutdown can wait for them to checkpoint
+_active_runs = set()
 
 
 async def get_proxies(conn):
@@ -13,9 +20,52 @@ async def get_proxies(conn):
     return proxies
 
 
-async def run_scrape():
-    conn = await get_conn()
-    proxies = await get_proxies(conn)
+async def save_links(conn, run_id, store_id, links, status='success'):
+    """Flush a store's discovered links to the scrape table in one batch."""
+    if not links:
+        return
+    start = time.perf_counter()
+    try:
+        # scrape table uses camelCase fields
+        await conn.executemany("""
+            INSERT INTO scrape (
+                scrape_run_id,
+                store_id,
+                type,
+                "sourceUrl",
+                status,
+                "startedAt"
+            )
+            VALUES ($1, $2, 'frontpage', $3, $4, now())
+            ON CONFLICT DO NOTHING
+        """, [(run_id, store_id, link, status) for link in links])
+    except Exception as e:
+        await log_message(None, "ERROR", f"Failed to insert {len(links)} scrapes for store {store_id}: {e}")
+    metrics.observe_since(metrics.DB_SECONDS.labels("flush_links"), start)
+
+
+async def save_checkpoint(conn, run_id, checkpoints):
+    """Persist per-store crawl progress into scrape_run.stats."""
+    await conn.execute("""
+        UPDATE scrape_run
+        SET stats = COALESCE(stats, '{}'::jsonb) || jsonb_build_object('checkpoint', $2::jsonb)
+        WHERE id = $1
+    """, run_id, json.dumps(checkpoints))
+
+
+async def start_or_resume_run(conn):
+    """Resume the latest 'partial' run from its checkpoint, or start a new run."""
+    partial = await conn.fetchrow("""
+        SELECT id, stats FROM scrape_run
+        WHERE status = 'partial'
+        ORDER BY id DESC
+        LIMIT 1
+    """)
+    if partial:
+        stats = json.loads(partial['stats']) if partial['stats'] else {}
+        await conn.execute("UPDATE scrape_run SET status = 'running' WHERE id = $1", partial['id'])
+        print(f"Resuming partial scrape run {partial['id']}...")
+        return partial['id'], stats.get('checkpoint', {})
 
     # camelCase column names must be quoted
     run_id = await conn.fetchval("""
@@ -23,41 +73,93 @@ async def run_scrape():
         VALUES (now(), 'running')
         RETURNING id
     """)
+    return run_id, {}
+
+
+async def run_scrape():
+    if shutdown_requested():
+        return
+
+    task = asyncio.current_task()
+    _active_runs.add(task)
+    try:
+        await _run_scrape()
+    finally:
+        _active_runs.discard(task)
+        await flush_logs()
+
+
+async def _run_scrape():
+    conn = await get_conn()
+    proxies = await get_proxies(conn)
+
+    run_id, checkpoints = await start_or_resume_run(conn)
+
+    run_started = await conn.fetchval('SELECT "startedAt" FROM scrape_run WHERE id = $1', run_id)
 
     # store table uses "baseUrl"
-    stores = await conn.fetch('SELECT id, "baseUrl" FROM store WHERE active = TRUE')
+    stores = await conn.fetch('SELECT id, "baseUrl", config FROM store WHERE active = TRUE')
 
-    for store in stores:
-        print(f"Scraping {store['baseUrl']}...")
-        links = await crawl_domain(store['baseUrl'], proxies)
+    try:
+        for store in stores:
+            state = checkpoints.setdefault(str(store['id']), {})
+            if state.get("done"):
+                continue
 
-        for link in links:
-            try:    
-                # scrape table uses camelCase fields
+            config = json.loads(store['config']) if store['config'] else {}
+            since = parse_lastmod(config.get('lastDiscoveredAt'))
+
+            print(f"Scraping {store['baseUrl']}...")
+            links, status = await discover_store(store['baseUrl'], proxies, since=since, checkpoint=state)
+            await save_links(conn, run_id, store['id'], links, status)
+
+            # A store finished before a shutdown was requested is done: a
+            # resumed run must not crawl it again and save its links twice
+            if not state.pop("interrupted", False):
+                checkpoints[str(store['id'])] = {"done": True}
+                await save_checkpoint(conn, run_id, checkpoints)
+
+                # Next run only enqueues sitemap entries modified after this run started
                 await conn.execute("""
-                    INSERT INTO scrape (
-                        scrape_run_id,
-                        store_id,
-                        type,
-                        "sourceUrl",
-                        status,
-                        "startedAt"
-                    )
-                    VALUES ($1, $2, 'frontpage', $3, 'success', now())
-                    ON CONFLICT DO NOTHING
-                """, run_id, store['id'], link)
-            except Exception as e:
-                await log_message(None, "ERROR", f"Failed to insert scrape for {link}: {e}")
-                continue
+                    UPDATE store
+                    SET config = COALESCE(config, '{}'::jsonb) || jsonb_build_object('lastDiscoveredAt', $2::text)
+                    WHERE id = $1
+                """, store['id'], run_started.isoformat())
 
+            if shutdown_requested():
+                # Frontier and visited set were written into `state` by discover_store
+                await save_checkpoint(conn, run_id, checkpoints)
+                await conn.execute("""
+                    UPDATE scrape_run
+                    SET status = 'partial'
+                    WHERE id = $1
+                """, run_id)
+                await conn.close()
+                print(f"Scrape run {run_id} checkpointed as partial.")
+                return
+    except (Exception, asyncio.CancelledError):
+        # Killed past the drain deadline or failed: keep the run resumable
+        await save_checkpoint(conn, run_id, checkpoints)
+        await conn.execute("UPDATE scrape_run SET status = 'partial' WHERE id = $1", run_id)
+        await conn.close()
+        raise
 
     # Update scrape_run with camelCase columns
     await conn.execute("""
         UPDATE scrape_run
         SET status = 'finished',
-            "finishedAt" = now()
+            "finishedAt" = now(),
+            stats = stats - 'checkpoint'
         WHERE id = $1
     """, run_id)
 
     await conn.close()
     print(f"Scrape run {run_id} complete.")
+
+
+async def wait_for_runs(timeout):
+    """Wait up to `timeout` seconds for in-progress runs to drain and checkpoint."""
+    if not _active_runs:
+        return True
+    _, pending = await asyncio.wait(set(_active_runs), timeout=timeout)
+    return not pending
@@ -1,50 +1,55 @@
 from db import get_conn
 
-async def seed_stores():
-    stores = [
-        {
-            "name": "Extra Supermercado",
-            "domain": "extra.com.br",
-            "baseUrl": "https://www.extra.com.br/",
-            "countryCode": "BR",
-            "channel": "online",
-        },
-        {
-            "name": "Atacadão",
-            "domain": "atacadao.com.br",
-            "baseUrl": "https://www.atacadao.com.br/",
-            "countryCode": "BR",
-            "channel": "online",
-        },
-        {
-            "name": "Mercado Carrefour",
-            "domain": "mercado.carrefour.com.br",
-            "baseUrl": "https://mercado.carrefour.com.br/",
-            "countryCode": "BR",
-            "channel": "online",
-        },
-    ]
+STORES = [
+    {
+        "name": "Extra Supermercado",
+        "domain": "extra.com.br",
+        "baseUrl": "https://www.extra.com.br/",
+        "countryCode": "BR",
+        "channel": "online",
+    },
+    {
+        "name": "Atacadão",
+        "domain": "atacadao.com.br",
+        "baseUrl": "https://www.atacadao.com.br/",
+        "countryCode": "BR",
+        "channel": "online",
+    },
+    {
+        "name": "Mercado Carrefour",
+        "domain": "mercado.carrefour.com.br",
+        "baseUrl": "https://mercado.carrefour.com.br/",
+        "countryCode": "BR",
+        "channel": "online",
+    },
+]
 
+
+async def seed_stores(stores=STORES):
+    """Insert missing stores in a single idempotent statement."""
     conn = await get_conn()
 
-    for store in stores:
-        existing = await conn.fetchval(
-            'SELECT id FROM store WHERE LOWER(name) = LOWER($1)', store["name"]
+    # One round trip: unnest the seed rows and skip names that already exist
+    inserted = await conn.fetch(
+        '''
+        INSERT INTO store (name, domain, "baseUrl", "countryCode", channel)
+        SELECT s.name, s.domain, s."baseUrl", s."countryCode", s.channel
+        FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::text[])
+            AS s(name, domain, "baseUrl", "countryCode", channel)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM store WHERE LOWER(store.name) = LOWER(s.name)
         )
-        if not existing:
-            await conn.execute(
-                '''
-                INSERT INTO store (name, domain, "baseUrl", "countryCode", channel)
-                VALUES ($1, $2, $3, $4, $5)
-                ''',
-                store["name"],
-                store["domain"],
-                store["baseUrl"],
-                store["countryCode"],
-                store["channel"],
-            )
-            print(f"✅ Seeded store: {store['name']}")
-        else:
-            print(f"ℹ️ Store already exists: {store['name']}")
+        RETURNING name
+        ''',
+        [s["name"] for s in stores],
+        [s["domain"] for s in stores],
+        [s["baseUrl"] for s in stores],
+        [s["countryCode"] for s in stores],
+        [s["channel"] for s in stores],
+    )
 
     await conn.close()
+
+    for row in inserted:
+        print(f"✅ Seeded store: {row['name']}")
+    print(f"ℹ️ {len(stores) - len(inserted)} store(s) already existed")
@@ -0,0 +1,143 @@
+import os
+import zlib
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urljoin
+
+SITEMAP_TIMEOUT = int(os.getenv("SITEMAP_TIMEOUT", 60))
+SITEMAP_CHUNK_SIZE = 64 * 1024
+# Many sitemaps only carry a date in <lastmod>, so look back a little past the last run
+SITEMAP_LASTMOD_SLACK = timedelta(hours=int(os.getenv("SITEMAP_LASTMOD_SLACK_HOURS", 24)))
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_lastmod(value):
+    """Parse a W3C datetime <lastmod>; naive values are taken as UTC."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def changed_since(lastmod, since):
+    """True if an entry should be (re)visited; entries without lastmod always are."""
+    if since is None or lastmod is None:
+        return True
+    return lastmod >= since - SITEMAP_LASTMOD_SLACK
+
+
+def _drain(parser):
+    """Turn finished <url>/<sitemap> elements into (kind, loc, lastmod) and free them."""
+    for _, elem in parser.read_events():
+        kind = _local_name(elem.tag)
+        if kind not in ("url", "sitemap"):
+            continue
+        loc = lastmod = None
+        for child in elem:
+            name = _local_name(child.tag)
+            if name == "loc":
+                loc = (child.text or "").strip()
+            elif name == "lastmod":
+                lastmod = parse_lastmod(child.text)
+        elem.clear()
+        if loc:
+            yield kind, loc, lastmod
+
+
+async def iter_sitemap(session, url):
+    """
+    Stream (kind, loc, lastmod) entries from a sitemap or sitemap index.
+
+    The body is fed chunk by chunk into an incremental XML parser, inflating
+    gzip on the fly, so even multi-megabyte sitemaps never sit in memory whole.
+    """
+    parser = ET.XMLPullParser(events=("end",))
+    inflater = None
+    first = True
+    async with session.get(url, timeout=SITEMAP_TIMEOUT) as resp:
+        if resp.status != 200:
+            print(f"Sitemap {url} returned {resp.status}")
+            return
+        async for chunk in resp.content.iter_chunked(SITEMAP_CHUNK_SIZE):
+            if first:
+                # .xml.gz files are usually served without Content-Encoding
+                if chunk[:2] == GZIP_MAGIC:
+                    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                first = False
+            if inflater:
+                chunk = inflater.decompress(chunk)
+            parser.feed(chunk)
+            for entry in _drain(parser):
+                yield entry
+        if inflater:
+            parser.feed(inflater.flush())
+    parser.close()
+    for entry in _drain(parser):
+        yield entry
+
+
+async def sitemaps_from_robots(session, base_url):
+    """Return Sitemap: URLs declared in robots.txt."""
+    robots_url = urljoin(base_url, "/robots.txt")
+    try:
+        async with session.get(robots_url, timeout=15) as resp:
+            if resp.status != 200:
+                return []
+            text = await resp.text(errors="ignore")
+    except Exception as e:
+        print(f"Failed to fetch {robots_url}: {e}")
+        return []
+    sitemaps = []
+    for line in text.splitlines():
+        key, _, value = line.partition(":")
+        if key.strip().lower() == "sitemap" and value.strip():
+            sitemaps.append(urljoin(base_url, value.strip()))
+    return sitemaps
+
+
+async def iter_changed_urls(session, base_url, since=None, stop=None):
+    """
+    Yield page URLs from a merchant's sitemaps whose <lastmod> is newer than `since`.
+
+    Walks robots.txt → sitemap indexes → (gzipped) sitemaps, skipping whole
+    child sitemaps whose own lastmod predates `since`. Raises LookupError if
+    the merchant publishes no sitemap at all, so callers can fall back to BFS.
+    `stop` is an optional callable checked between entries to abort early.
+    """
+    pending = await sitemaps_from_robots(session, base_url) or [urljoin(base_url, "/sitemap.xml")]
+    seen = set()
+    found_any = False
+
+    while pending:
+        sitemap_url = pending.pop()
+        if sitemap_url in seen:
+            continue
+        seen.add(sitemap_url)
+        try:
+            async for kind, loc, lastmod in iter_sitemap(session, sitemap_url):
+                found_any = True
+                if stop and stop():
+                    return
+                if not changed_since(lastmod, since):
+                    continue
+                if kind == "sitemap":
+                    pending.append(loc)
+                else:
+                    yield loc
+        except ET.ParseError as e:
+            print(f"Malformed sitemap {sitemap_url}: {e}")
+        except Exception as e:
+            print(f"Failed to read sitemap {sitemap_url}: {e}")
+
+    if not found_any:
+        raise LookupError(f"No sitemap entries found for {base_url}")